@@ -0,0 +1,17 @@
+"""
+Benchmarks Init
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+config = {
+    "api_base_url": os.getenv("API_BASE_URL", "http://127.0.0.1:8000"),
+    "autoridad_clave": os.getenv("BENCH_AUTORIDAD_CLAVE", "ND"),
+    "concurrencia": int(os.getenv("BENCH_CONCURRENCIA", "32")),
+    "pag_tramite_servicio_clave": os.getenv("BENCH_PAG_TRAMITE_SERVICIO_CLAVE", ""),
+    "peticiones": int(os.getenv("BENCH_PETICIONES", "1000")),
+    "timeout": int(os.getenv("TIMEOUT", "10")),
+}
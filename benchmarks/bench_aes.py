@@ -0,0 +1,62 @@
+"""
+Benchmark del cifrado AES
+
+Compara AES128Encryption, que se crea y valida la llave en cada cadena, con
+AES128Context, que se crea una vez. Antes de medir revisa que cada uno descifre
+lo que cifra el otro. No necesita el API.
+"""
+
+import argparse
+import os
+import time
+
+from pjecz_casiopea_tramites_servicios_api.dependencies.AESEncryption import AES128Context, AES128Encryption
+
+LLAVE = os.getenv("WPP_KEY", "1460C8BD91DB352E78604983F82CDA3A")
+
+
+def medir(funcion, cadenas: list) -> float:
+    """Entregar las cadenas por segundo de funcion, la mejor de tres corridas"""
+    mejor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        funcion(cadenas)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return len(cadenas) / mejor
+
+
+def main():
+    """Ejecutar el benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark del cifrado AES")
+    parser.add_argument("--cadenas", type=int, default=20000)
+    parser.add_argument("--largo", type=int, default=900, help="Caracteres de cada cadena, el XML de un carro tiene unos 900")
+    args = parser.parse_args()
+
+    # Preparar las cadenas, ASCII porque AES128Encryption rellena por caracteres
+    textos = [f"<P>{numero:08d}{'x' * args.largo}</P>"[: args.largo] for numero in range(args.cadenas)]
+    datos = [texto.encode() for texto in textos]
+    clase = AES128Encryption()
+    contexto = AES128Context(LLAVE)
+
+    # Revisar que los dos sean compatibles
+    assert contexto.decrypt(clase.encrypt(textos[0], LLAVE)) == datos[0]
+    assert clase.decrypt(LLAVE, contexto.encrypt(datos[0])) == textos[0]
+    cifrados_clase = [clase.encrypt(texto, LLAVE) for texto in textos]
+    cifrados_contexto = [contexto.encrypt(dato) for dato in datos]
+
+    # Medir
+    resultados = [
+        ("Cifrar AES128Encryption", medir(lambda cs: [AES128Encryption().encrypt(c, LLAVE) for c in cs], textos)),
+        ("Cifrar AES128Context", medir(lambda cs: [contexto.encrypt(c) for c in cs], datos)),
+        ("Descifrar AES128Encryption", medir(lambda cs: [AES128Encryption().decrypt(LLAVE, c) for c in cs], cifrados_clase)),
+        ("Descifrar AES128Context", medir(lambda cs: [contexto.decrypt(c) for c in cs], cifrados_contexto)),
+    ]
+
+    # Reportar
+    print(f"Cadenas:  {args.cadenas} de {args.largo} caracteres")
+    for nombre, por_segundo in resultados:
+        print(f"{nombre + ':':<28} {por_segundo:>10.0f} cadenas/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark del carro de pagos
+
+Envía carros a POST /api/v5/pag_pagos/carro y reporta la latencia de cada uno
+y cuántas consultas y transacciones hizo el API a la base de datos por carro,
+según GET /api/v5/estadisticas/pool. Cada transacción suma dos viajes más a la
+base de datos, el BEGIN y el COMMIT. Sin el banco configurado el carro termina
+con un error al crear el enlace de pago, pero ya hizo todo su trabajo en la
+base de datos.
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks import config
+
+
+def contar_viajes(sesion: requests.Session) -> tuple[int, int]:
+    """Sumar las consultas y los commits que han hecho todos los pools"""
+    response = sesion.get(f"{config['api_base_url']}/api/v5/estadisticas/pool", timeout=config["timeout"])
+    response.raise_for_status()
+    pools = response.json()["data"]
+    return sum(pool["queries"] for pool in pools), sum(pool["commits"] for pool in pools)
+
+
+def crear_carro(numero: int, etiqueta: str, repetir_cliente: bool) -> dict:
+    """Datos de un carro, con un cliente distinto por carro salvo que se repita"""
+    if repetir_cliente:
+        numero = 0
+    return {
+        "apellido_primero": "PRUEBA",
+        "apellido_segundo": "BENCHMARK",
+        "nombres": f"CARRO {etiqueta}".strip(),
+        "curp": f"BENC{numero % 1000000:06d}HCLXXX09",
+        "email": f"carro{numero}{etiqueta}@example.com",
+        "telefono": "8440000000",
+        "autoridad_clave": config["autoridad_clave"],
+        "distrito_clave": "",
+        "pag_tramite_servicio_clave": config["pag_tramite_servicio_clave"],
+        "cantidad": 1,
+        "descripcion": "BENCHMARK",
+    }
+
+
+def enviar(sesion: requests.Session, carro: dict) -> tuple[float, bool]:
+    """Enviar un carro y entregar su latencia en segundos y si el API lo procesó"""
+    inicio = time.perf_counter()
+    try:
+        response = sesion.post(f"{config['api_base_url']}/api/v5/pag_pagos/carro", json=carro, timeout=config["timeout"])
+        exito = response.status_code == 200
+    except requests.exceptions.RequestException:
+        exito = False
+    return time.perf_counter() - inicio, exito
+
+
+def main():
+    """Ejecutar el benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark del carro de pagos")
+    parser.add_argument("--etiqueta", default="", help="Etiqueta para identificar la corrida, por ejemplo antes o despues")
+    parser.add_argument("--concurrencia", type=int, default=1)
+    parser.add_argument("--peticiones", type=int, default=100)
+    parser.add_argument("--repetir-cliente", action="store_true", help="Usar el mismo cliente en todos los carros")
+    args = parser.parse_args()
+
+    # Una sesión por hilo para reutilizar conexiones
+    sesiones = [requests.Session() for _ in range(args.concurrencia)]
+    etiqueta = f"{args.etiqueta}{int(time.time())}"
+    carros = [crear_carro(i, etiqueta, args.repetir_cliente) for i in range(args.peticiones)]
+
+    # Lanzar los carros, midiendo las consultas antes y después
+    consultas_antes, commits_antes = contar_viajes(sesiones[0])
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as executor:
+        resultados = list(executor.map(lambda i: enviar(sesiones[i % args.concurrencia], carros[i]), range(args.peticiones)))
+    duracion = time.perf_counter() - inicio
+    consultas_despues, commits_despues = contar_viajes(sesiones[0])
+
+    # Reportar
+    latencias = sorted(latencia for latencia, _ in resultados)
+    fallidas = sum(1 for _, exito in resultados if not exito)
+    consultas = (consultas_despues - consultas_antes) / args.peticiones
+    commits = (commits_despues - commits_antes) / args.peticiones
+    print(f"Etiqueta:      {args.etiqueta}")
+    print(f"Concurrencia:  {args.concurrencia}")
+    print(f"Carros:        {args.peticiones} ({fallidas} fallidos)")
+    print(f"Duración:      {duracion:.2f} s")
+    print(f"Rendimiento:   {args.peticiones / duracion:.1f} carros/s")
+    print(f"Latencia p50:  {statistics.median(latencias) * 1000:.1f} ms")
+    print(f"Latencia p99:  {latencias[int(len(latencias) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"Consultas:     {consultas:.1f} por carro")
+    print(f"Transacciones: {commits:.1f} por carro")
+    print(f"Viajes a BD:   {consultas + 2 * commits:.1f} por carro")
+
+
+if __name__ == "__main__":
+    main()
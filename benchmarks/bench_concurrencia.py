@@ -0,0 +1,67 @@
+"""
+Benchmark de peticiones concurrentes
+
+Lanza peticiones GET concurrentes contra los endpoints de consulta y reporta
+peticiones por segundo y latencias. Sirve para comparar el rendimiento antes
+y después de cambios en la capa de base de datos.
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks import config
+
+RUTAS = [
+    "/api/v5/distritos",
+    "/api/v5/autoridades",
+    "/api/v5/pag_tramites_servicios",
+]
+
+
+def consultar(sesion: requests.Session, ruta: str) -> tuple[float, bool]:
+    """Hacer una petición y entregar su latencia en segundos y si fue exitosa"""
+    inicio = time.perf_counter()
+    try:
+        response = sesion.get(f"{config['api_base_url']}{ruta}", timeout=config["timeout"])
+        exito = response.status_code == 200
+    except requests.exceptions.RequestException:
+        exito = False
+    return time.perf_counter() - inicio, exito
+
+
+def main():
+    """Ejecutar el benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark de peticiones concurrentes")
+    parser.add_argument("--etiqueta", default="", help="Etiqueta para identificar la corrida, por ejemplo antes o despues")
+    parser.add_argument("--concurrencia", type=int, default=config["concurrencia"])
+    parser.add_argument("--peticiones", type=int, default=config["peticiones"])
+    args = parser.parse_args()
+
+    # Una sesión por hilo para reutilizar conexiones
+    sesiones = [requests.Session() for _ in range(args.concurrencia)]
+    rutas = [RUTAS[i % len(RUTAS)] for i in range(args.peticiones)]
+
+    # Lanzar las peticiones
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as executor:
+        resultados = list(executor.map(lambda i: consultar(sesiones[i % args.concurrencia], rutas[i]), range(args.peticiones)))
+    duracion = time.perf_counter() - inicio
+
+    # Reportar
+    latencias = sorted(latencia for latencia, _ in resultados)
+    fallidas = sum(1 for _, exito in resultados if not exito)
+    print(f"Etiqueta:      {args.etiqueta}")
+    print(f"Concurrencia:  {args.concurrencia}")
+    print(f"Peticiones:    {args.peticiones} ({fallidas} fallidas)")
+    print(f"Duración:      {duracion:.2f} s")
+    print(f"Rendimiento:   {args.peticiones / duracion:.1f} peticiones/s")
+    print(f"Latencia p50:  {statistics.median(latencias) * 1000:.1f} ms")
+    print(f"Latencia p99:  {latencias[int(len(latencias) * 0.99) - 1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
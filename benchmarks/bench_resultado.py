@@ -0,0 +1,106 @@
+"""
+Benchmark de los avisos del banco
+
+Crea pagos con carros asíncronos, cifra con WPP_KEY un aviso de pago para cada
+uno y los envía a POST /api/v5/pag_pagos/resultado como lo haría el banco en una
+hora pico. Reporta la latencia de la respuesta al banco, directo o con la bandeja
+si el API corre con PAG_RESULTADOS_BANDEJA, y cuánto tardaron los pagos en quedar
+aplicados.
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks import config
+from benchmarks.bench_carro import crear_carro
+from pjecz_casiopea_tramites_servicios_api.dependencies.santander_web_pay_plus import encrypt_chain
+
+
+def crear_pago(sesion: requests.Session, carro: dict) -> str:
+    """Crear un pago sin esperar al banco y entregar su id"""
+    response = sesion.post(
+        f"{config['api_base_url']}/api/v5/pag_pagos/carro",
+        params={"asincrono": "true"},
+        json=carro,
+        timeout=config["timeout"],
+    )
+    response.raise_for_status()
+    return response.json()["data"]["id"]
+
+
+def cifrar_aviso(pag_pago_id: str, folio: str, email: str) -> str:
+    """Cifrar el aviso del banco de que el pago se hizo"""
+    return encrypt_chain(
+        f"<CENTEROFPAYMENTS><reference>{pag_pago_id}</reference><response>approved</response>"
+        f"<foliocpagos>{folio}</foliocpagos><auth>123456</auth><email>{email}</email></CENTEROFPAYMENTS>"
+    ).decode()
+
+
+def enviar(sesion: requests.Session, xml_encriptado: str) -> tuple[float, bool]:
+    """Enviar un aviso y entregar la latencia en segundos y si el API lo recibió"""
+    inicio = time.perf_counter()
+    try:
+        response = sesion.post(
+            f"{config['api_base_url']}/api/v5/pag_pagos/resultado",
+            json={"xml_encriptado": xml_encriptado},
+            timeout=config["timeout"],
+        )
+        exito = response.status_code == 200 and response.json()["success"]
+    except requests.exceptions.RequestException:
+        exito = False
+    return time.perf_counter() - inicio, exito
+
+
+def esperar_aplicado(sesion: requests.Session, pag_pago_id: str, limite: float = 120):
+    """Esperar hasta que el pago deje de estar SOLICITADO"""
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < limite:
+        response = sesion.get(f"{config['api_base_url']}/api/v5/pag_pagos/{pag_pago_id}/estado", timeout=config["timeout"])
+        if response.json()["data"]["estado"] != "SOLICITADO":
+            return
+        time.sleep(0.1)
+
+
+def main():
+    """Ejecutar el benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark de los avisos del banco")
+    parser.add_argument("--etiqueta", default="", help="Etiqueta para identificar la corrida, por ejemplo directo o bandeja")
+    parser.add_argument("--concurrencia", type=int, default=config["concurrencia"])
+    parser.add_argument("--peticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    # Crear los pagos y cifrar sus avisos
+    sesiones = [requests.Session() for _ in range(args.concurrencia)]
+    etiqueta = f"{args.etiqueta}{int(time.time())}"
+    carros = [crear_carro(i, etiqueta, False) for i in range(args.peticiones)]
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as executor:
+        ids = list(executor.map(lambda i: crear_pago(sesiones[i % args.concurrencia], carros[i]), range(args.peticiones)))
+    avisos = [cifrar_aviso(pag_pago_id, f"{etiqueta}{i}", carros[i]["email"]) for i, pag_pago_id in enumerate(ids)]
+
+    # Enviar los avisos como el banco
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as executor:
+        resultados = list(executor.map(lambda i: enviar(sesiones[i % args.concurrencia], avisos[i]), range(args.peticiones)))
+    duracion = time.perf_counter() - inicio
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as executor:
+        list(executor.map(lambda i: esperar_aplicado(sesiones[i % args.concurrencia], ids[i]), range(args.peticiones)))
+    aplicados = time.perf_counter() - inicio
+
+    # Reportar
+    latencias = sorted(latencia for latencia, _ in resultados)
+    fallidos = sum(1 for _, exito in resultados if not exito)
+    print(f"Etiqueta:      {args.etiqueta}")
+    print(f"Concurrencia:  {args.concurrencia}")
+    print(f"Avisos:        {args.peticiones} ({fallidos} fallidos)")
+    print(f"Recibidos en:  {duracion:.2f} s")
+    print(f"Aplicados en:  {aplicados:.2f} s")
+    print(f"Latencia p50:  {statistics.median(latencias) * 1000:.1f} ms")
+    print(f"Latencia p99:  {latencias[int(len(latencias) * 0.99) - 1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark de safe_string
+
+Compara safe_string, safe_clave, safe_curp y safe_rfc con sus versiones
+anteriores, las de referencia de tests/test_safe_string.py, con cadenas que se
+repiten como los trámites de los carros y con cadenas distintas cada vez, que
+no aprovechan el LRU. Revisa que den lo mismo antes de medir. No necesita el API.
+"""
+
+import argparse
+import random
+import time
+
+from pjecz_casiopea_tramites_servicios_api.dependencies.safe_string import (
+    CURP_REGEXP,
+    safe_clave,
+    safe_curp,
+    safe_string,
+)
+from tests.test_safe_string import referencia_safe_clave, referencia_safe_curp_rfc, referencia_safe_string
+
+PALABRAS = [
+    "José",
+    "María",
+    "Peña",
+    "Muñoz",
+    "Ibáñez",
+    "Pérez",
+    "Güereca",
+    "trámite",
+    "inscripción",
+    "señor",
+    "acta",
+    "Coahuila",
+]
+
+
+def medir(funcion, cadenas: list[str]) -> float:
+    """Entregar las cadenas por segundo de funcion, la mejor de tres corridas"""
+    mejor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for cadena in cadenas:
+            funcion(cadena)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return len(cadenas) / mejor
+
+
+def main():
+    """Ejecutar el benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark de safe_string")
+    parser.add_argument("--cadenas", type=int, default=50000)
+    parser.add_argument("--distintas", type=int, default=500, help="Cadenas distintas entre las que se repiten")
+    args = parser.parse_args()
+
+    # Preparar cadenas como nombres y descripciones, unas repetidas y otras únicas
+    aleatorio = random.Random(0)
+    frase = lambda: " ".join(aleatorio.choices(PALABRAS, k=aleatorio.randint(2, 8)))
+    distintas = [frase() for _ in range(args.distintas)]
+    repetidas = [aleatorio.choice(distintas) for _ in range(args.cadenas)]
+    unicas = [f"{frase()} {numero}" for numero in range(args.cadenas)]
+    curps = [f"gaxj-{numero % 1000000:06d}-hcoñrs09" for numero in range(args.cadenas)]
+
+    # Revisar que den lo mismo
+    for cadena in unicas[:1000] + curps[:1000]:
+        assert safe_string(cadena, save_enie=True) == referencia_safe_string(cadena, save_enie=True)
+        assert safe_string(cadena) == referencia_safe_string(cadena)
+        assert safe_clave(cadena) == referencia_safe_clave(cadena)
+        assert safe_curp(cadena, search_fragment=True) == referencia_safe_curp_rfc(cadena, CURP_REGEXP, search_fragment=True)
+
+    # Medir
+    resultados = [
+        ("safe_string ñ repetidas", referencia_safe_string, safe_string, repetidas, {"save_enie": True}),
+        ("safe_string ñ únicas", referencia_safe_string, safe_string, unicas, {"save_enie": True}),
+        ("safe_string únicas", referencia_safe_string, safe_string, unicas, {}),
+        ("safe_clave únicas", referencia_safe_clave, safe_clave, unicas, {}),
+    ]
+    print(f"Cadenas:  {args.cadenas} ({args.distintas} distintas en las repetidas)")
+    for nombre, antes, despues, cadenas, opciones in resultados:
+        por_segundo_antes = medir(lambda cadena: antes(cadena, **opciones), cadenas)
+        por_segundo_despues = medir(lambda cadena: despues(cadena, **opciones), cadenas)
+        print(
+            f"{nombre + ':':<26} {por_segundo_antes:>10.0f} -> {por_segundo_despues:>10.0f} cadenas/s "
+            f"({por_segundo_despues / por_segundo_antes:.1f}x)"
+        )
+    antes = medir(lambda cadena: referencia_safe_curp_rfc(cadena, CURP_REGEXP, search_fragment=True), curps)
+    despues = medir(lambda cadena: safe_curp(cadena, search_fragment=True), curps)
+    print(f"{'safe_curp únicas:':<26} {antes:>10.0f} -> {despues:>10.0f} cadenas/s ({despues / antes:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark de la cadena XML para el banco
+
+Compara la referencia de tests/test_santander_web_pay_plus.py, que arma el árbol
+de ElementTree en cada carro, con create_chain_xml, que llena la plantilla. Revisa que den la misma cadena
+antes de medir. No necesita el API.
+"""
+
+import argparse
+import os
+import time
+import uuid
+
+from pjecz_casiopea_tramites_servicios_api.dependencies import santander_web_pay_plus
+from tests.test_santander_web_pay_plus import referencia_create_chain_xml
+
+
+def medir(funcion, carros: list) -> float:
+    """Entregar las cadenas por segundo de funcion, la mejor de tres corridas"""
+    mejor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for carro in carros:
+            funcion(*carro)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return len(carros) / mejor
+
+
+def main():
+    """Ejecutar el benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark de la cadena XML para el banco")
+    parser.add_argument("--carros", type=int, default=50000)
+    args = parser.parse_args()
+
+    # Usar la configuración del entorno o una de prueba
+    for variable, valor in [("WPP_COMPANY_ID", "1"), ("WPP_BRANCH_ID", "1"), ("WPP_USER", "u"), ("WPP_PASS", "p")]:
+        if getattr(santander_web_pay_plus, variable) is None:
+            setattr(santander_web_pay_plus, variable, os.getenv(variable, valor))
+
+    # Preparar los carros, algunos con caracteres que se escapan
+    carros = [
+        (uuid.uuid4(), 150.0 + numero, f"cliente{numero}@example.com", f"TRÁMITE {numero} & <ANEXOS>", uuid.uuid4())
+        for numero in range(args.carros)
+    ]
+    for carro in carros[:1000]:
+        assert santander_web_pay_plus.create_chain_xml(*carro) == referencia_create_chain_xml(*carro)
+
+    # Medir y reportar
+    antes = medir(referencia_create_chain_xml, carros)
+    despues = medir(santander_web_pay_plus.create_chain_xml, carros)
+    print(f"Carros:       {args.carros}")
+    print(f"ElementTree:  {antes:>10.0f} cadenas/s")
+    print(f"Plantilla:    {despues:>10.0f} cadenas/s ({despues / antes:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
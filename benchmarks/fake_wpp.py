@@ -0,0 +1,50 @@
+"""
+Servidor falso de Santander Web Pay Plus
+
+Recibe la cadena cifrada que envía send_chain, la descifra con WPP_KEY, espera
+BENCH_WPP_LATENCIA_MS milisegundos como si fuera el banco y responde con el XML
+cifrado que trae el URL de pago. Sirve para medir carros concurrentes sin el banco.
+Con BENCH_WPP_ERRORES, entre 0 y 1, esa fracción de las peticiones responde 503
+para ver cómo se abre el circuit breaker.
+
+    WPP_KEY=... uvicorn benchmarks.fake_wpp:app --port 9000
+
+Y arrancar el API con WPP_URL=http://127.0.0.1:9000/ y el mismo WPP_KEY.
+"""
+
+import asyncio
+import os
+import random
+import xml.etree.ElementTree as ET
+
+from fastapi import FastAPI, Form, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from pjecz_casiopea_tramites_servicios_api.dependencies.santander_web_pay_plus import decrypt_chain, encrypt_chain
+
+ERRORES = float(os.getenv("BENCH_WPP_ERRORES", "0"))
+LATENCIA = int(os.getenv("BENCH_WPP_LATENCIA_MS", "200")) / 1000
+
+app = FastAPI(title="Fake WPP")
+
+
+@app.post("/", response_class=PlainTextResponse)
+async def generar_url(xml: str = Form()) -> str:
+    """Responder como el banco con el URL de pago cifrado"""
+
+    # Descifrar la cadena para obtener la referencia del pago
+    cadena = ET.fromstring(xml).find("data").text
+    referencia = ET.fromstring(decrypt_chain(cadena)).find("url/reference").text
+
+    # Esperar como si fuera el banco
+    await asyncio.sleep(LATENCIA)
+
+    # Fallar como un banco degradado
+    if random.random() < ERRORES:
+        raise HTTPException(status_code=503, detail="Servicio no disponible")
+
+    # Responder con el URL cifrado
+    respuesta = (
+        f"<P_RESPONSE><cd_response>success</cd_response><nb_url>https://wpp.example.com/pago/{referencia}</nb_url></P_RESPONSE>"
+    )
+    return encrypt_chain(respuesta).decode()
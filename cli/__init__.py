@@ -0,0 +1,14 @@
+"""
+CLI Init
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+config = {
+    "api_base_url": os.getenv("API_BASE_URL", "http://127.0.0.1:8000"),
+    "api_key": os.getenv("API_KEY", ""),
+    "timeout": int(os.getenv("TIMEOUT", "300")),
+}
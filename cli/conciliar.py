@@ -0,0 +1,208 @@
+"""
+Conciliar la liquidación del banco
+
+Lee el archivo de liquidación del banco, un CSV con el encabezado
+
+    reference,foliocpagos,amount,response
+
+y lo carga con COPY a una tabla temporal, sin pasar los renglones por Python.
+Luego lo compara con pag_pagos en SQL y escribe en un CSV las diferencias:
+
+- IMPORTE: el importe del banco no es el total del pago
+- FOLIO: el folio del banco no es el del pago
+- ESTADO: el banco lo cobró y el pago no está PAGADO o ENTREGADO, o al revés
+- FALTA_EN_SISTEMA: el banco trae un pago que no existe o está eliminado
+- FALTA_EN_LIQUIDACION: un pago PAGADO o ENTREGADO entre --desde y --hasta que no trae el banco
+- REPETIDO: el banco trae el mismo pago más de una vez
+- INVALIDO: el renglón no tiene un UUID, un importe o una respuesta
+
+La memoria no crece con el archivo: COPY lo envía por partes y las diferencias
+se leen con un cursor.
+
+    python3 -m cli.conciliar liquidacion.csv --desde 2026-10-17 --salida diferencias.csv
+"""
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import asyncpg
+
+from pjecz_casiopea_tramites_servicios_api.config.settings import get_settings
+from pjecz_casiopea_tramites_servicios_api.dependencies.santander_web_pay_plus import RESPUESTA_EXITO
+
+TIPOS = ["IMPORTE", "FOLIO", "ESTADO", "FALTA_EN_SISTEMA", "FALTA_EN_LIQUIDACION", "REPETIDO", "INVALIDO"]
+
+# Los renglones como vienen, con su número en el archivo; las columnas generadas validan y convierten
+CREAR_LIQUIDACION = r"""
+CREATE TEMPORARY TABLE liquidacion (
+    renglon bigint GENERATED ALWAYS AS IDENTITY (START WITH 2),
+    reference text,
+    foliocpagos text,
+    amount text,
+    response text,
+    pag_pago_id uuid GENERATED ALWAYS AS (
+        CASE WHEN btrim(reference) ~* '^[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}$'
+        THEN btrim(reference)::uuid END
+    ) STORED,
+    importe numeric GENERATED ALWAYS AS (
+        CASE WHEN btrim(amount) ~ '^-?[0-9]+(\.[0-9]+)?$' THEN btrim(amount)::numeric END
+    ) STORED
+) ON COMMIT DROP
+"""
+
+# Las diferencias de los dos lados, $1 es la respuesta de éxito del banco y $2, $3 el periodo
+DIFERENCIAS = """
+WITH banco AS (
+    SELECT
+        liquidacion.*,
+        CASE WHEN btrim(response) = $1 THEN 'PAGADO' ELSE 'FALLIDO' END AS estado,
+        count(*) OVER (PARTITION BY pag_pago_id) AS veces
+    FROM liquidacion
+)
+SELECT
+    banco.renglon,
+    CASE
+        WHEN banco.pag_pago_id IS NULL OR banco.importe IS NULL OR coalesce(btrim(banco.response), '') = '' THEN 'INVALIDO'
+        WHEN banco.veces > 1 THEN 'REPETIDO'
+        WHEN pag_pagos.id IS NULL THEN 'FALTA_EN_SISTEMA'
+        WHEN (banco.estado = 'PAGADO') <> (pag_pagos.estado IN ('PAGADO', 'ENTREGADO')) THEN 'ESTADO'
+        WHEN banco.importe <> pag_pagos.total THEN 'IMPORTE'
+        ELSE 'FOLIO'
+    END AS tipo,
+    coalesce(banco.pag_pago_id::text, banco.reference) AS pag_pago_id,
+    banco.foliocpagos AS folio_banco,
+    pag_pagos.folio AS folio_sistema,
+    banco.amount AS importe_banco,
+    pag_pagos.total AS importe_sistema,
+    banco.estado AS estado_banco,
+    pag_pagos.estado AS estado_sistema
+FROM banco
+LEFT JOIN pag_pagos ON pag_pagos.id = banco.pag_pago_id AND pag_pagos.estatus = 'A'
+WHERE banco.pag_pago_id IS NULL
+    OR banco.importe IS NULL
+    OR coalesce(btrim(banco.response), '') = ''
+    OR banco.veces > 1
+    OR pag_pagos.id IS NULL
+    OR (banco.estado = 'PAGADO') <> (pag_pagos.estado IN ('PAGADO', 'ENTREGADO'))
+    OR banco.importe <> pag_pagos.total
+    OR (banco.estado = 'PAGADO' AND btrim(banco.foliocpagos) IS DISTINCT FROM pag_pagos.folio)
+UNION ALL
+SELECT
+    NULL,
+    'FALTA_EN_LIQUIDACION',
+    pag_pagos.id::text,
+    NULL,
+    pag_pagos.folio,
+    NULL,
+    pag_pagos.total,
+    NULL,
+    pag_pagos.estado
+FROM pag_pagos
+WHERE pag_pagos.estado IN ('PAGADO', 'ENTREGADO')
+    AND pag_pagos.estatus = 'A'
+    AND pag_pagos.resultado_tiempo >= $2
+    AND pag_pagos.resultado_tiempo < $3
+    AND NOT EXISTS (SELECT 1 FROM liquidacion WHERE liquidacion.pag_pago_id = pag_pagos.id)
+"""
+
+
+async def comparar(conexion: asyncpg.Connection, archivo, desde: date, hasta: date, escritor) -> tuple[int, Counter]:
+    """Cargar el archivo, una ruta o un archivo abierto en binario, y escribir las diferencias, dentro de una transacción"""
+    conteos = Counter()
+
+    # Cargar el archivo con COPY, asyncpg lo envía por partes
+    await conexion.execute(CREAR_LIQUIDACION)
+    estado_copy = await conexion.copy_to_table(
+        "liquidacion",
+        source=archivo,
+        columns=["reference", "foliocpagos", "amount", "response"],
+        format="csv",
+        header=True,
+    )
+    renglones = int(estado_copy.split()[-1])
+
+    # Indexar y analizar para que el cruce con pag_pagos use índices
+    await conexion.execute("CREATE INDEX ON liquidacion (pag_pago_id)")
+    await conexion.execute("ANALYZE liquidacion")
+
+    # Leer las diferencias con un cursor y escribirlas
+    async for renglon in conexion.cursor(
+        DIFERENCIAS,
+        RESPUESTA_EXITO,
+        datetime.combine(desde, datetime.min.time()),
+        datetime.combine(hasta + timedelta(days=1), datetime.min.time()),
+        prefetch=1000,
+    ):
+        escritor.writerow(["" if valor is None else valor for valor in renglon.values()])
+        conteos[renglon["tipo"]] += 1
+    return renglones, conteos
+
+
+async def conciliar(archivo: str, desde: date, hasta: date, escritor) -> tuple[int, Counter]:
+    """Conectar y comparar, entrega cuántos renglones tenía el archivo y cuántas diferencias de cada tipo"""
+    settings = get_settings()
+    conexion = await asyncpg.connect(
+        user=settings.DB_USER,
+        password=settings.DB_PASS,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME,
+    )
+    try:
+        async with conexion.transaction():
+            return await comparar(conexion, archivo, desde, hasta, escritor)
+    finally:
+        await conexion.close()
+
+
+def main():
+    """Ejecutar la conciliación"""
+    ayer = date.today() - timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Conciliar la liquidación del banco con los pagos")
+    parser.add_argument("archivo", help="CSV de liquidación con reference,foliocpagos,amount,response")
+    parser.add_argument("--desde", type=date.fromisoformat, default=ayer, help="Primer día de los pagos, por defecto ayer")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=None, help="Último día de los pagos, por defecto --desde")
+    parser.add_argument("--salida", default="-", help="CSV con las diferencias, - para la salida estándar")
+    args = parser.parse_args()
+    hasta = args.desde if args.hasta is None else args.hasta
+
+    # Conciliar y escribir el CSV de diferencias
+    inicio = time.perf_counter()
+    with (
+        contextlib.nullcontext(sys.stdout) if args.salida == "-" else open(args.salida, "w", encoding="utf-8", newline="")
+    ) as salida:
+        escritor = csv.writer(salida)
+        escritor.writerow(
+            [
+                "renglon",
+                "tipo",
+                "pag_pago_id",
+                "folio_banco",
+                "folio_sistema",
+                "importe_banco",
+                "importe_sistema",
+                "estado_banco",
+                "estado_sistema",
+            ]
+        )
+        renglones, conteos = asyncio.run(conciliar(args.archivo, args.desde, hasta, escritor))
+
+    # Reportar
+    duracion = time.perf_counter() - inicio
+    print(f"{'Renglones:':<22} {renglones}", file=sys.stderr)
+    print(f"{'Periodo:':<22} {args.desde} a {hasta}", file=sys.stderr)
+    for tipo in TIPOS:
+        print(f"{tipo.capitalize().replace('_', ' ') + ':':<22} {conteos[tipo]}", file=sys.stderr)
+    print(f"{'Duración:':<22} {duracion:.2f} s", file=sys.stderr)
+    if renglones:
+        print(f"{'Rendimiento:':<22} {renglones / duracion:.0f} renglones/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
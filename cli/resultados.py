@@ -0,0 +1,110 @@
+"""
+Reprocesar resultados del banco
+
+Lee un archivo con un XML cifrado del banco por renglón, los envía por lotes a
+POST /api/v5/pag_pagos/resultados y escribe en un CSV lo que pasó con cada uno:
+renglón, estado, pag_pago_id, folio y mensaje. Lee el archivo poco a poco, así
+que solo tiene en memoria un lote a la vez.
+
+Si el renglón empieza con el tiempo en que se recibió el aviso, en ISO 8601 y
+separado por un tabulador, el pago lo conserva; si no, el API usa el de ahora.
+Necesita la API_KEY igual a PAG_RESULTADOS_API_KEY del API.
+
+    python3 -m cli.resultados avisos.txt --salida salidas.csv --lote 1000
+"""
+
+import argparse
+import contextlib
+import csv
+import sys
+import time
+from collections import Counter
+from itertools import islice
+
+import requests
+
+from cli import config
+
+
+def separar_renglon(linea: str) -> tuple[str | None, str]:
+    """Separar el tiempo en que se recibió, si lo trae, del XML cifrado"""
+    recibido, separador, xml_encriptado = linea.partition("\t")
+    if separador == "":
+        return None, linea
+    return recibido.strip(), xml_encriptado.strip()
+
+
+def leer_lotes(archivo, tamano: int):
+    """Entregar los renglones no vacíos del archivo en listas de hasta tamano, con su número de renglón"""
+    renglones = ((numero, linea.strip()) for numero, linea in enumerate(archivo, start=1) if linea.strip() != "")
+    while lote := list(islice(renglones, tamano)):
+        yield lote
+
+
+def enviar_lote(sesion: requests.Session, renglones: list[str]) -> dict:
+    """Enviar un lote al API y entregar sus datos, causa RuntimeError si el API no lo aplicó"""
+    recibidos, xmls_encriptados = zip(*[separar_renglon(renglon) for renglon in renglones])
+    response = sesion.post(
+        f"{config['api_base_url']}/api/v5/pag_pagos/resultados",
+        headers={"X-Api-Key": config["api_key"]},
+        json={"xmls_encriptados": list(xmls_encriptados), "recibidos": list(recibidos)},
+        timeout=config["timeout"],
+    )
+    response.raise_for_status()
+    contenido = response.json()
+    if not contenido["success"]:
+        raise RuntimeError(contenido["message"])
+    return contenido["data"]
+
+
+def main():
+    """Ejecutar el reproceso"""
+    parser = argparse.ArgumentParser(description="Reprocesar resultados del banco por lotes")
+    parser.add_argument("archivo", help="Archivo con un XML cifrado por renglón")
+    parser.add_argument("--salida", default="-", help="CSV con la salida de cada renglón, - para la salida estándar")
+    parser.add_argument("--lote", type=int, default=1000, help="Resultados por petición al API")
+    args = parser.parse_args()
+
+    # Abrir el archivo y el CSV de salida
+    sesion = requests.Session()
+    conteos = Counter()
+    segundos_api = 0.0
+    inicio = time.perf_counter()
+    with open(args.archivo, encoding="utf-8") as archivo, (
+        contextlib.nullcontext(sys.stdout) if args.salida == "-" else open(args.salida, "w", encoding="utf-8", newline="")
+    ) as salida:
+        escritor = csv.writer(salida)
+        escritor.writerow(["renglon", "estado", "pag_pago_id", "folio", "mensaje"])
+
+        # Enviar cada lote y escribir sus salidas
+        for lote in leer_lotes(archivo, args.lote):
+            try:
+                datos = enviar_lote(sesion, [renglon for _, renglon in lote])
+            except (requests.exceptions.RequestException, RuntimeError) as error:
+                print(f"Falló el lote desde el renglón {lote[0][0]}: {error}", file=sys.stderr)
+                conteos["FALLIDO"] += len(lote)
+                continue
+            segundos_api += datos["segundos"]
+            for (renglon, _), item in zip(lote, datos["salidas"]):
+                escritor.writerow(
+                    [renglon, item["estado"], item["pag_pago_id"] or "", item["folio"] or "", item["mensaje"] or ""]
+                )
+                conteos[item["estado"]] += 1
+            print(f"Lote hasta el renglón {lote[-1][0]}: {datos['por_segundo']:.0f} resultados/s", file=sys.stderr)
+
+    # Reportar
+    total = sum(conteos.values())
+    duracion = time.perf_counter() - inicio
+    print(f"Resultados:   {total}", file=sys.stderr)
+    for estado in ["APLICADO", "DUPLICADO", "OMITIDO", "RECHAZADO", "FALLIDO"]:
+        print(f"{estado.capitalize() + ':':<13} {conteos[estado]}", file=sys.stderr)
+    print(f"Duración:     {duracion:.2f} s", file=sys.stderr)
+    if total:
+        print(
+            f"Rendimiento:  {total / duracion:.0f} resultados/s, {total / max(segundos_api, 1e-9):.0f} en el API",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -20,7 +20,36 @@ class Settings(BaseSettings):
     DB_NAME: str = os.getenv("DB_NAME", "pjecz_casiopea")
     DB_PASS: str = os.getenv("DB_PASS", "")
     DB_USER: str = os.getenv("DB_USER", "")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_POOL_MAX_OVERFLOW: int = int(os.getenv("DB_POOL_MAX_OVERFLOW", "5"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_READ_HOST: str = os.getenv("DB_READ_HOST", "")
+    DB_READ_PORT: int = int(os.getenv("DB_READ_PORT", os.getenv("DB_PORT", "5432")))
+    DB_READ_YOUR_WRITES_SECONDS: int = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "60"))
+    AUTORIDADES_CACHE_CONTROL: str = os.getenv("AUTORIDADES_CACHE_CONTROL", "public, max-age=300")
+    AUTORIDADES_COUNT_MODE: str = os.getenv("AUTORIDADES_COUNT_MODE", "exact")
+    CATALOGOS_CACHE_TTL: int = int(os.getenv("CATALOGOS_CACHE_TTL", "600"))
+    CATALOGOS_NOTIFY_CHANNEL: str = os.getenv("CATALOGOS_NOTIFY_CHANNEL", "catalogos")
+    DISTRITOS_CACHE_CONTROL: str = os.getenv("DISTRITOS_CACHE_CONTROL", "public, max-age=300")
+    DISTRITOS_COUNT_MODE: str = os.getenv("DISTRITOS_COUNT_MODE", "exact")
+    ENLACES_PAGO_ASINCRONOS: bool = os.getenv("ENLACES_PAGO_ASINCRONOS", "false").lower() == "true"
+    ENLACES_PAGO_ESPERA: int = int(os.getenv("ENLACES_PAGO_ESPERA", "5"))
+    ENLACES_PAGO_REINTENTOS: int = int(os.getenv("ENLACES_PAGO_REINTENTOS", "3"))
+    ENLACES_PAGO_TRABAJADORES: int = int(os.getenv("ENLACES_PAGO_TRABAJADORES", "8"))
+    IDEMPOTENCY_KEY_TTL: int = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
     ORIGINS: str = os.getenv("ORIGINS", "http://127.0.0.1:3000,http://localhost:3000")
+    PAG_RESULTADOS_BANDEJA: bool = os.getenv("PAG_RESULTADOS_BANDEJA", "false").lower() == "true"
+    PAG_RESULTADOS_BANDEJA_ESPERA: int = int(os.getenv("PAG_RESULTADOS_BANDEJA_ESPERA", "5"))
+    PAG_RESULTADOS_BANDEJA_INTENTOS: int = int(os.getenv("PAG_RESULTADOS_BANDEJA_INTENTOS", "3"))
+    PAG_RESULTADOS_BANDEJA_LOTE: int = int(os.getenv("PAG_RESULTADOS_BANDEJA_LOTE", "100"))
+    PAG_RESULTADOS_API_KEY: str = os.getenv("PAG_RESULTADOS_API_KEY", "")
+    PAG_RESULTADOS_LOTE_MAXIMO: int = int(os.getenv("PAG_RESULTADOS_LOTE_MAXIMO", "10000"))
+    PAG_RESULTADOS_PARTE: int = int(os.getenv("PAG_RESULTADOS_PARTE", "500"))
+    PAG_RESULTADOS_PROCESOS: int = int(os.getenv("PAG_RESULTADOS_PROCESOS", str(os.cpu_count() or 1)))
+    PAG_TRAMITES_SERVICIOS_CACHE_CONTROL: str = os.getenv("PAG_TRAMITES_SERVICIOS_CACHE_CONTROL", "public, max-age=300")
+    PAG_TRAMITES_SERVICIOS_COUNT_MODE: str = os.getenv("PAG_TRAMITES_SERVICIOS_COUNT_MODE", "exact")
     TZ: str = os.getenv("TZ", "America/Mexico_City")
 
     class Config:
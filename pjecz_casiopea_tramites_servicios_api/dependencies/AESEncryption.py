@@ -112,3 +112,43 @@ class AES128Encryption:
             ciphertext_error = True
         if ciphertext_error:
             raise Exception("DECRYPTION ERROR: Ciphertext must be a base 64 String. Remember, it contains IV + ciphertext")
+
+
+class AES128Context:
+    """Contexto AES-128 CBC con la llave ya validada, para cifrar y descifrar muchas cadenas en bytes
+
+    Produce y lee el mismo formato que AES128Encryption: base64 del IV de 16 bytes más el texto cifrado con PKCS5.
+    El relleno se calcula sobre los bytes, así también cifra cadenas que no son ASCII.
+    """
+
+    BLOCK_SIZE = 16
+
+    def __init__(self, hex_key: str):
+        if len(hex_key) != 32:
+            raise ValueError("La llave debe ser una cadena hexadecimal de 32 caracteres")
+        try:
+            self._algorithm = algorithms.AES(bytes.fromhex(hex_key))
+        except ValueError as error:
+            raise ValueError("La llave debe ser una cadena hexadecimal de 32 caracteres") from error
+
+    def encrypt(self, plaintext: bytes, iv: bytes | None = None) -> bytes:
+        """Cifrar y entregar en base64 el IV más el texto cifrado"""
+        if len(plaintext) == 0:
+            raise ValueError("No se puede cifrar una cadena vacía")
+        if iv is None:
+            iv = os.urandom(self.BLOCK_SIZE)
+        relleno = self.BLOCK_SIZE - len(plaintext) % self.BLOCK_SIZE
+        encryptor = Cipher(self._algorithm, modes.CBC(iv)).encryptor()
+        return base64.b64encode(iv + encryptor.update(plaintext + bytes((relleno,)) * relleno) + encryptor.finalize())
+
+    def decrypt(self, b64_iv_ciphertext: bytes | str) -> bytes:
+        """Descifrar el base64 del IV más el texto cifrado y quitar el relleno"""
+        cryptogram = memoryview(base64.b64decode(b64_iv_ciphertext))
+        if len(cryptogram) < 2 * self.BLOCK_SIZE or len(cryptogram) % self.BLOCK_SIZE != 0:
+            raise ValueError("El texto cifrado no tiene el largo de un IV más bloques completos")
+        decryptor = Cipher(self._algorithm, modes.CBC(cryptogram[: self.BLOCK_SIZE])).decryptor()
+        plaintext = decryptor.update(cryptogram[self.BLOCK_SIZE :]) + decryptor.finalize()
+        relleno = plaintext[-1]
+        if relleno < 1 or relleno > self.BLOCK_SIZE or plaintext[-relleno:] != bytes((relleno,)) * relleno:
+            raise ValueError("El relleno del texto descifrado no es válido")
+        return plaintext[:-relleno]
@@ -0,0 +1,202 @@
+"""
+Bandeja de Resultados
+
+Con PAG_RESULTADOS_BANDEJA, /pag_pagos/resultado guarda el aviso cifrado del banco
+en pag_pagos_bandeja (ver sql/pag_pagos_bandeja.sql) y responde de inmediato. Esta
+tarea toma los avisos PENDIENTE en lotes de PAG_RESULTADOS_BANDEJA_LOTE, los
+descifra en el pool de procesos, descarta los folios repetidos y aplica el lote
+a los pagos y a la bandeja en una sola transacción.
+
+Toma los avisos con FOR UPDATE SKIP LOCKED y los marca TOMADO en una transacción
+corta, así varias instancias consumen la misma bandeja sin aplicar dos veces el
+mismo aviso y no se tienen bloqueos mientras se descifra. Si una instancia se
+detiene con avisos TOMADO, se vuelven a tomar después de TOMADO_CADUCA.
+
+Si el lote no se puede aplicar, se aplica de uno en uno; el aviso que falla
+regresa a PENDIENTE hasta agotar PAG_RESULTADOS_BANDEJA_INTENTOS y luego queda en
+ERROR con su mensaje, así un aviso que siempre falla no detiene a los demás.
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import String, and_, cast, column, func, or_, select, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..config.settings import Settings, get_settings
+from ..models.pag_pagos import PagPago
+from ..models.pag_pagos_bandeja import PagPagoBandeja
+from .database import async_session_maker, mark_written
+from .pag_resultados import Resultado, Salida, aplicar_lote, leer_resultados
+
+logger = logging.getLogger(__name__)
+
+# Tiempo después del cual un aviso TOMADO se considera abandonado por una instancia que se detuvo
+TOMADO_CADUCA = timedelta(minutes=5)
+
+
+class BandejaResultados:
+    """Tarea que aplica en lotes los avisos del banco guardados en la bandeja"""
+
+    def __init__(self, settings: Settings = get_settings()):
+        self.settings = settings
+        self._aviso = asyncio.Event()
+        self._consumidor: asyncio.Task | None = None
+
+    def avisar(self):
+        """Despertar al consumidor porque llegó un aviso"""
+        self._aviso.set()
+
+    async def _tomar(self) -> list[Row]:
+        """Marcar TOMADO los pendientes más antiguos que no tenga otra instancia, y los tomados que se abandonaron"""
+        tomables = (
+            select(PagPagoBandeja.id)
+            .where(
+                or_(
+                    PagPagoBandeja.estado == "PENDIENTE",
+                    and_(PagPagoBandeja.estado == "TOMADO", PagPagoBandeja.tomado < func.now() - TOMADO_CADUCA),
+                )
+            )
+            .order_by(PagPagoBandeja.recibido)
+            .limit(self.settings.PAG_RESULTADOS_BANDEJA_LOTE)
+            .with_for_update(skip_locked=True)
+        )
+        async with async_session_maker() as database:
+            avisos = (
+                await database.execute(
+                    update(PagPagoBandeja)
+                    .where(PagPagoBandeja.id.in_(tomables.scalar_subquery()))
+                    .values(estado="TOMADO", tomado=func.now(), intentos=PagPagoBandeja.intentos + 1)
+                    .returning(
+                        PagPagoBandeja.id, PagPagoBandeja.recibido, PagPagoBandeja.xml_encriptado, PagPagoBandeja.intentos
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            ).all()
+            await database.commit()
+        return sorted(avisos, key=lambda aviso: aviso.recibido)
+
+    async def _aplicar(self, avisos: list[Row], leidos: list[Resultado | str]) -> list[Salida]:
+        """Aplicar los avisos leídos a los pagos y cerrarlos en la bandeja, en una sola transacción"""
+        async with async_session_maker() as database:
+            salidas = await aplicar_lote(database, [(leido, aviso.recibido) for leido, aviso in zip(leidos, avisos)])
+
+            # Cerrar los avisos en otro UPDATE y terminar la transacción con un solo commit
+            lote = values(
+                column("id", UUID(as_uuid=True)),
+                column("estado", String),
+                column("folio", String),
+                column("pag_pago_id", UUID(as_uuid=True)),
+                column("mensaje", String),
+                name="salidas",
+            ).data(
+                [
+                    (aviso.id, salida.estado, salida.folio, salida.pag_pago_id, salida.mensaje)
+                    for aviso, salida in zip(avisos, salidas)
+                ]
+            )
+            await database.execute(
+                update(PagPagoBandeja)
+                .where(PagPagoBandeja.id == lote.c.id)
+                .values(
+                    estado=lote.c.estado,
+                    folio=lote.c.folio,
+                    # Con un solo aviso RECHAZADO el VALUES no trae el tipo del NULL
+                    pag_pago_id=cast(lote.c.pag_pago_id, UUID(as_uuid=True)),
+                    mensaje=lote.c.mensaje,
+                    procesado=func.now(),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await database.commit()
+        return salidas
+
+    async def _soltar(self, avisos: list[Row], error: Exception):
+        """Regresar a PENDIENTE los avisos que no se pudieron aplicar, o dejar en ERROR los que agotaron sus intentos"""
+        mensaje = str(error)[:256]
+        agotados = [aviso.id for aviso in avisos if aviso.intentos >= self.settings.PAG_RESULTADOS_BANDEJA_INTENTOS]
+        reintentar = [aviso.id for aviso in avisos if aviso.intentos < self.settings.PAG_RESULTADOS_BANDEJA_INTENTOS]
+        try:
+            async with async_session_maker() as database:
+                if agotados:
+                    await database.execute(
+                        update(PagPagoBandeja)
+                        .where(PagPagoBandeja.id.in_(agotados))
+                        .values(estado="ERROR", mensaje=mensaje, procesado=func.now())
+                    )
+                if reintentar:
+                    await database.execute(
+                        update(PagPagoBandeja)
+                        .where(PagPagoBandeja.id.in_(reintentar))
+                        .values(estado="PENDIENTE", mensaje=mensaje)
+                    )
+                await database.commit()
+        except SQLAlchemyError as error_soltar:
+            # Quedan TOMADO y se vuelven a tomar después de TOMADO_CADUCA
+            logger.error("No se pudieron soltar %s avisos de la bandeja: %s", len(avisos), error_soltar)
+
+    async def procesar_lote(self) -> int:
+        """Aplicar un lote de avisos pendientes, entrega cuántos se tomaron"""
+        avisos = await self._tomar()
+        if not avisos:
+            return 0
+
+        # Descifrar y leer los avisos en el pool de procesos, sin tener bloqueos
+        try:
+            leidos = await leer_resultados([aviso.xml_encriptado for aviso in avisos])
+        except Exception as error:
+            logger.error("No se pudieron leer %s avisos de la bandeja: %s", len(avisos), error)
+            await self._soltar(avisos, error)
+            return len(avisos)
+
+        # Aplicar el lote, si falla aplicar de uno en uno para apartar el aviso que lo impide
+        try:
+            salidas = await self._aplicar(avisos, leidos)
+        except SQLAlchemyError as error:
+            logger.warning("Falló un lote de %s avisos de la bandeja, se aplican de uno en uno: %s", len(avisos), error)
+            salidas = []
+            for aviso, leido in zip(avisos, leidos):
+                try:
+                    salidas += await self._aplicar([aviso], [leido])
+                except SQLAlchemyError as error_aviso:
+                    logger.error("Falló el aviso %s de la bandeja: %s", aviso.id, error_aviso)
+                    await self._soltar([aviso], error_aviso)
+        for salida in salidas:
+            if salida.estado == "APLICADO":
+                mark_written(PagPago.__tablename__, salida.pag_pago_id)
+        return len(avisos)
+
+    async def _consumir(self):
+        """Procesar lotes mientras haya pendientes, luego esperar un aviso o PAG_RESULTADOS_BANDEJA_ESPERA segundos"""
+        while True:
+            # Limpiar el aviso antes de tomar el lote, así no se pierde uno que llegue mientras se procesa
+            self._aviso.clear()
+            try:
+                tomados = await self.procesar_lote()
+            except Exception as error:
+                logger.error("Falló un lote de la bandeja de resultados: %s", error)
+                tomados = 0
+            if tomados >= self.settings.PAG_RESULTADOS_BANDEJA_LOTE:
+                continue
+            try:
+                await asyncio.wait_for(self._aviso.wait(), timeout=self.settings.PAG_RESULTADOS_BANDEJA_ESPERA)
+            except asyncio.TimeoutError:
+                pass
+
+    def iniciar(self):
+        """Arrancar el consumidor"""
+        if self._consumidor is None:
+            self._consumidor = asyncio.create_task(self._consumir())
+
+    async def detener(self):
+        """Cancelar el consumidor, los avisos que queden PENDIENTE se aplican al arrancar"""
+        if self._consumidor is not None:
+            self._consumidor.cancel()
+            await asyncio.gather(self._consumidor, return_exceptions=True)
+            self._consumidor = None
+
+
+bandeja_resultados = BandejaResultados()
@@ -0,0 +1,173 @@
+"""
+Catálogos Cache
+
+Mantiene en memoria los distritos, las autoridades y los trámites y servicios,
+indexados por su clave. Se cargan al arrancar, se vuelven a cargar cuando vence
+CATALOGOS_CACHE_TTL y cuando PostgreSQL envía un NOTIFY por el canal
+CATALOGOS_NOTIFY_CHANNEL con el nombre de la tabla que cambió (ver
+sql/catalogos_notify.sql). Mientras se vuelve a cargar se entrega lo anterior.
+
+Se cargan de la réplica de lectura, si hay DB_READ_HOST. Como la réplica puede
+llegar tarde al cambio que avisó el NOTIFY, esa recarga vence en
+DB_READ_YOUR_WRITES_SECONDS en lugar de CATALOGOS_CACHE_TTL y se vuelve a leer.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+import asyncpg
+from sqlalchemy import select
+
+from ..config.settings import Settings, get_settings
+from ..models.autoridades import Autoridad
+from ..models.distritos import Distrito
+from ..models.pag_tramites_servicios import PagTramiteServicio
+from .database import async_engine, async_read_engine, async_read_session_maker
+from .eager_loads import autoridad_eager_loads
+
+logger = logging.getLogger(__name__)
+
+
+class Catalogo:
+    """Registros de una tabla ordenados e indexados por clave"""
+
+    def __init__(self, registros: list, modificados: list[datetime]):
+        self.registros = sorted(registros, key=lambda registro: registro.clave)
+        self.por_clave = {registro.clave: registro for registro in self.registros}
+        # La versión cambia cuando se modifica, agrega o elimina algún registro
+        ultimo = max(modificados).isoformat() if modificados else ""
+        self.version = f"{len(self.registros)}-{ultimo}"
+
+    def get(self, clave: str):
+        """Entregar el registro con esa clave o None"""
+        return self.por_clave.get(clave)
+
+
+class CatalogosCache:
+    """Catálogos en memoria"""
+
+    TABLAS = [Distrito.__tablename__, Autoridad.__tablename__, PagTramiteServicio.__tablename__]
+
+    # Las autoridades llevan cargado su distrito
+    DEPENDIENTES = {
+        Distrito.__tablename__: [Autoridad.__tablename__],
+    }
+
+    def __init__(self, settings: Settings = get_settings()):
+        self.settings = settings
+        self._catalogos: dict[str, Catalogo] = {}
+        self._vencimientos: dict[str, float] = {}
+        self._recargas: dict[str, asyncio.Task] = {}
+        self._locks = {tabla: asyncio.Lock() for tabla in self.TABLAS}
+
+    @staticmethod
+    def _consulta(tabla: str):
+        """Consulta de todos los registros de la tabla"""
+        if tabla == Autoridad.__tablename__:
+            return select(Autoridad).options(*autoridad_eager_loads())
+        if tabla == Distrito.__tablename__:
+            return select(Distrito)
+        return select(PagTramiteServicio)
+
+    async def _cargar(self, tabla: str, ttl: int | None = None) -> Catalogo:
+        """Consultar la tabla en la réplica y reemplazar su catálogo, vence en ttl o en CATALOGOS_CACHE_TTL segundos"""
+        async with self._locks[tabla]:
+            vencimiento = time.monotonic() + (self.settings.CATALOGOS_CACHE_TTL if ttl is None else ttl)
+            async with async_read_session_maker() as database:
+                registros = (await database.scalars(self._consulta(tabla))).all()
+            modificados = [registro.modificado for registro in registros]
+            if tabla == Autoridad.__tablename__:
+                modificados += [registro.distrito.modificado for registro in registros]
+            catalogo = Catalogo(list(registros), modificados)
+            self._catalogos[tabla] = catalogo
+            self._vencimientos[tabla] = vencimiento
+            return catalogo
+
+    async def _recargar(self, tabla: str, ttl: int | None = None):
+        """Volver a cargar en segundo plano, si falla se queda lo anterior"""
+        try:
+            await self._cargar(tabla, ttl)
+        except Exception as error:
+            logger.warning("No se pudo recargar el catálogo %s: %s", tabla, error)
+
+    def _programar_recarga(self, tabla: str, ttl: int | None = None):
+        """Programar una sola recarga a la vez por tabla"""
+        recarga = self._recargas.get(tabla)
+        if recarga is None or recarga.done():
+            self._recargas[tabla] = asyncio.create_task(self._recargar(tabla, ttl))
+
+    async def get(self, tabla: str) -> Catalogo:
+        """Entregar el catálogo de la tabla, cargándolo si nunca se ha cargado"""
+        catalogo = self._catalogos.get(tabla)
+        if catalogo is None:
+            return await self._cargar(tabla)
+        if self._vencimientos[tabla] < time.monotonic():
+            self._programar_recarga(tabla)
+        return catalogo
+
+    async def distritos(self) -> Catalogo:
+        """Catálogo de distritos"""
+        return await self.get(Distrito.__tablename__)
+
+    async def autoridades(self) -> Catalogo:
+        """Catálogo de autoridades, con su distrito cargado"""
+        return await self.get(Autoridad.__tablename__)
+
+    async def pag_tramites_servicios(self) -> Catalogo:
+        """Catálogo de trámites y servicios"""
+        return await self.get(PagTramiteServicio.__tablename__)
+
+    async def cargar(self):
+        """Cargar todos los catálogos"""
+        for tabla in self.TABLAS:
+            await self._cargar(tabla)
+
+    def invalidar(self, tabla: str):
+        """Vencer el catálogo de la tabla, y los que dependen de él, y recargarlos"""
+        # Con réplica, volver a leer cuando ya debió llegarle el cambio
+        ttl = None if async_read_engine is async_engine else self.settings.DB_READ_YOUR_WRITES_SECONDS
+        for vencida in [tabla] + self.DEPENDIENTES.get(tabla, []):
+            if vencida in self._catalogos:
+                self._vencimientos[vencida] = 0.0
+                self._programar_recarga(vencida, ttl)
+
+    async def escuchar(self):
+        """Escuchar los NOTIFY de PostgreSQL y recargar los catálogos que cambiaron"""
+        reconexion = False
+        while True:
+            try:
+                await self._escuchar(reconexion)
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as error:
+                logger.warning("Se perdió la conexión para escuchar los catálogos: %s", error)
+            reconexion = True
+            await asyncio.sleep(10)
+
+    async def _escuchar(self, reconexion: bool):
+        """Escuchar con una conexión dedicada hasta que se pierda"""
+        conexion = await asyncpg.connect(
+            host=self.settings.DB_HOST,
+            port=self.settings.DB_PORT,
+            user=self.settings.DB_USER,
+            password=self.settings.DB_PASS,
+            database=self.settings.DB_NAME,
+        )
+        try:
+            await conexion.add_listener(
+                self.settings.CATALOGOS_NOTIFY_CHANNEL,
+                lambda _conexion, _pid, _canal, tabla: self.invalidar(tabla),
+            )
+            # Al reconectar, se pudieron perder avisos mientras no se escuchaba
+            if reconexion:
+                for tabla in list(self._catalogos):
+                    self.invalidar(tabla)
+            # Comprobar cada minuto que la conexión sigue viva
+            while True:
+                await asyncio.sleep(60)
+                await conexion.execute("SELECT 1")
+        finally:
+            await conexion.close(timeout=5)
+
+
+catalogos = CatalogosCache()
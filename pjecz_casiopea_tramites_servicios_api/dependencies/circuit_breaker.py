@@ -0,0 +1,130 @@
+"""
+Circuit Breaker, corta las llamadas a un servicio externo que está fallando
+
+- CERRADO: las llamadas pasan; tras `fallos` errores seguidos se abre
+- ABIERTO: las llamadas se rechazan sin esperar durante `espera` segundos
+- SEMIABIERTO: pasa una sola llamada de prueba; si responde se cierra, si falla se vuelve a abrir
+
+Además lleva las latencias y los errores de las últimas llamadas, de ahí sale
+el tiempo de espera adaptativo: el p99 reciente por un factor, entre un mínimo
+y el máximo configurado. Las llamadas que se agotan cuentan en el p99 con su
+tiempo de espera, así, si el servicio se vuelve más lento, el tiempo de espera
+crece en lugar de agotar todas las llamadas. La llamada de prueba espera el
+máximo, para que un servicio sano pero más lento pueda cerrar el circuito.
+"""
+
+import math
+import time
+from collections import deque
+
+CERRADO = "CERRADO"
+ABIERTO = "ABIERTO"
+SEMIABIERTO = "SEMIABIERTO"
+
+
+def percentil(valores: list[float], porcentaje: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada, 0 si está vacía"""
+    if not valores:
+        return 0.0
+    return valores[max(0, math.ceil(porcentaje / 100 * len(valores)) - 1)]
+
+
+class CircuitBreaker:
+    """Circuit breaker con estadísticas de latencia y errores de las últimas llamadas"""
+
+    def __init__(
+        self,
+        fallos: int,
+        espera: float,
+        ventana: int,
+        timeout_maximo: float,
+        timeout_minimo: float,
+        timeout_factor: float,
+        muestras_minimas: int = 20,
+    ):
+        self.fallos = fallos
+        self.espera = espera
+        self.timeout_maximo = timeout_maximo
+        self.timeout_minimo = timeout_minimo
+        self.timeout_factor = timeout_factor
+        self.muestras_minimas = muestras_minimas
+        self.estado = CERRADO
+        self.fallos_seguidos = 0
+        self.abierto_desde = 0.0
+        self.prueba_desde = 0.0
+        # Últimas llamadas como (duración en segundos, si tuvo éxito, si cuenta para el p99)
+        self._llamadas: deque[tuple[float, bool, bool]] = deque(maxlen=ventana)
+        self.llamadas = 0
+        self.errores = 0
+        self.rechazadas = 0
+        self.aperturas = 0
+
+    def permitir(self) -> bool:
+        """Decidir si una llamada puede pasar, cuenta las rechazadas"""
+        if self.estado == ABIERTO and time.monotonic() - self.abierto_desde >= self.espera:
+            self.estado = SEMIABIERTO
+        if self.estado == CERRADO:
+            return True
+        # Si la prueba se canceló sin registrar su resultado, pasado el tiempo máximo se permite otra
+        ahora = time.monotonic()
+        if self.estado == SEMIABIERTO and ahora - self.prueba_desde >= self.timeout_maximo:
+            self.prueba_desde = ahora
+            return True
+        self.rechazadas += 1
+        return False
+
+    def registrar_exito(self, duracion: float):
+        """Registrar una llamada que respondió, cierra el circuito"""
+        self.llamadas += 1
+        self._llamadas.append((duracion, True, True))
+        self.fallos_seguidos = 0
+        self.prueba_desde = 0.0
+        self.estado = CERRADO
+
+    def registrar_fallo(self, duracion: float, agotada: bool = False):
+        """Registrar una llamada que falló, abre el circuito si es la prueba o si se juntan los fallos
+
+        Si se agotó su tiempo de espera, su duración cuenta en el p99 del tiempo de espera adaptativo.
+        """
+        self.llamadas += 1
+        self.errores += 1
+        self._llamadas.append((duracion, False, agotada))
+        self.fallos_seguidos += 1
+        if self.estado == SEMIABIERTO or self.fallos_seguidos >= self.fallos:
+            if self.estado != ABIERTO:
+                self.aperturas += 1
+            self.estado = ABIERTO
+            self.abierto_desde = time.monotonic()
+        self.prueba_desde = 0.0
+
+    def latencias(self) -> list[float]:
+        """Duraciones ordenadas de las últimas llamadas que respondieron o que se agotaron"""
+        return sorted(duracion for duracion, _, cuenta in self._llamadas if cuenta)
+
+    def timeout(self) -> float:
+        """Tiempo de espera para la siguiente llamada, a partir del p99 reciente, el máximo para la prueba"""
+        if self.estado == SEMIABIERTO:
+            return self.timeout_maximo
+        latencias = self.latencias()
+        if len(latencias) < self.muestras_minimas:
+            return self.timeout_maximo
+        return min(self.timeout_maximo, max(self.timeout_minimo, percentil(latencias, 99) * self.timeout_factor))
+
+    def estadisticas(self) -> dict:
+        """Estado del circuito y estadísticas de las últimas llamadas"""
+        latencias = self.latencias()
+        recientes = len(self._llamadas)
+        errores_recientes = sum(1 for _, exito, _ in self._llamadas if not exito)
+        return {
+            "estado": self.estado,
+            "llamadas": self.llamadas,
+            "errores": self.errores,
+            "rechazadas": self.rechazadas,
+            "aperturas": self.aperturas,
+            "recientes": recientes,
+            "tasa_errores": errores_recientes / recientes if recientes else 0.0,
+            "latencia_p50_ms": percentil(latencias, 50) * 1000,
+            "latencia_p95_ms": percentil(latencias, 95) * 1000,
+            "latencia_p99_ms": percentil(latencias, 99) * 1000,
+            "timeout_s": self.timeout(),
+        }
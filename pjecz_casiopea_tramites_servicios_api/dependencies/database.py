@@ -2,33 +2,86 @@
 Database
 """
 
-from typing import Annotated
+import time
+from typing import Annotated, AsyncIterator
 
 from fastapi import Depends
-from sqlalchemy import Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import Session, sessionmaker
 
 from ..config.settings import Settings, get_settings
+from .database_pool import StatsAsyncAdaptedQueuePool, count_queries
 
 Base = declarative_base()
 
 
-def get_engine(settings: Settings = get_settings()) -> Engine:
-    """Database engine"""
-    return create_engine(
-        f"postgresql+psycopg2://{settings.DB_USER}:{settings.DB_PASS}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+def get_pool_options(settings: Settings) -> dict:
+    """Database pool options"""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
+def get_async_engine(settings: Settings = get_settings()) -> AsyncEngine:
+    """Database async engine"""
+    new_engine = create_async_engine(
+        f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASS}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}",
+        poolclass=StatsAsyncAdaptedQueuePool,
+        **get_pool_options(settings),
     )
+    count_queries(new_engine.sync_engine)
+    return new_engine
+
+
+def get_async_read_engine(settings: Settings = get_settings()) -> AsyncEngine:
+    """Database async engine for the read-only replica, or the primary if there is no replica"""
+    if settings.DB_READ_HOST == "":
+        return async_engine
+    new_engine = create_async_engine(
+        f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASS}@{settings.DB_READ_HOST}:{settings.DB_READ_PORT}/{settings.DB_NAME}",
+        poolclass=StatsAsyncAdaptedQueuePool,
+        **get_pool_options(settings),
+    )
+    count_queries(new_engine.sync_engine)
+    return new_engine
+
+
+async_engine = get_async_engine()
+async_session_maker = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_engine)
 
+async_read_engine = get_async_read_engine()
+async_read_session_maker = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=async_read_engine)
 
-engine = get_engine()
-session_maker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Momento en que se escribieron los registros recientes, para leerlos del primario
+_recent_writes: dict[tuple[str, str], float] = {}
+
+
+def mark_written(table: str, key, settings: Settings = get_settings()):
+    """Mark a row as just written, so that reads of it go to the primary for a while"""
+    now = time.monotonic()
+    if len(_recent_writes) > 10000:
+        for expired in [item for item, until in _recent_writes.items() if until < now]:
+            del _recent_writes[expired]
+    _recent_writes[(table, str(key))] = now + settings.DB_READ_YOUR_WRITES_SECONDS
+
+
+def is_recently_written(table: str, key) -> bool:
+    """Was the row written recently by this instance?"""
+    until = _recent_writes.get((table, str(key)))
+    return until is not None and until >= time.monotonic()
+
+
+async def get_async_db(settings: Annotated[Settings, Depends(get_settings)]) -> AsyncIterator[AsyncSession]:
+    """Database async session"""
+    async with async_session_maker() as database:
+        yield database
 
 
-def get_db(settings: Annotated[Settings, Depends(get_settings)]) -> Session:
-    """Database session"""
-    database = session_maker()
-    try:
+async def get_async_read_db(settings: Annotated[Settings, Depends(get_settings)]) -> AsyncIterator[AsyncSession]:
+    """Database async session on the read-only replica"""
+    async with async_read_session_maker() as database:
         yield database
-    finally:
-        database.close()
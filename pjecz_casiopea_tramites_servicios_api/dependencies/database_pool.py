@@ -0,0 +1,105 @@
+"""
+Database Pool, pools de conexiones que llevan estadísticas
+"""
+
+import threading
+import time
+
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """Contadores de las entregas de conexiones de un pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.queries = 0
+        self.commits = 0
+
+    def registrar_entrega(self, espera: float):
+        """Registrar una conexión entregada y el tiempo que se esperó por ella"""
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += espera
+            self.wait_max = max(self.wait_max, espera)
+
+    def registrar_fallo(self, espera: float):
+        """Registrar una conexión que no se pudo entregar"""
+        with self._lock:
+            self.checkout_failures += 1
+            self.wait_total += espera
+            self.wait_max = max(self.wait_max, espera)
+
+    def registrar_consulta(self):
+        """Registrar una consulta enviada a la base de datos"""
+        with self._lock:
+            self.queries += 1
+
+    def registrar_commit(self):
+        """Registrar una transacción terminada con commit"""
+        with self._lock:
+            self.commits += 1
+
+
+class _StatsPoolMixin:
+    """Mide el tiempo de espera de cada entrega de conexión"""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except Exception:
+            self.stats.registrar_fallo(time.perf_counter() - inicio)
+            raise
+        self.stats.registrar_entrega(time.perf_counter() - inicio)
+        return conexion
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class StatsAsyncAdaptedQueuePool(_StatsPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool con estadísticas"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+
+def count_queries(engine: Engine):
+    """Contar en las estadísticas del pool cada consulta y cada commit que ejecute el engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _registrar_consulta(conn, cursor, statement, parameters, context, executemany):
+        engine.pool.stats.registrar_consulta()
+
+    @event.listens_for(engine, "commit")
+    def _registrar_commit(conn):
+        engine.pool.stats.registrar_commit()
+
+
+def get_pool_stats(pool: StatsAsyncAdaptedQueuePool) -> dict:
+    """Entregar el estado y las estadísticas de un pool"""
+    stats = pool.stats
+    intentos = stats.checkouts + stats.checkout_failures
+    return {
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": stats.checkouts,
+        "checkout_failures": stats.checkout_failures,
+        "wait_avg_ms": round(stats.wait_total / intentos * 1000, 3) if intentos else 0.0,
+        "wait_max_ms": round(stats.wait_max * 1000, 3),
+        "queries": stats.queries,
+        "commits": stats.commits,
+    }
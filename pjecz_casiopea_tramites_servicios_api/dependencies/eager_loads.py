@@ -0,0 +1,57 @@
+"""
+Eager Loads
+
+Opciones de carga para que las consultas de autoridades traigan en la misma
+consulta las relaciones que leen sus esquemas. Las relaciones de los
+modelos son lazy="raise_on_sql", así que si falta alguna aquí se sabrá al
+momento en lugar de hacer una consulta por registro.
+
+Para solo leer, como el detalle de un pago, las proyecciones traen únicamente
+las columnas del esquema en una consulta con los JOIN.
+"""
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from ..models.autoridades import Autoridad
+from ..models.cit_clientes import CitCliente
+from ..models.distritos import Distrito
+from ..models.pag_pagos import PagPago
+from ..models.pag_tramites_servicios import PagTramiteServicio
+
+
+def autoridad_eager_loads() -> list[LoaderOption]:
+    """Autoridad con su distrito, para AutoridadOut"""
+    return [joinedload(Autoridad.distrito, innerjoin=True)]
+
+
+def pag_pago_out_select() -> Select:
+    """Columnas de PagPagoOut, más estatus, de un pago con sus relaciones, sin el XML del banco"""
+    return (
+        select(
+            PagPago.id,
+            PagPago.estatus,
+            Autoridad.clave.label("autoridad_clave"),
+            Autoridad.descripcion.label("autoridad_descripcion"),
+            Distrito.clave.label("distrito_clave"),
+            Distrito.nombre.label("distrito_nombre"),
+            CitCliente.email.label("cit_cliente_email"),
+            func.concat_ws(" ", CitCliente.nombres, CitCliente.apellido_primero, CitCliente.apellido_segundo).label(
+                "cit_cliente_nombre"
+            ),
+            PagTramiteServicio.clave.label("pag_tramite_servicio_clave"),
+            PagTramiteServicio.descripcion.label("pag_tramite_servicio_descripcion"),
+            PagPago.cantidad,
+            PagPago.descripcion,
+            PagPago.estado,
+            PagPago.folio,
+            PagPago.resultado_tiempo,
+            PagPago.total,
+            PagPago.url,
+        )
+        .join(PagPago.autoridad)
+        .join(PagPago.distrito)
+        .join(PagPago.cit_cliente)
+        .join(PagPago.pag_tramite_servicio)
+    )
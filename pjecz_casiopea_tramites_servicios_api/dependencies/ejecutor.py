@@ -0,0 +1,117 @@
+"""
+Ejecutor acotado, corre trabajo de CPU fuera del event loop
+
+Un pool de `hilos` hilos con a lo más `cola` trabajos entre los que esperan y los
+que corren; si la cola está llena, el que llama espera su lugar sin bloquear el
+event loop. El lugar se libera cuando el trabajo termina en su hilo, aunque se
+haya cancelado al que lo espera. Lleva la espera en la cola y la duración de los
+últimos trabajos.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, TypeVar
+
+from .circuit_breaker import percentil
+
+T = TypeVar("T")
+
+
+class EjecutorAcotado:
+    """Pool de hilos con la cola acotada y estadísticas de espera y duración"""
+
+    def __init__(self, nombre: str, hilos: int, cola: int, ventana: int):
+        self.nombre = nombre
+        self.hilos = hilos
+        self.cola = cola
+        self._executor: ThreadPoolExecutor | None = None
+        self._lugares: asyncio.Semaphore | None = None
+        # Últimos trabajos como (segundos en la cola, segundos corriendo)
+        self._trabajos: deque[tuple[float, float]] = deque(maxlen=ventana)
+        self._candado = threading.Lock()
+        self.en_cola = 0
+        self.en_curso = 0
+        self.esperando_lugar = 0
+        self.ejecutados = 0
+        self.errores = 0
+
+    def _correr(self, funcion: Callable[..., T], args: tuple, enviado: float) -> T:
+        """Correr en un hilo del pool, midiendo la espera y la duración"""
+        inicio = time.perf_counter()
+        with self._candado:
+            self.en_cola -= 1
+            self.en_curso += 1
+        error = False
+        try:
+            return funcion(*args)
+        except Exception:
+            error = True
+            raise
+        finally:
+            with self._candado:
+                self.en_curso -= 1
+                self.ejecutados += 1
+                self.errores += error
+                self._trabajos.append((inicio - enviado, time.perf_counter() - inicio))
+
+    def _liberar(self, loop: asyncio.AbstractEventLoop, lugares: asyncio.Semaphore, futuro: Future):
+        """Devolver el lugar en el event loop cuando el trabajo termina, o cuando se cancela antes de correr"""
+        if futuro.cancelled():
+            with self._candado:
+                self.en_cola -= 1
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(lugares.release)
+
+    async def ejecutar(self, funcion: Callable[..., T], *args) -> T:
+        """Correr funcion(*args) en el pool y esperar su resultado, espera un lugar si la cola está llena"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix=self.nombre)
+            self._lugares = asyncio.Semaphore(self.cola)
+        executor, lugares = self._executor, self._lugares
+        self.esperando_lugar += 1
+        try:
+            await lugares.acquire()
+        finally:
+            self.esperando_lugar -= 1
+        with self._candado:
+            self.en_cola += 1
+        try:
+            futuro = executor.submit(self._correr, funcion, args, time.perf_counter())
+        except BaseException:
+            with self._candado:
+                self.en_cola -= 1
+            lugares.release()
+            raise
+        futuro.add_done_callback(partial(self._liberar, asyncio.get_running_loop(), lugares))
+        return await asyncio.wrap_future(futuro)
+
+    def cerrar(self):
+        """Terminar los hilos del pool, se vuelve a crear con el siguiente trabajo"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._lugares = None
+
+    def estadisticas(self) -> dict:
+        """Ocupación de la cola y percentiles de espera y duración de los últimos trabajos"""
+        with self._candado:
+            trabajos = list(self._trabajos)
+        esperas = sorted(espera for espera, _ in trabajos)
+        duraciones = sorted(duracion for _, duracion in trabajos)
+        return {
+            "hilos": self.hilos,
+            "cola": self.cola,
+            "en_cola": self.en_cola,
+            "en_curso": self.en_curso,
+            "esperando_lugar": self.esperando_lugar,
+            "ejecutados": self.ejecutados,
+            "errores": self.errores,
+            "espera_p50_ms": percentil(esperas, 50) * 1000,
+            "espera_p99_ms": percentil(esperas, 99) * 1000,
+            "duracion_p50_ms": percentil(duraciones, 50) * 1000,
+            "duracion_p99_ms": percentil(duraciones, 99) * 1000,
+        }
@@ -0,0 +1,156 @@
+"""
+Enlaces de Pago
+
+Crea los enlaces de pago con el banco fuera de la petición del carro. El carro
+asíncrono inserta el pago con enlace_estado PENDIENTE (ver sql/pag_pagos_enlaces.sql)
+y avisa; ENLACES_PAGO_TRABAJADORES tareas toman los pendientes, piden el URL con
+create_pay_link, reintentando hasta ENLACES_PAGO_REINTENTOS veces, y lo guardan
+en pag_pagos.url con enlace_estado CREADO. Si no se logra, el pago queda
+CANCELADO con enlace_estado FALLIDO. Los clientes consultan
+GET /pag_pagos/{id}/estado hasta que aparezca el URL.
+
+Toman los pagos con FOR UPDATE SKIP LOCKED y los marcan TOMADO, así varias
+instancias comparten los pendientes sin pedir dos veces el mismo enlace. Si una
+instancia se detiene con pagos TOMADO, otra los vuelve a tomar después de
+TOMADO_CADUCA. Solo el carro asíncrono marca sus pagos, los del carro síncrono
+nunca se toman.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import and_, func, or_, select, update
+
+from ..config.settings import Settings, get_settings
+from ..models.pag_pagos import PagPago
+from ..models.pag_tramites_servicios import PagTramiteServicio
+from .database import async_session_maker, mark_written
+from .santander_web_pay_plus import (
+    WPP_BREAKER_ESPERA,
+    SantanderWebPayPlusAnyError,
+    SantanderWebPayPlusCircuitOpenError,
+    SantanderWebPayPlusMissingConfigurationError,
+    create_pay_link,
+)
+
+logger = logging.getLogger(__name__)
+
+# Segundos que se espera antes del primer reintento, se duplica en cada uno
+ESPERA_REINTENTO = 1.0
+
+# Tiempo después del cual un pago TOMADO se considera abandonado por una instancia que se detuvo
+TOMADO_CADUCA = timedelta(minutes=5)
+
+
+class EnlacesPago:
+    """Trabajadores que crean los enlaces de los pagos pendientes"""
+
+    def __init__(self, settings: Settings = get_settings()):
+        self.settings = settings
+        self._aviso = asyncio.Event()
+        self._trabajadores: list[asyncio.Task] = []
+
+    def avisar(self):
+        """Despertar a los trabajadores porque se insertó un pago con enlace_estado PENDIENTE"""
+        self._aviso.set()
+
+    async def _tomar(self):
+        """Tomar el pendiente más antiguo que no tenga otra instancia, o uno TOMADO que se abandonó"""
+        async with async_session_maker() as database:
+            enlace = (
+                await database.execute(
+                    select(PagPago.id, PagPago.email, PagTramiteServicio.descripcion, PagPago.cit_cliente_id, PagPago.total)
+                    .join(PagPago.pag_tramite_servicio)
+                    .where(PagPago.estado == "SOLICITADO")
+                    .where(
+                        or_(
+                            PagPago.enlace_estado == "PENDIENTE",
+                            and_(PagPago.enlace_estado == "TOMADO", PagPago.enlace_tomado < func.now() - TOMADO_CADUCA),
+                        )
+                    )
+                    .order_by(PagPago.creado)
+                    .limit(1)
+                    .with_for_update(of=PagPago, skip_locked=True)
+                )
+            ).first()
+            if enlace is not None:
+                await database.execute(
+                    update(PagPago).where(PagPago.id == enlace.id).values(enlace_estado="TOMADO", enlace_tomado=func.now())
+                )
+            await database.commit()
+        return enlace
+
+    async def _guardar(self, pag_pago_id: uuid.UUID, enlace_estado: str, **valores):
+        """Guardar el URL o el nuevo estado del pago si sigue SOLICITADO, y terminar su enlace aunque ya no lo esté"""
+        async with async_session_maker() as database:
+            await database.execute(
+                update(PagPago).where(PagPago.id == pag_pago_id, PagPago.estado == "SOLICITADO").values(**valores)
+            )
+            await database.execute(update(PagPago).where(PagPago.id == pag_pago_id).values(enlace_estado=enlace_estado))
+            await database.commit()
+        mark_written(PagPago.__tablename__, pag_pago_id)
+
+    async def _procesar(self, enlace):
+        """Pedir el URL al banco, reintentando, y guardarlo"""
+        for intento in range(1, self.settings.ENLACES_PAGO_REINTENTOS + 1):
+            try:
+                url = await create_pay_link(
+                    pago_id=enlace.id,
+                    email=enlace.email,
+                    service_detail=enlace.descripcion,
+                    cit_client_id=enlace.cit_cliente_id,
+                    amount=float(enlace.total),
+                )
+            except SantanderWebPayPlusMissingConfigurationError as error:
+                logger.error("No se puede crear el enlace del pago %s: %s", enlace.id, error)
+                break
+            except SantanderWebPayPlusAnyError as error:
+                logger.warning("Intento %s del enlace del pago %s: %s", intento, enlace.id, error)
+                if intento < self.settings.ENLACES_PAGO_REINTENTOS:
+                    espera = ESPERA_REINTENTO * 2 ** (intento - 1)
+                    # Con el circuito abierto, esperar a que se permita probar de nuevo al banco
+                    if isinstance(error, SantanderWebPayPlusCircuitOpenError):
+                        espera = max(espera, WPP_BREAKER_ESPERA)
+                    await asyncio.sleep(espera)
+                continue
+            await self._guardar(enlace.id, "CREADO", url=url)
+            return
+        await self._guardar(enlace.id, "FALLIDO", estado="CANCELADO")
+
+    async def _trabajar(self):
+        """Tomar pendientes mientras haya, luego esperar un aviso o ENLACES_PAGO_ESPERA segundos"""
+        while True:
+            # Limpiar el aviso antes de tomar, así no se pierde uno que llegue mientras se toma o se procesa
+            self._aviso.clear()
+            try:
+                enlace = await self._tomar()
+            except Exception as error:
+                logger.error("No se pudo tomar un enlace pendiente: %s", error)
+                enlace = None
+            if enlace is not None:
+                try:
+                    await self._procesar(enlace)
+                except Exception as error:
+                    logger.error("Falló el enlace del pago %s: %s", enlace.id, error)
+                continue
+            try:
+                await asyncio.wait_for(self._aviso.wait(), timeout=self.settings.ENLACES_PAGO_ESPERA)
+            except asyncio.TimeoutError:
+                pass
+
+    async def iniciar(self):
+        """Arrancar los trabajadores, lo primero que hacen es tomar los pendientes"""
+        for _ in range(self.settings.ENLACES_PAGO_TRABAJADORES):
+            self._trabajadores.append(asyncio.create_task(self._trabajar()))
+
+    async def detener(self):
+        """Cancelar los trabajadores, los pagos que dejen TOMADO se vuelven a tomar después de TOMADO_CADUCA"""
+        for trabajador in self._trabajadores:
+            trabajador.cancel()
+        await asyncio.gather(*self._trabajadores, return_exceptions=True)
+        self._trabajadores.clear()
+
+
+enlaces_pago = EnlacesPago()
@@ -3,14 +3,21 @@ FastAPI Pagination Custom Page
 """
 
 from abc import ABC
-from typing import Any, Generic, Optional, Sequence, TypeVar
+from bisect import bisect_right
+from typing import Any, Generic, Literal, Optional, Sequence, TypeVar
 
 from fastapi import Query
-from fastapi_pagination.bases import AbstractPage, AbstractParams
+from fastapi_pagination.api import create_page, resolve_params
+from fastapi_pagination.bases import AbstractPage, AbstractParams, CursorRawParams
+from fastapi_pagination.cursor import decode_cursor, encode_cursor
 from fastapi_pagination.limit_offset import LimitOffsetParams
 from fastapi_pagination.types import GreaterEqualOne, GreaterEqualZero
+from pydantic import BaseModel
 from typing_extensions import Self
 
+# Los catálogos se paginan en memoria, ahí solo none cambia algo: omite el total
+CountMode = Literal["exact", "cached", "estimated", "none"]
+
 
 class CustomPageParams(LimitOffsetParams):
     """
@@ -19,6 +26,7 @@ class CustomPageParams(LimitOffsetParams):
 
     offset: int = Query(0, ge=0, description="Page offset")
     limit: int = Query(10, ge=1, le=100, description="Page size limit")
+    count: Optional[CountMode] = Query(None, description="Total count mode, the endpoint's default if omitted")
 
 
 T = TypeVar("T")
@@ -52,12 +60,13 @@ class CustomPage(AbstractPage[T], Generic[T], ABC):
         """
         raw_params = params.to_raw_params().as_limit_offset()
 
-        if total is None or total == 0:
+        # Sin total, cuando el modo de conteo es "none", se decide por los registros
+        if total == 0 or (total is None and len(items) == 0):
             return cls(
                 success=False,
                 message="No se encontraron registros",
                 data=[],
-                total=0,
+                total=total,
                 limit=raw_params.limit,
                 offset=raw_params.offset,
             )
@@ -71,3 +80,123 @@ class CustomPage(AbstractPage[T], Generic[T], ABC):
             offset=raw_params.offset,
             **kwargs,
         )
+
+
+class CustomCursorParams(BaseModel, AbstractParams):
+    """
+    Custom Cursor Params
+    """
+
+    cursor: Optional[str] = Query(None, description="Page cursor")
+    limit: int = Query(10, ge=1, le=100, description="Page size limit")
+    include_total: bool = Query(False, description="Include the total count")
+
+    def to_raw_params(self) -> CursorRawParams:
+        """
+        Cursor Raw Params
+        """
+        return CursorRawParams(
+            cursor=decode_cursor(self.cursor, to_str=True),
+            size=self.limit,
+            include_total=self.include_total,
+        )
+
+
+class CustomCursorPage(AbstractPage[T], Generic[T], ABC):
+    """
+    Custom Cursor Page
+    """
+
+    success: bool
+    message: str
+    data: Sequence[T]
+
+    total: Optional[GreaterEqualZero] = None
+    limit: Optional[GreaterEqualOne]
+    next: Optional[str] = None
+
+    __params_type__ = CustomCursorParams
+
+    @classmethod
+    def create(
+        cls,
+        items: Sequence[T],
+        params: AbstractParams,
+        total: Optional[int] = None,
+        next_: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Self:
+        """
+        Create Custom Cursor Page
+        """
+        raw_params = params.to_raw_params().as_cursor()
+
+        if len(items) == 0:
+            return cls(
+                success=False,
+                message="No se encontraron registros",
+                data=[],
+                total=total,
+                limit=raw_params.size,
+                next=None,
+            )
+
+        return cls(
+            success=True,
+            message="Success",
+            data=items,
+            total=total,
+            limit=raw_params.size,
+            next=next_,
+            **kwargs,
+        )
+
+
+def paginate_by_clave(registros: Sequence[Any]) -> CustomCursorPage:
+    """
+    Paginate by clave, the registros must be ordered by clave
+    """
+    params = resolve_params()
+    raw_params = params.to_raw_params().as_cursor()
+
+    # Comenzar después de la última clave entregada, sin recorrer las anteriores
+    inicio = 0
+    if raw_params.cursor:
+        inicio = bisect_right(registros, raw_params.cursor, key=lambda registro: registro.clave)
+    items = registros[inicio : inicio + raw_params.size]
+
+    # El cursor de la siguiente página es la última clave de esta
+    next_ = None
+    if inicio + raw_params.size < len(registros):
+        next_ = encode_cursor(items[-1].clave)
+
+    return create_page(
+        items,
+        total=len(registros) if raw_params.include_total else None,
+        params=params,
+        next_=next_,
+    )
+
+
+def get_count_mode(params: AbstractParams, default: CountMode) -> CountMode:
+    """
+    Count mode requested, or the endpoint's default
+    """
+    count = getattr(params, "count", None)
+    return count if count is not None else default
+
+
+def paginate_with_count(registros: Sequence[Any], count_mode: CountMode) -> CustomPage:
+    """
+    Paginate a sequence in memory, the total is omitted when the count mode is "none"
+    """
+    params = resolve_params()
+    raw_params = params.to_raw_params().as_limit_offset()
+    items = registros[raw_params.offset : raw_params.offset + raw_params.limit]
+
+    # En memoria el total ya se conoce, así que exact, cached y estimated entregan el mismo
+    total = None
+    if get_count_mode(params, count_mode) != "none":
+        total = len(registros)
+
+    return create_page(items, total=total, params=params)
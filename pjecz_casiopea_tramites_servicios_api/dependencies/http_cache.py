@@ -0,0 +1,26 @@
+"""
+HTTP Cache, ETag, If-None-Match y Cache-Control
+"""
+
+import hashlib
+
+from fastapi import Request, Response, status
+
+
+def get_etag(request: Request, version: str) -> str:
+    """ETag fuerte a partir de la versión de los datos, la ruta y los parámetros de la petición"""
+    llave = f"{version}|{request.url.path}|{request.url.query}"
+    return '"' + hashlib.sha256(llave.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def not_modified_response(request: Request, response: Response, version: str, cache_control: str) -> Response | None:
+    """Poner ETag y Cache-Control en la respuesta, y entregar un 304 si el cliente ya tiene esa versión"""
+    etag = get_etag(request, version)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etiquetas = [etiqueta.strip().removeprefix("W/") for etiqueta in if_none_match.split(",")]
+        if "*" in etiquetas or etag in etiquetas:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,166 @@
+"""
+Idempotencia
+
+Guarda en pag_pagos_idempotencia (ver sql/pag_pagos_idempotencia.sql) la respuesta
+de una petición según su Idempotency-Key, para que los reintentos del cliente
+reciban la misma respuesta sin volver a ejecutarla, lleguen a la instancia que lleguen:
+
+- La primera petición toma la llave con INSERT ... ON CONFLICT DO NOTHING y la ejecuta
+- Las que lleguen con la misma llave mientras se ejecuta consultan la llave, cada vez más
+  espaciado, hasta que se guarde su respuesta; solo vuelven a tomarla si se borra o caduca
+- Si la respuesta fue exitosa se entrega igual a las que lleguen durante IDEMPOTENCY_KEY_TTL segundos
+- Si no fue exitosa, o causó una excepción, se borra la llave para que un reintento vuelva a ejecutarla
+
+La llave va con la huella del cuerpo de la petición; si se repite la llave con
+otro cuerpo se causa IdempotenciaConflictoError. Si la instancia que tomó la
+llave se cae antes de terminar, la llave caduca a los EN_CURSO y un reintento la
+vuelve a tomar.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..config.settings import Settings, get_settings
+from ..models.pag_pagos_idempotencia import PagPagoIdempotencia
+from .database import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+# Tiempo que tiene la primera petición para terminar, lo que esperan los reintentos
+EN_CURSO = timedelta(seconds=120)
+
+# Segundos entre cada consulta de los que esperan la respuesta, se duplica hasta ESPERA_MAXIMA
+ESPERA = 0.1
+ESPERA_MAXIMA = 2.0
+
+# Cada cuántas llaves tomadas se borran las caducadas
+PURGAR_CADA = 1000
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class IdempotenciaConflictoError(Exception):
+    """Error porque la llave ya se usó con otra petición o se sigue ejecutando"""
+
+
+def huella(*partes: str) -> str:
+    """Huella de una petición a partir de su cuerpo y parámetros"""
+    return hashlib.sha256("|".join(partes).encode()).hexdigest()
+
+
+class Idempotencia:
+    """Respuestas por Idempotency-Key guardadas en la base de datos"""
+
+    def __init__(self, settings: Settings = get_settings()):
+        self.settings = settings
+        self._tomadas = 0
+
+    async def _tomar(self, llave: str, huella_peticion: str) -> bool:
+        """Tomar la llave si nadie la tiene o si caducó"""
+        async with async_session_maker() as database:
+            # Borrar la llave si caducó, respondida o abandonada por una instancia que se cayó
+            await database.execute(
+                delete(PagPagoIdempotencia).where(
+                    PagPagoIdempotencia.llave == llave,
+                    PagPagoIdempotencia.caduca < func.now(),
+                )
+            )
+
+            # Tomarla, si otra petición la insertó al mismo tiempo, el ON CONFLICT espera a que termine su transacción
+            tomada = (
+                await database.execute(
+                    pg_insert(PagPagoIdempotencia)
+                    .values(llave=llave, huella=huella_peticion, caduca=func.now() + EN_CURSO)
+                    .on_conflict_do_nothing(index_elements=[PagPagoIdempotencia.llave])
+                    .returning(PagPagoIdempotencia.llave)
+                )
+            ).scalar_one_or_none() is not None
+
+            # De vez en cuando borrar todas las caducadas
+            if tomada:
+                self._tomadas += 1
+                if self._tomadas % PURGAR_CADA == 0:
+                    await database.execute(delete(PagPagoIdempotencia).where(PagPagoIdempotencia.caduca < func.now()))
+            await database.commit()
+        return tomada
+
+    async def _consultar(self, llave: str) -> Row | None:
+        """Consultar la huella, la respuesta y si caducó la llave, sin escribir"""
+        async with async_session_maker() as database:
+            return (
+                await database.execute(
+                    select(
+                        PagPagoIdempotencia.huella,
+                        PagPagoIdempotencia.respuesta,
+                        (PagPagoIdempotencia.caduca < func.now()).label("caducada"),
+                    ).where(PagPagoIdempotencia.llave == llave)
+                )
+            ).one_or_none()
+
+    async def _terminar(self, llave: str, huella_peticion: str, respuesta: BaseModel | None):
+        """Guardar la respuesta exitosa de la llave, o borrarla para que se pueda reintentar"""
+        if respuesta is None:
+            declaracion = delete(PagPagoIdempotencia)
+        else:
+            declaracion = update(PagPagoIdempotencia).values(
+                respuesta=respuesta.model_dump(mode="json"),
+                caduca=func.now() + timedelta(seconds=self.settings.IDEMPOTENCY_KEY_TTL),
+            )
+        try:
+            async with async_session_maker() as database:
+                await database.execute(
+                    declaracion.where(PagPagoIdempotencia.llave == llave, PagPagoIdempotencia.huella == huella_peticion)
+                )
+                await database.commit()
+        except SQLAlchemyError as error:
+            # La respuesta ya se tiene, si no se pudo guardar la llave caduca a los EN_CURSO
+            logger.error("No se pudo terminar la Idempotency-Key %s: %s", llave, error)
+
+    async def ejecutar(
+        self,
+        llave: str,
+        huella_peticion: str,
+        funcion: Callable[[], Awaitable[T]],
+        es_exitosa: Callable[[T], bool],
+        modelo: type[T],
+    ) -> T:
+        """Ejecutar la función una sola vez por llave y entregar su respuesta"""
+
+        # Tomar la llave, o esperar la respuesta de quien la tiene
+        limite = time.monotonic() + EN_CURSO.total_seconds()
+        espera = ESPERA
+        while not await self._tomar(llave, huella_peticion):
+            # Consultar sin escribir hasta que haya respuesta, o hasta que se borre o caduque para volver a tomarla
+            while (existente := await self._consultar(llave)) is not None and not existente.caducada:
+                if existente.huella != huella_peticion:
+                    raise IdempotenciaConflictoError("Esta Idempotency-Key ya se usó con otra petición")
+                if existente.respuesta is not None:
+                    return modelo.model_validate(existente.respuesta)
+                if time.monotonic() > limite:
+                    raise IdempotenciaConflictoError("Esta Idempotency-Key se sigue procesando")
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, ESPERA_MAXIMA)
+
+        # Ejecutar, si causa una excepción soltar la llave
+        try:
+            respuesta = await funcion()
+        except BaseException:
+            await self._terminar(llave, huella_peticion, None)
+            raise
+
+        # Guardar solo si fue exitosa
+        await self._terminar(llave, huella_peticion, respuesta if es_exitosa(respuesta) else None)
+        return respuesta
+
+
+idempotencia = Idempotencia()
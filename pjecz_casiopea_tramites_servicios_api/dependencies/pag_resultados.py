@@ -0,0 +1,237 @@
+"""
+Pag Resultados
+
+Leer los avisos cifrados del banco y aplicarlos a los pagos de muchos en muchos.
+
+- leer_resultados descifra y lee los avisos en un pool de PAG_RESULTADOS_PROCESOS
+  procesos, en partes de PAG_RESULTADOS_PARTE, para no ocupar el event loop
+- aplicar_lote cambia los pagos con UPDATE ... FROM (VALUES ...) de hasta
+  PAG_RESULTADOS_PARTE renglones y entrega lo que pasó con cada aviso
+
+Como en /pag_pagos/resultado, solo cambian los pagos SOLICITADO y activos, así
+que un aviso repetido no vuelve a cambiar un pago ya procesado.
+"""
+
+import asyncio
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, Text, column, select, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config.settings import get_settings
+from ..models.pag_pagos import PagPago
+from .safe_string import safe_uuid
+from .santander_web_pay_plus import RESPUESTA_EXITO, SantanderWebPayPlusAnyError, decrypt_chain, parse_bank_response
+
+# Pool de procesos para descifrar, se crea al primer lote
+_process_pool: ProcessPoolExecutor | None = None
+
+
+class ResultadoInvalidoError(Exception):
+    """Error porque el aviso del banco no se puede aplicar a un pago"""
+
+
+@dataclass
+class Resultado:
+    """Resultado del banco para un pago"""
+
+    pag_pago_id: uuid.UUID
+    estado: str
+    folio: str
+    resultado_xml: str
+
+
+@dataclass
+class Salida:
+    """Lo que pasó con un aviso: APLICADO, DUPLICADO, OMITIDO o RECHAZADO"""
+
+    estado: str
+    pag_pago_id: uuid.UUID | None = None
+    folio: str | None = None
+    mensaje: str | None = None
+
+
+def leer_resultado(xml_encriptado: str | None) -> Resultado:
+    """Descifrar y leer el aviso del banco, causa ResultadoInvalidoError si no se puede"""
+
+    # Validar el XML que mando el banco
+    if xml_encriptado is None or xml_encriptado.strip() == "":
+        raise ResultadoInvalidoError("El XML está vacío")
+
+    # Desencriptar el XML que mando el banco
+    try:
+        resultado_xml = decrypt_chain(xml_encriptado)
+        respuesta = parse_bank_response(resultado_xml)
+    except SantanderWebPayPlusAnyError as error:
+        raise ResultadoInvalidoError(f"No se pudo procesar el XML: {error}") from error
+
+    # Validar el pago_id
+    try:
+        pag_pago_id = safe_uuid(respuesta.pago_id)
+    except ValueError as error:
+        raise ResultadoInvalidoError("No es válido el ID del pago") from error
+
+    # Definir el estado, puede ser PAGADO o FALLIDO
+    estado = "PAGADO" if respuesta.respuesta == RESPUESTA_EXITO else "FALLIDO"
+
+    # Entregar
+    return Resultado(pag_pago_id=pag_pago_id, estado=estado, folio=respuesta.folio, resultado_xml=resultado_xml)
+
+
+def leer_parte(xmls_encriptados: list[str | None]) -> list[Resultado | str]:
+    """Leer varios avisos, de los que no se pueden leer entrega el mensaje del error, corre en el pool de procesos"""
+    leidos = []
+    for xml_encriptado in xmls_encriptados:
+        try:
+            leidos.append(leer_resultado(xml_encriptado))
+        except Exception as error:
+            leidos.append(str(error)[:256])
+    return leidos
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Pool de procesos para descifrar los lotes"""
+    global _process_pool
+    if _process_pool is None:
+        # Con spawn los procesos no heredan las conexiones ni los hilos del API
+        _process_pool = ProcessPoolExecutor(
+            max_workers=get_settings().PAG_RESULTADOS_PROCESOS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def close_process_pool():
+    """Terminar los procesos del pool"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+async def leer_resultados(xmls_encriptados: list[str | None]) -> list[Resultado | str]:
+    """Leer los avisos en partes repartidas en el pool de procesos, en el mismo orden, causa BrokenProcessPool si un proceso muere"""
+    parte = get_settings().PAG_RESULTADOS_PARTE
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    try:
+        partes = await asyncio.gather(
+            *[
+                loop.run_in_executor(pool, leer_parte, xmls_encriptados[inicio : inicio + parte])
+                for inicio in range(0, len(xmls_encriptados), parte)
+            ]
+        )
+    except BrokenProcessPool:
+        # El pool roto ya no acepta trabajos, quitarlo para que el siguiente lote cree otro
+        if _process_pool is pool:
+            close_process_pool()
+        raise
+    return [leido for leidos in partes for leido in leidos]
+
+
+async def aplicar_resultados(database: AsyncSession, resultados: list[tuple[Resultado, datetime]]) -> set[uuid.UUID]:
+    """
+    Aplicar los resultados, con su tiempo, en un solo UPDATE y entregar los id de los pagos que cambiaron
+
+    Cada pago debe venir una sola vez. No hace commit.
+    """
+    if not resultados:
+        return set()
+    lote = values(
+        column("id", UUID(as_uuid=True)),
+        column("estado", String),
+        column("folio", String),
+        column("resultado_tiempo", DateTime),
+        column("resultado_xml", Text),
+        name="resultados",
+    ).data(
+        [
+            (resultado.pag_pago_id, resultado.estado, resultado.folio, resultado_tiempo, resultado.resultado_xml)
+            for resultado, resultado_tiempo in resultados
+        ]
+    )
+    cambiados = await database.scalars(
+        update(PagPago)
+        .where(PagPago.id == lote.c.id)
+        .where(PagPago.estado == "SOLICITADO")
+        .where(PagPago.estatus == "A")
+        .values(
+            estado=lote.c.estado,
+            folio=lote.c.folio,
+            resultado_tiempo=lote.c.resultado_tiempo,
+            resultado_xml=lote.c.resultado_xml,
+        )
+        .returning(PagPago.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(cambiados)
+
+
+async def aplicar_lote(database: AsyncSession, leidos: list[tuple[Resultado | str, datetime]]) -> list[Salida]:
+    """
+    Aplicar los avisos leídos, con el tiempo en que se recibieron, y entregar una salida por aviso en el mismo orden
+
+    - RECHAZADO: no se pudo leer
+    - DUPLICADO: su folio ya está en el pago o se repite en el lote
+    - OMITIDO: el pago ya tiene otro aviso en el lote, no existe o ya fue procesado
+    - APLICADO: cambió el pago
+
+    Hace un UPDATE por cada PAG_RESULTADOS_PARTE avisos y una consulta para explicar
+    los que no cambiaron. No hace commit.
+    """
+    salidas: list[Salida | None] = [None] * len(leidos)
+
+    # Quedarse con el primer aviso de cada folio y de cada pago
+    folios_vistos = set()
+    pagos_vistos = set()
+    por_aplicar: list[tuple[int, Resultado, datetime]] = []
+    for numero, (resultado, recibido) in enumerate(leidos):
+        if isinstance(resultado, str):
+            salidas[numero] = Salida(estado="RECHAZADO", mensaje=resultado)
+        elif resultado.folio in folios_vistos:
+            salidas[numero] = Salida("DUPLICADO", resultado.pag_pago_id, resultado.folio, "Ese folio se repite en el lote")
+        elif resultado.pag_pago_id in pagos_vistos:
+            salidas[numero] = Salida("OMITIDO", resultado.pag_pago_id, resultado.folio, "Ese pago tiene otro aviso en el lote")
+        else:
+            folios_vistos.add(resultado.folio)
+            pagos_vistos.add(resultado.pag_pago_id)
+            por_aplicar.append((numero, resultado, recibido))
+
+    # Aplicar en partes, cada UPDATE lleva cinco parámetros por aviso
+    parte = get_settings().PAG_RESULTADOS_PARTE
+    cambiados = set()
+    for inicio in range(0, len(por_aplicar), parte):
+        cambiados |= await aplicar_resultados(
+            database, [(resultado, recibido) for _, resultado, recibido in por_aplicar[inicio : inicio + parte]]
+        )
+
+    # Explicar los que no cambiaron, si el pago ya tiene ese folio es un aviso repetido
+    sin_cambio = [resultado.pag_pago_id for _, resultado, _ in por_aplicar if resultado.pag_pago_id not in cambiados]
+    actuales = {}
+    if sin_cambio:
+        actuales = {
+            pag_pago.id: pag_pago
+            for pag_pago in await database.execute(
+                select(PagPago.id, PagPago.estatus, PagPago.folio).where(PagPago.id.in_(sin_cambio))
+            )
+        }
+    for numero, resultado, _ in por_aplicar:
+        if resultado.pag_pago_id in cambiados:
+            salidas[numero] = Salida("APLICADO", resultado.pag_pago_id, resultado.folio)
+        elif resultado.pag_pago_id not in actuales:
+            salidas[numero] = Salida("OMITIDO", resultado.pag_pago_id, resultado.folio, "No existe ese pago")
+        elif actuales[resultado.pag_pago_id].estatus != "A":
+            salidas[numero] = Salida("OMITIDO", resultado.pag_pago_id, resultado.folio, "Ese pago está eliminado")
+        elif actuales[resultado.pag_pago_id].folio == resultado.folio:
+            salidas[numero] = Salida("DUPLICADO", resultado.pag_pago_id, resultado.folio, "Ese folio ya fue aplicado")
+        else:
+            salidas[numero] = Salida("OMITIDO", resultado.pag_pago_id, resultado.folio, "Ese pago ya fue procesado")
+
+    # Entregar
+    return salidas
@@ -1,9 +1,15 @@
 """
 Safe string
+
+Las funciones que quitan acentos usan tablas por carácter para str.translate,
+con el resultado de unidecode para cada uno, en lugar de llamar a unidecode en
+cada cadena. Las expresiones regulares se compilan una vez y safe_string guarda
+en un LRU las cadenas cortas que ya normalizó.
 """
 
 import re
 import uuid
+from functools import lru_cache
 
 from unidecode import unidecode
 
@@ -17,6 +23,51 @@ QUINCENA_REGEXP = r"^\d{6}$"
 RFC_REGEXP = r"^[a-zA-Z]{3,4}\d{6}[a-zA-Z0-9]{3}$"
 TOKEN_REGEXP = r"^[a-zA-Z0-9_.=+-]+$"
 
+# Las cadenas más largas no se guardan en el LRU de safe_string
+SAFE_STRING_CACHE_LARGO = 256
+SAFE_STRING_CACHE_TAMANO = 4096
+
+# Los caracteres fuera de las tablas, desde 0x250, van a un LRU de este tamaño
+UNIDECODE_CACHE_TAMANO = 4096
+
+_ALFANUMERICOS = re.compile(r"[^a-zA-Z0-9]+")
+_CURP = re.compile(CURP_REGEXP)
+_DIGITOS = re.compile(r"[^0-9]+")
+_ESPACIOS = re.compile(r"\s+")
+_RFC = re.compile(RFC_REGEXP)
+_SIN_ACENTOS = re.compile(r"[^a-zA-Z0-9.()/-]+")
+_CON_ACENTOS = re.compile(r"[^a-záéíóúüA-ZÁÉÍÓÚÜ0-9.()/-]+")
+_CON_ACENTOS_ENIE = re.compile(r"[^a-záéíóúüñA-ZÁÉÍÓÚÜÑ0-9.()/-]+")
+
+
+@lru_cache(maxsize=UNIDECODE_CACHE_TAMANO)
+def _unidecode_caracter(codigo: int) -> str:
+    """unidecode de un carácter que no está en las tablas"""
+    return unidecode(chr(codigo))
+
+
+class _TablaUnidecode(dict):
+    """Tabla para str.translate con unidecode de cada carácter, los que no tiene los toma del LRU sin guardarlos"""
+
+    def __init__(self, conservar: str = ""):
+        super().__init__((ord(caracter), caracter) for caracter in conservar)
+        self.update((codigo, unidecode(chr(codigo))) for codigo in range(0x250) if codigo not in self)
+
+    def __missing__(self, codigo: int) -> str:
+        return _unidecode_caracter(codigo)
+
+
+# ASCII, Latin-1 y Latin extendido se calculan al importar, el resto pasa por un LRU acotado
+_UNIDECODE = _TablaUnidecode()
+_UNIDECODE_ENIE = _TablaUnidecode(conservar="ñÑ")
+
+
+def quitar_acentos(input_str: str, save_enie: bool = False) -> str:
+    """Lo mismo que unidecode, con la opción de conservar la ñ y la Ñ"""
+    if input_str.isascii():
+        return input_str
+    return input_str.translate(_UNIDECODE_ENIE if save_enie else _UNIDECODE)
+
 
 def safe_clave(input_str, max_len=16, only_digits=False, separator="-") -> str:
     """Safe clave"""
@@ -26,10 +77,10 @@ def safe_clave(input_str, max_len=16, only_digits=False, separator="-") -> str:
     if stripped == "":
         return ""
     if only_digits:
-        clean_string = re.sub(r"[^0-9]+", separator, stripped)
+        clean_string = _DIGITOS.sub(separator, stripped)
     else:
-        clean_string = re.sub(r"[^a-zA-Z0-9]+", separator, unidecode(stripped))
-    without_spaces = re.sub(r"\s+", "", clean_string)
+        clean_string = _ALFANUMERICOS.sub(separator, quitar_acentos(stripped))
+    without_spaces = _ESPACIOS.sub("", clean_string)
     final = without_spaces.upper()
     if len(final) > max_len:
         return final[:max_len]
@@ -43,10 +94,9 @@ def safe_curp(input_str, is_optional=False, search_fragment=False) -> str:
     stripped = input_str.strip()
     if is_optional and stripped == "":
         return ""
-    clean_string = re.sub(r"[^a-zA-Z0-9]+", " ", unidecode(stripped))
-    without_spaces = re.sub(r"\s+", "", clean_string)
+    without_spaces = _ALFANUMERICOS.sub("", quitar_acentos(stripped))
     final = without_spaces.upper()
-    if search_fragment is False and re.match(CURP_REGEXP, final) is None:
+    if search_fragment is False and _CURP.match(final) is None:
         raise ValueError("CURP inválida")
     return final
 
@@ -87,10 +137,9 @@ def safe_rfc(input_str, is_optional=False, search_fragment=False) -> str:
     stripped = input_str.strip()
     if is_optional and stripped == "":
         return ""
-    clean_string = re.sub(r"[^a-zA-Z0-9]+", " ", unidecode(stripped))
-    without_spaces = re.sub(r"\s+", "", clean_string)
+    without_spaces = _ALFANUMERICOS.sub("", quitar_acentos(stripped))
     final = without_spaces.upper()
-    if search_fragment is False and re.match(RFC_REGEXP, final) is None:
+    if search_fragment is False and _RFC.match(final) is None:
         raise ValueError("RFC inválido")
     return final
 
@@ -99,25 +148,25 @@ def safe_string(input_str, max_len=250, do_unidecode=True, save_enie=False, to_u
     """Safe string"""
     if not isinstance(input_str, str):
         return ""
+    if len(input_str) > SAFE_STRING_CACHE_LARGO:
+        return _safe_string(input_str, max_len, do_unidecode, save_enie, to_uppercase)
+    return _safe_string_cache(input_str, max_len, do_unidecode, save_enie, to_uppercase)
+
+
+def _safe_string(input_str: str, max_len: int, do_unidecode: bool, save_enie: bool, to_uppercase: bool) -> str:
+    """Normalizar la cadena para safe_string"""
     if do_unidecode:
-        new_string = re.sub(r"[^a-zA-Z0-9.()/-]+", " ", input_str)
         if save_enie:
-            new_string = ""
-            for char in input_str:
-                if char == "ñ":
-                    new_string += "ñ"
-                elif char == "Ñ":
-                    new_string += "Ñ"
-                else:
-                    new_string += unidecode(char)
+            # Conservando la ñ solo se quitan los acentos, no se filtran los caracteres
+            new_string = quitar_acentos(input_str, save_enie=True)
         else:
-            new_string = re.sub(r"[^a-zA-Z0-9.()/-]+", " ", unidecode(input_str))
+            new_string = _SIN_ACENTOS.sub(" ", quitar_acentos(input_str))
     else:
         if save_enie is False:
-            new_string = re.sub(r"[^a-záéíóúüA-ZÁÉÍÓÚÜ0-9.()/-]+", " ", input_str)
+            new_string = _CON_ACENTOS.sub(" ", input_str)
         else:
-            new_string = re.sub(r"[^a-záéíóúüñA-ZÁÉÍÓÚÜÑ0-9.()/-]+", " ", input_str)
-    removed_multiple_spaces = re.sub(r"\s+", " ", new_string)
+            new_string = _CON_ACENTOS_ENIE.sub(" ", input_str)
+    removed_multiple_spaces = _ESPACIOS.sub(" ", new_string)
     final = removed_multiple_spaces.strip()
     if to_uppercase:
         final = final.upper()
@@ -126,12 +175,15 @@ def safe_string(input_str, max_len=250, do_unidecode=True, save_enie=False, to_u
     return (final[:max_len] + "...") if len(final) > max_len else final
 
 
+_safe_string_cache = lru_cache(maxsize=SAFE_STRING_CACHE_TAMANO)(_safe_string)
+
+
 def safe_telefono(input_str) -> str:
     """Safe teléfono always ten digits"""
     if not isinstance(input_str, str) or input_str.strip() == "":
         return ""
     input_str = input_str.strip()
-    only_digits = re.sub(r"[^0-9]", "", input_str)
+    only_digits = _DIGITOS.sub("", input_str)
     if len(only_digits) == 10:
         return only_digits
     return ""
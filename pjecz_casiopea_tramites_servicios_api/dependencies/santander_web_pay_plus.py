@@ -2,16 +2,20 @@
 Santander Web Pay Plus
 """
 
-import asyncio
 import os
 import re
+import time
 import urllib
 import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from xml.parsers import expat
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
-from .AESEncryption import AES128Encryption
+from .AESEncryption import AES128Context
+from .circuit_breaker import CircuitBreaker
+from .ejecutor import EjecutorAcotado
 
 XML_ENCRYPT_REGEXP = r"^[a-zA-Z0-9=+\/]{32,}$"
 
@@ -23,12 +27,94 @@ load_dotenv()
 WPP_COMMERCE_ID = os.getenv("WPP_COMMERCE_ID", None)
 WPP_COMPANY_ID = os.getenv("WPP_COMPANY_ID", None)
 WPP_BRANCH_ID = os.getenv("WPP_BRANCH_ID", None)
+WPP_BREAKER_ESPERA = float(os.getenv("WPP_BREAKER_ESPERA", "30"))
+WPP_BREAKER_FALLOS = int(os.getenv("WPP_BREAKER_FALLOS", "5"))
+WPP_EJECUTOR_COLA = int(os.getenv("WPP_EJECUTOR_COLA", "256"))
+WPP_EJECUTOR_HILOS = int(os.getenv("WPP_EJECUTOR_HILOS", "4"))
+WPP_ESTADISTICAS_VENTANA = int(os.getenv("WPP_ESTADISTICAS_VENTANA", "200"))
 WPP_KEY = os.getenv("WPP_KEY", None)
+WPP_MAX_CONNECTIONS = int(os.getenv("WPP_MAX_CONNECTIONS", "20"))
+WPP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("WPP_MAX_KEEPALIVE_CONNECTIONS", "10"))
 WPP_PASS = os.getenv("WPP_PASS", None)
+WPP_RESPUESTA_MAXIMO = int(os.getenv("WPP_RESPUESTA_MAXIMO", "65536"))
 WPP_TIMEOUT = int(os.getenv("WPP_TIMEOUT", "12"))
+WPP_TIMEOUT_FACTOR = float(os.getenv("WPP_TIMEOUT_FACTOR", "3"))
+WPP_TIMEOUT_MINIMO = float(os.getenv("WPP_TIMEOUT_MINIMO", "2"))
 WPP_URL = os.getenv("WPP_URL", None)
 WPP_USER = os.getenv("WPP_USER", None)
 
+# Largo máximo del XML cifrado, el doble de WPP_RESPUESTA_MAXIMO cubre el base64, el IV, el relleno y los avances de línea
+WPP_CIFRADO_MAXIMO = 2 * WPP_RESPUESTA_MAXIMO
+
+
+# Cliente HTTP de larga vida, mantiene abiertas las conexiones con el banco entre carros
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Cliente HTTP para el banco, con un pool de conexiones limitado"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(WPP_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=WPP_MAX_CONNECTIONS,
+                max_keepalive_connections=WPP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    """Cerrar el cliente HTTP y sus conexiones"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# Contexto de cifrado con WPP_KEY, se crea al primer uso
+_cipher: AES128Context | None = None
+
+
+# Partes constantes de la cadena XML para el banco, se arman al primer carro
+_chain_xml_template: tuple[str, str, str, str] | None = None
+
+
+# Circuit breaker de las llamadas al banco, con el tiempo de espera a partir del p99 reciente
+breaker = CircuitBreaker(
+    fallos=WPP_BREAKER_FALLOS,
+    espera=WPP_BREAKER_ESPERA,
+    ventana=WPP_ESTADISTICAS_VENTANA,
+    timeout_maximo=WPP_TIMEOUT,
+    timeout_minimo=WPP_TIMEOUT_MINIMO,
+    timeout_factor=WPP_TIMEOUT_FACTOR,
+)
+
+
+# Hilos para cifrar, descifrar y armar o leer los XML sin ocupar el event loop
+ejecutor = EjecutorAcotado(
+    nombre="wpp",
+    hilos=WPP_EJECUTOR_HILOS,
+    cola=WPP_EJECUTOR_COLA,
+    ventana=WPP_ESTADISTICAS_VENTANA,
+)
+
+
+async def run_in_wpp_executor(funcion, *args):
+    """Correr funcion(*args) en los hilos de cifrado y esperar su resultado"""
+    return await ejecutor.ejecutar(funcion, *args)
+
+
+def close_executor():
+    """Terminar los hilos de cifrado"""
+    ejecutor.cerrar()
+
+
+def get_wpp_stats() -> dict:
+    """Estado del circuit breaker, estadísticas de las últimas llamadas al banco y de los hilos de cifrado"""
+    return {**breaker.estadisticas(), "ejecutor": ejecutor.estadisticas()}
+
 
 class SantanderWebPayPlusAnyError(Exception):
     """Base exception class"""
@@ -38,6 +124,10 @@ class SantanderWebPayPlusBankResponseInvalidError(SantanderWebPayPlusAnyError):
     """Error en la respuesta del banco"""
 
 
+class SantanderWebPayPlusCircuitOpenError(SantanderWebPayPlusAnyError):
+    """Error porque el banco ha fallado seguido y no se le envían peticiones por un tiempo"""
+
+
 class SantanderWebPayPlusConnectionError(SantanderWebPayPlusAnyError):
     """Error de conexión con el banco"""
 
@@ -78,6 +168,140 @@ class SantanderWebPayPlusXMLReadError(SantanderWebPayPlusAnyError):
     """Error"""
 
 
+@dataclass(frozen=True, slots=True)
+class BankResponse:
+    """Respuesta del banco con el resultado de un pago"""
+
+    pago_id: str
+    respuesta: str
+    folio: str
+    auth: str
+    email: str
+
+
+class _FieldsComplete(Exception):
+    """Ya se leyeron todas las etiquetas, para detener a expat"""
+
+
+def read_xml_fields(xml_str: str, tags: tuple[str, ...]) -> dict[str, str | None]:
+    """
+    Leer el texto de las etiquetas hijas de la raíz en una sola pasada con expat
+
+    Se detiene en cuanto tiene todas, como root.find entrega la primera de cada una
+    y solo el texto antes de su primer hijo. Rechaza el XML de más de WPP_RESPUESTA_MAXIMO
+    caracteres y el que declare un DOCTYPE, así no se expanden entidades.
+    """
+
+    # Validar el tamaño antes de leer
+    if len(xml_str) > WPP_RESPUESTA_MAXIMO:
+        raise SantanderWebPayPlusXMLReadError(f"Error porque el XML del banco tiene más de {WPP_RESPUESTA_MAXIMO} caracteres.")
+
+    campos: dict[str, str | None] = dict.fromkeys(tags)
+    leidas = set()
+    profundidad = 0
+    actual: str | None = None
+    partes: list[str] = []
+
+    def rechazar_doctype(*_):
+        raise SantanderWebPayPlusXMLReadError("Error porque el XML del banco declara un DOCTYPE.")
+
+    def inicio(nombre, _):
+        nonlocal profundidad, actual
+        profundidad += 1
+        if profundidad == 2 and nombre in campos and nombre not in leidas:
+            actual = nombre
+            partes.clear()
+        elif actual is not None and profundidad > 2:
+            # Como ElementTree, el texto termina en el primer hijo
+            campos[actual] = "".join(partes)
+            leidas.add(actual)
+            actual = None
+
+    def texto(datos):
+        if actual is not None:
+            partes.append(datos)
+
+    def fin(_):
+        nonlocal profundidad, actual
+        if actual is not None and profundidad == 2:
+            campos[actual] = "".join(partes)
+            leidas.add(actual)
+            actual = None
+        profundidad -= 1
+        if len(leidas) == len(campos):
+            raise _FieldsComplete()
+
+    parser = expat.ParserCreate()
+    parser.StartDoctypeDeclHandler = rechazar_doctype
+    parser.EntityDeclHandler = rechazar_doctype
+    parser.StartElementHandler = inicio
+    parser.CharacterDataHandler = texto
+    parser.EndElementHandler = fin
+    try:
+        parser.Parse(xml_str, True)
+    except _FieldsComplete:
+        pass
+    except expat.ExpatError as error:
+        raise SantanderWebPayPlusXMLReadError("Error porque el XML que dio el banco no es válido.") from error
+    return campos
+
+
+def escape_xml_text(text: str) -> str:
+    """Escapar el texto de un elemento como lo hace ElementTree"""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def xml_element(tag: str, text: str | None) -> str:
+    """Elemento sin atributos con su texto escapado, vacío como <tag /> igual que ElementTree"""
+    if not text:
+        return f"<{tag} />"
+    return f"<{tag}>{escape_xml_text(text)}</{tag}>"
+
+
+def get_chain_xml_template() -> tuple[str, str, str, str]:
+    """Partes constantes de la cadena XML, se arman una sola vez con la configuración"""
+    global _chain_xml_template
+    if _chain_xml_template is None:
+        # Validar WPP_COMPANY_ID
+        if WPP_COMPANY_ID is None:
+            raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_COMPANY_ID.")
+
+        # Validar WPP_BRANCH_ID
+        if WPP_BRANCH_ID is None:
+            raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_BRANCH_ID.")
+
+        # Validar WPP_USER
+        if WPP_USER is None:
+            raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_USER.")
+
+        # Validar WPP_PASS
+        if WPP_PASS is None:
+            raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_PASS.")
+
+        # Armar las partes constantes, entre ellas van la referencia y el importe, el correo, la descripción y el cliente
+        business = "".join(
+            [
+                xml_element("id_company", WPP_COMPANY_ID),
+                xml_element("id_branch", WPP_BRANCH_ID),
+                xml_element("user", WPP_USER),
+                xml_element("pwd", WPP_PASS),
+            ]
+        )
+        _chain_xml_template = (
+            f"<P><business>{business}</business><version>IntegraWPP</version><url>",
+            "<moneda>MXN</moneda><canal>W</canal><omitir_notif_default>0</omitir_notif_default><st_correo>1</st_correo>",
+            '<datos_adicionales><data id="1" display="true"><label>Servicio</label>',
+            '</data><data id="2" display="false"><label>Cliente ID</label>',
+        )
+    return _chain_xml_template
+
+
 def create_chain_xml(
     pago_id: int,
     amount: float,
@@ -85,82 +309,48 @@ def create_chain_xml(
     description: str,
     cit_client_id: int,
 ) -> str:
-    """Crear cadena XML"""
-
-    # Validar WPP_COMPANY_ID
-    if WPP_COMPANY_ID is None:
-        raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_COMPANY_ID.")
-
-    # Validar WPP_BRANCH_ID
-    if WPP_BRANCH_ID is None:
-        raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_BRANCH_ID.")
-
-    # Validar WPP_USER
-    if WPP_USER is None:
-        raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_USER.")
-
-    # Validar WPP_PASS
-    if WPP_PASS is None:
-        raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_PASS.")
-
-    # Inicializar XML
-    root = ET.Element("P")
-
-    # Inicializar datos de la organización
-    business = ET.SubElement(root, "business")
-    ET.SubElement(business, "id_company").text = WPP_COMPANY_ID
-    ET.SubElement(business, "id_branch").text = WPP_BRANCH_ID
-    ET.SubElement(business, "user").text = WPP_USER
-    ET.SubElement(business, "pwd").text = WPP_PASS
-
-    # Inicializar datos de la version
-    ET.SubElement(root, "version").text = "IntegraWPP"
-
-    # Inicializar datos del cliente y del pago
-    url = ET.SubElement(root, "url")
-    ET.SubElement(url, "reference").text = str(pago_id)
-    ET.SubElement(url, "amount").text = str(amount)
-    ET.SubElement(url, "moneda").text = "MXN"
-    ET.SubElement(url, "canal").text = "W"
-    ET.SubElement(url, "omitir_notif_default").text = "0"
-    ET.SubElement(url, "st_correo").text = "1"
-    ET.SubElement(url, "mail_cliente").text = email
-
-    # Inicializar datos adicionales
-    data = ET.SubElement(url, "datos_adicionales")
-
-    # Inicializar descripción del servicio
-    data1 = ET.SubElement(data, "data")
-    data1.attrib["id"] = "1"
-    data1.attrib["display"] = "true"
-    label1 = ET.SubElement(data1, "label")
-    label1.text = "Servicio"
-    value1 = ET.SubElement(data1, "value")
-    value1.text = description
-
-    # Inicializar descripción del cliente
-    data2 = ET.SubElement(data, "data")
-    data2.attrib["id"] = "2"
-    data2.attrib["display"] = "false"
-    label2 = ET.SubElement(data2, "label")
-    label2.text = "Cliente ID"
-    value2 = ET.SubElement(data2, "value")
-    value2.text = str(cit_client_id)
-
-    # Entregar cadena XML
-    return ET.tostring(root, encoding="unicode")
-
-
-def encrypt_chain(chain: str) -> str:
-    """Cifrar cadena XML"""
+    """Crear cadena XML a partir de la plantilla, da la misma cadena que armaba ElementTree"""
+    inicio, url, servicio, cliente = get_chain_xml_template()
+    return "".join(
+        [
+            inicio,
+            xml_element("reference", str(pago_id)),
+            xml_element("amount", str(amount)),
+            url,
+            xml_element("mail_cliente", email),
+            servicio,
+            xml_element("value", description),
+            cliente,
+            xml_element("value", str(cit_client_id)),
+            "</data></datos_adicionales></url></P>",
+        ]
+    )
 
-    # Validar WPP_KEY
-    if WPP_KEY is None:
-        raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_KEY.")
+
+def get_cipher() -> AES128Context:
+    """Contexto de cifrado con WPP_KEY, se valida la llave una sola vez por proceso"""
+    global _cipher
+    if _cipher is None:
+        # Validar WPP_KEY
+        if WPP_KEY is None:
+            raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_KEY.")
+        try:
+            _cipher = AES128Context(WPP_KEY)
+        except ValueError as error:
+            raise SantanderWebPayPlusMissingConfigurationError(
+                f"La variable de entorno WPP_KEY no es válida: {error}"
+            ) from error
+    return _cipher
+
+
+def encrypt_chain(chain: str) -> bytes:
+    """Cifrar cadena XML, entrega el base64 en bytes"""
 
     # Cifrar la cadena
-    aes_encryptor = AES128Encryption()
-    ciphertext = aes_encryptor.encrypt(chain, WPP_KEY)
+    try:
+        ciphertext = get_cipher().encrypt(chain.encode("utf-8"))
+    except ValueError as error:
+        raise SantanderWebPayPlusEncryptError(f"Error al cifrar la cadena: {error}") from error
 
     # Entregar cadena cifrada
     return ciphertext
@@ -170,8 +360,13 @@ def decrypt_chain(chain_encrypted: str) -> str:
     """Descifrar cadena XML"""
 
     # Validar WPP_KEY
-    if WPP_KEY is None:
-        raise SantanderWebPayPlusMissingConfigurationError("Falta declarar la variable de entorno WPP_KEY.")
+    aes_context = get_cipher()
+
+    # Rechazar la cadena demasiado grande antes de revisarla
+    if len(chain_encrypted) > WPP_CIFRADO_MAXIMO:
+        raise SantanderWebPayPlusBankResponseInvalidError(
+            f"Error porque la respuesta cifrada del banco tiene más de {WPP_CIFRADO_MAXIMO} caracteres."
+        )
 
     # Eliminar avances de línea y espacios en blanco
     chain_encrypted = chain_encrypted.replace("\n", "").replace(" ", "")
@@ -183,10 +378,9 @@ def decrypt_chain(chain_encrypted: str) -> str:
         )
 
     # Descifrar la cadena
-    aes_encryptor = AES128Encryption()
     try:
-        plaintext = aes_encryptor.decrypt(WPP_KEY, chain_encrypted)
-    except Exception as error:
+        plaintext = aes_context.decrypt(chain_encrypted).decode("utf-8")
+    except ValueError as error:
         raise SantanderWebPayPlusDesencryptError("Error porque no se pudo desencritar la respuesta del banco.") from error
 
     # Entregar cadena descifrada
@@ -229,24 +423,35 @@ async def send_chain(chain: str) -> str:
     payload = "xml=" + create_chain_xml_sender(chain)
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-    # Enviar la petición al banco
+    # Si el banco ha estado fallando, no esperar por él
+    if not breaker.permitir():
+        raise SantanderWebPayPlusCircuitOpenError("Error porque el banco no está respondiendo, intente más tarde.")
+
+    # Enviar la petición al banco, esperando la respuesta sin bloquear, hasta el tiempo adaptativo
+    inicio = time.perf_counter()
+    timeout = breaker.timeout()
     try:
-        response = requests.request(
-            "POST",
-            WPP_URL,
-            headers=headers,
-            data=payload,
-            timeout=WPP_TIMEOUT,
-        )
-    except requests.exceptions.ConnectionError as error:
-        raise SantanderWebPayPlusConnectionError("Error porque no se pudo conectar al banco.") from error
-    except requests.exceptions.Timeout as error:
+        response = await get_client().post(WPP_URL, headers=headers, content=payload, timeout=timeout)
+    except httpx.TimeoutException as error:
+        # Cuenta en el p99 con su tiempo de espera, así el siguiente tiempo de espera crece si el banco se hizo más lento
+        breaker.registrar_fallo(timeout, agotada=True)
         raise SantanderWebPayPlusTimeoutError("Error porque se agoto el tiempo de espera con el banco.") from error
-    except requests.exceptions.RequestException as error:
+    except httpx.ConnectError as error:
+        breaker.registrar_fallo(time.perf_counter() - inicio)
+        raise SantanderWebPayPlusConnectionError("Error porque no se pudo conectar al banco.") from error
+    except httpx.HTTPError as error:
+        breaker.registrar_fallo(time.perf_counter() - inicio)
         raise SantanderWebPayPlusRequestError("Error al enviar la cadena al banco.") from error
     except Exception as error:
+        breaker.registrar_fallo(time.perf_counter() - inicio)
         raise SantanderWebPayPlusUnknownError("Error desconocido al enviar la cadena al banco.") from error
 
+    # Un error del servidor del banco cuenta como fallo, su respuesta no traerá el URL
+    if response.status_code >= 500:
+        breaker.registrar_fallo(time.perf_counter() - inicio)
+    else:
+        breaker.registrar_exito(time.perf_counter() - inicio)
+
     # Entregar
     return response.text
 
@@ -260,14 +465,8 @@ def get_url_from_xml_encrypt(xml_encrypt: str):
     except Exception as error:
         raise SantanderWebPayPlusDesencryptError(f"No se puede desencriptar el XML del banco. {str(error)}") from error
 
-    # Leer el contenido XML
-    try:
-        root = ET.fromstring(xml_str)
-    except ET.ParseError as error:
-        raise SantanderWebPayPlusXMLReadError("Error porque el XML del banco no es válido.") from error
-
-    # Obtener el URL
-    url = root.find("nb_url").text
+    # Leer el URL
+    url = read_xml_fields(xml_str, ("nb_url",))["nb_url"]
     if url is None or url == "":
         raise SantanderWebPayPlusXMLReadError("Error porque el XML del banco no tiene la URL.")
 
@@ -275,36 +474,56 @@ def get_url_from_xml_encrypt(xml_encrypt: str):
     return url
 
 
-def create_pay_link(
+def create_chain_xml_encrypt(
     pago_id: int,
+    amount: float,
     email: str,
-    service_detail: str,
+    description: str,
     cit_client_id: int,
-    amount: float,
 ) -> str:
-    """Regresa el link para mostrar el formulario de pago"""
+    """Crear la cadena XML y entregarla cifrada"""
 
     # Crear cadena XML
     chain = create_chain_xml(
         pago_id=pago_id,
         amount=amount,
         email=email,
-        description=service_detail,
+        description=description,
         cit_client_id=cit_client_id,
     )
 
     # Encriptación del XML
     try:
-        chain_encrypt = encrypt_chain(chain).decode()  # bytes
+        return encrypt_chain(chain).decode()  # bytes
     except Exception as error:
         raise SantanderWebPayPlusEncryptError("Error al encriptar el XML") from error
 
+
+async def create_pay_link(
+    pago_id: int,
+    email: str,
+    service_detail: str,
+    cit_client_id: int,
+    amount: float,
+) -> str:
+    """Regresa el link para mostrar el formulario de pago"""
+
+    # Crear y cifrar la cadena XML en los hilos de cifrado
+    chain_encrypt = await run_in_wpp_executor(
+        create_chain_xml_encrypt,
+        pago_id,
+        amount,
+        email,
+        service_detail,
+        cit_client_id,
+    )
+
     # Enviar cadena XML a WPP
     respuesta = None
     try:
-        respuesta = asyncio.run(send_chain(chain_encrypt))
-    except asyncio.TimeoutError as error:
-        raise SantanderWebPayPlusTimeoutError("Error porque se agoto el tiempo de espera con el banco.") from error
+        respuesta = await send_chain(chain_encrypt)
+    except SantanderWebPayPlusAnyError:
+        raise
     except Exception as error:
         raise SantanderWebPayPlusUnknownError("Error al tratar de enviar la cadena XML al banco.") from error
 
@@ -312,9 +531,9 @@ def create_pay_link(
     if respuesta is None or respuesta == "" or respuesta == "\n":
         raise SantanderWebPayPlusNotValidAnswerError("Error en la respuesta del banco (respuesta vacía).")
 
-    # Descifrar la respuesta y extraer la url
+    # Descifrar la respuesta y extraer la url en los hilos de cifrado
     try:
-        url = get_url_from_xml_encrypt(respuesta)
+        url = await run_in_wpp_executor(get_url_from_xml_encrypt, respuesta)
     except Exception as error:
         raise SantanderWebPayPlusGetURLFromXMLEncryptedError(
             f"Error al obtener la URL del banco desde su XML encriptado. {str(error)}"
@@ -324,45 +543,28 @@ def create_pay_link(
     return url
 
 
-def convert_xml_to_dict(xml_str: str) -> dict:
-    """Convertir el xml descifrado a un diccionario"""
+def parse_bank_response(xml_str: str) -> BankResponse:
+    """Leer la respuesta descifrada del banco, causa SantanderWebPayPlusXMLReadError si falta un dato"""
 
-    # Leer el contenido XML
-    try:
-        root = ET.fromstring(xml_str)
-    except ET.ParseError as error:
-        raise SantanderWebPayPlusXMLReadError("Error porque el XML que dio el banco no es válido.") from error
+    # Leer los datos en una sola pasada
+    campos = read_xml_fields(xml_str, ("reference", "response", "foliocpagos", "auth", "email"))
+
+    # Validar que estén todos
+    for etiqueta, nombre in [
+        ("reference", "el pago_id"),
+        ("response", "la respuesta"),
+        ("foliocpagos", "el folio"),
+        ("auth", "el auth"),
+        ("email", "el email"),
+    ]:
+        if campos[etiqueta] is None or campos[etiqueta] == "":
+            raise SantanderWebPayPlusXMLReadError(f"Error porque el XML no tiene {nombre}.")
 
-    # Obtener pago_id
-    pago_id = root.find("reference").text
-    if pago_id is None or pago_id == "":
-        raise SantanderWebPayPlusXMLReadError("Error porque el XML no tiene el pago_id.")
-
-    # Obtener respuesta
-    respuesta = root.find("response").text
-    if respuesta is None or respuesta == "":
-        raise SantanderWebPayPlusXMLReadError("Error porque el XML no tiene la respuesta.")
-
-    # Obtener folio
-    folio = root.find("foliocpagos").text
-    if folio is None or folio == "":
-        raise SantanderWebPayPlusXMLReadError("Error porque el XML no tiene el folio.")
-
-    # Obtener auth
-    auth = root.find("auth").text
-    if auth is None or auth == "":
-        raise SantanderWebPayPlusXMLReadError("Error porque el XML no tiene el auth.")
-
-    # Obtener email
-    email = root.find("email").text
-    if email is None or email == "":
-        raise SantanderWebPayPlusXMLReadError("Error porque el XML no tiene el email.")
-
-    # Entregar diccionario
-    return {
-        "pago_id": pago_id,
-        "respuesta": respuesta,
-        "folio": folio,
-        "auth": auth,
-        "email": email,
-    }
+    # Entregar
+    return BankResponse(
+        pago_id=campos["reference"],
+        respuesta=campos["response"],
+        folio=campos["foliocpagos"],
+        auth=campos["auth"],
+        email=campos["email"],
+    )
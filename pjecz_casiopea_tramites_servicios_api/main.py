@@ -2,23 +2,53 @@
 PJECZ Casiopea Tramites Servicios API
 """
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_pagination import add_pagination
+from fastapi_pagination.utils import disable_installed_extensions_check
 
 from .config.settings import get_settings
+from .dependencies.bandeja_resultados import bandeja_resultados
+from .dependencies.catalogos_cache import catalogos
+from .dependencies.enlaces_pago import enlaces_pago
+from .dependencies.pag_resultados import close_process_pool
+from .dependencies.santander_web_pay_plus import close_client, close_executor
 from .routers.autoridades import autoridades
 from .routers.cit_clientes import cit_clientes
 from .routers.distritos import distritos
+from .routers.estadisticas import estadisticas
 from .routers.pag_pagos import pag_pagos
 from .routers.pag_tramites_servicios import pag_tramites_servicios
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Cargar los catálogos y arrancar los enlaces de pago y la bandeja, al terminar cerrar las conexiones, los hilos y los procesos"""
+    settings = get_settings()
+    await catalogos.cargar()
+    escucha = asyncio.create_task(catalogos.escuchar())
+    await enlaces_pago.iniciar()
+    if settings.PAG_RESULTADOS_BANDEJA:
+        bandeja_resultados.iniciar()
+    yield
+    escucha.cancel()
+    await bandeja_resultados.detener()
+    await enlaces_pago.detener()
+    await close_client()
+    close_executor()
+    close_process_pool()
+
+
 # FastAPI
 app = FastAPI(
     title="PJECZ Casiopea Tramites Servicios API",
     description="API del Portal de Trámites y Servicios.",
     docs_url="/docs",
     redoc_url=None,
+    lifespan=lifespan,
 )
 
 # CORSMiddleware
@@ -35,11 +65,13 @@ app.add_middleware(
 app.include_router(autoridades)
 app.include_router(cit_clientes)
 app.include_router(distritos)
+app.include_router(estadisticas)
 app.include_router(pag_pagos)
 app.include_router(pag_tramites_servicios)
 
-# Paginación
+# Paginación, los catálogos se paginan en memoria
 add_pagination(app)
+disable_installed_extensions_check()
 
 
 # Mensaje de Bienvenida
@@ -23,7 +23,7 @@ class Autoridad(Base, UniversalMixin):
 
     # Claves foráneas
     distrito_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("distritos.id"))
-    distrito: Mapped["Distrito"] = relationship(back_populates="autoridades")
+    distrito: Mapped["Distrito"] = relationship(back_populates="autoridades", lazy="raise_on_sql")
 
     # Columnas
     clave: Mapped[str] = mapped_column(String(16), unique=True)
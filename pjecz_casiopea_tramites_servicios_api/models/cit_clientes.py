@@ -29,6 +29,10 @@ class CitCliente(Base, UniversalMixin):
     curp: Mapped[str] = mapped_column(String(18), unique=True)
     telefono: Mapped[str] = mapped_column(String(64))
     email: Mapped[str] = mapped_column(String(256), unique=True)
+    contrasena_md5: Mapped[str] = mapped_column(String(256))
+    contrasena_sha256: Mapped[str] = mapped_column(String(256))
+    renovacion: Mapped[date]
+    limite_citas_pendientes: Mapped[int]
 
     # Hijos
     pag_pagos: Mapped[list["PagPago"]] = relationship("PagPago", back_populates="cit_cliente")
@@ -6,7 +6,7 @@ import uuid
 from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import Enum, ForeignKey, Numeric, String, Text
+from sqlalchemy import Enum, ForeignKey, Index, Numeric, String, Text, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -25,21 +25,44 @@ class PagPago(Base, UniversalMixin):
         "ENTREGADO": "Entregado",
     }
 
+    ENLACE_ESTADOS = {
+        "PENDIENTE": "Pendiente",
+        "TOMADO": "Tomado",
+        "CREADO": "Creado",
+        "FALLIDO": "Fallido",
+    }
+
     # Nombre de la tabla
     __tablename__ = "pag_pagos"
 
+    # Índices parciales para encontrar un pago pendiente igual con su enlace, ver sql/pag_pagos_pendientes_idx.sql,
+    # y para tomar los enlaces por crear del carro asíncrono, ver sql/pag_pagos_enlaces.sql
+    __table_args__ = (
+        Index(
+            "pag_pagos_pendientes_idx",
+            "cit_cliente_id",
+            "pag_tramite_servicio_id",
+            "autoridad_id",
+            "distrito_id",
+            "cantidad",
+            "caducidad",
+            postgresql_where=text("estado = 'SOLICITADO' AND url IS NOT NULL"),
+        ),
+        Index("pag_pagos_enlaces_idx", "creado", postgresql_where=text("enlace_estado IN ('PENDIENTE', 'TOMADO')")),
+    )
+
     # Clave primaria
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
     # Claves foráneas
     autoridad_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("autoridades.id"))
-    autoridad: Mapped["Autoridad"] = relationship(back_populates="pag_pagos")
+    autoridad: Mapped["Autoridad"] = relationship(back_populates="pag_pagos", lazy="raise_on_sql")
     distrito_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("distritos.id"))
-    distrito: Mapped["Distrito"] = relationship(back_populates="pag_pagos")
+    distrito: Mapped["Distrito"] = relationship(back_populates="pag_pagos", lazy="raise_on_sql")
     cit_cliente_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("cit_clientes.id"))
-    cit_cliente: Mapped["CitCliente"] = relationship(back_populates="pag_pagos")
+    cit_cliente: Mapped["CitCliente"] = relationship(back_populates="pag_pagos", lazy="raise_on_sql")
     pag_tramite_servicio_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("pag_tramites_servicios.id"))
-    pag_tramite_servicio: Mapped["PagTramiteServicio"] = relationship(back_populates="pag_pagos")
+    pag_tramite_servicio: Mapped["PagTramiteServicio"] = relationship(back_populates="pag_pagos", lazy="raise_on_sql")
 
     # Columnas
     caducidad: Mapped[date]
@@ -47,10 +70,15 @@ class PagPago(Base, UniversalMixin):
     descripcion: Mapped[str] = mapped_column(String(256), default="")
     estado: Mapped[str] = mapped_column(Enum(*ESTADOS, name="pag_pagos_estados", native_enum=False), index=True)
     email: Mapped[str] = mapped_column(String(256))
+    enlace_estado: Mapped[Optional[str]] = mapped_column(
+        Enum(*ENLACE_ESTADOS, name="pag_pagos_enlace_estados", native_enum=False)
+    )
+    enlace_tomado: Mapped[Optional[datetime]]
     folio: Mapped[str] = mapped_column(String(256))
     resultado_tiempo: Mapped[Optional[datetime]]
     resultado_xml: Mapped[Optional[str]] = mapped_column(Text)
     total: Mapped[Numeric] = mapped_column(Numeric(precision=8, scale=2, decimal_return_scale=2))
+    url: Mapped[Optional[str]] = mapped_column(String(512))
     ya_se_envio_comprobante: Mapped[bool] = mapped_column(default=False)
 
     def __repr__(self):
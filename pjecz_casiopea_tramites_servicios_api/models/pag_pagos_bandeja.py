@@ -0,0 +1,54 @@
+"""
+Pag Pagos Bandeja, modelos
+"""
+
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Enum, Index, String, Text, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..dependencies.database import Base
+from ..dependencies.universal_mixin import UniversalMixin
+
+
+class PagPagoBandeja(Base, UniversalMixin):
+    """PagPagoBandeja, avisos del banco recibidos que se aplican a los pagos en segundo plano"""
+
+    ESTADOS = {
+        "PENDIENTE": "Pendiente",
+        "TOMADO": "Tomado",
+        "APLICADO": "Aplicado",
+        "DUPLICADO": "Duplicado",
+        "OMITIDO": "Omitido",
+        "RECHAZADO": "Rechazado",
+        "ERROR": "Error",
+    }
+
+    # Nombre de la tabla
+    __tablename__ = "pag_pagos_bandeja"
+
+    # Índice para tomar en orden los pendientes y los tomados que se abandonaron, ver sql/pag_pagos_bandeja.sql
+    __table_args__ = (
+        Index("pag_pagos_bandeja_pendientes_idx", "recibido", postgresql_where=text("estado IN ('PENDIENTE', 'TOMADO')")),
+    )
+
+    # Clave primaria
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # Columnas
+    estado: Mapped[str] = mapped_column(Enum(*ESTADOS, name="pag_pagos_bandeja_estados", native_enum=False))
+    folio: Mapped[Optional[str]] = mapped_column(String(256))
+    mensaje: Mapped[Optional[str]] = mapped_column(String(256))
+    intentos: Mapped[int] = mapped_column(default=0)
+    pag_pago_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True))
+    procesado: Mapped[Optional[datetime]]
+    recibido: Mapped[datetime]
+    tomado: Mapped[Optional[datetime]]
+    xml_encriptado: Mapped[str] = mapped_column(Text)
+
+    def __repr__(self):
+        """Representación"""
+        return f"<PagPagoBandeja {self.id}>"
@@ -0,0 +1,35 @@
+"""
+Pag Pagos Idempotencia, modelos
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Index, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..dependencies.database import Base
+from ..dependencies.universal_mixin import UniversalMixin
+
+
+class PagPagoIdempotencia(Base, UniversalMixin):
+    """PagPagoIdempotencia, respuestas de /pag_pagos/carro por Idempotency-Key"""
+
+    # Nombre de la tabla
+    __tablename__ = "pag_pagos_idempotencia"
+
+    # Índice para borrar las llaves caducadas, ver sql/pag_pagos_idempotencia.sql
+    __table_args__ = (Index("pag_pagos_idempotencia_caduca_idx", "caduca"),)
+
+    # Clave primaria
+    llave: Mapped[str] = mapped_column(String(256), primary_key=True)
+
+    # Columnas
+    huella: Mapped[str] = mapped_column(String(64))
+    respuesta: Mapped[Optional[dict]] = mapped_column(JSONB)
+    caduca: Mapped[datetime]
+
+    def __repr__(self):
+        """Representación"""
+        return f"<PagPagoIdempotencia {self.llave}>"
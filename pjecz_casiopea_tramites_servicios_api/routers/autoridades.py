@@ -4,23 +4,68 @@ Autoridades, routers
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy.exc import MultipleResultsFound, NoResultFound
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..config.settings import Settings, get_settings
+from ..dependencies.catalogos_cache import Catalogo, catalogos
+from ..dependencies.fastapi_pagination_custom_page import CustomCursorPage, CustomPage, paginate_by_clave, paginate_with_count
+from ..dependencies.http_cache import not_modified_response
 from ..dependencies.safe_string import safe_clave
-from ..models.autoridades import Autoridad
-from ..models.distritos import Distrito
 from ..schemas.autoridades import AutoridadOut, OneAutoridadOut
 
 autoridades = APIRouter(prefix="/api/v5/autoridades")
 
 
+def consultar(catalogo: Catalogo, distrito_clave: str = "") -> list:
+    """Consultar las autoridades activas, ordenadas por clave"""
+
+    # Consultar autoridades, ya vienen ordenadas por clave
+    consulta = catalogo.registros
+
+    # Filtrar por los distritos donde es_distrito es True
+    consulta = [autoridad for autoridad in consulta if autoridad.distrito.es_distrito]
+
+    # Filtrar por distrito_clave si se proporciona
+    if distrito_clave:
+        distrito_clave = safe_clave(distrito_clave)
+        if distrito_clave != "":
+            consulta = [autoridad for autoridad in consulta if autoridad.distrito.clave == distrito_clave]
+
+    # Filtrar por los activos
+    consulta = [autoridad for autoridad in consulta if autoridad.es_activo]
+
+    # Filtrar por estatus "A"
+    consulta = [autoridad for autoridad in consulta if autoridad.estatus == "A"]
+
+    # Entregar
+    return consulta
+
+
+# Va antes del detalle para que "/cursor" no se tome como una clave
+@autoridades.get("/cursor", response_model=CustomCursorPage[AutoridadOut])
+async def paginado_cursor(
+    request: Request,
+    response: Response,
+    settings: Annotated[Settings, Depends(get_settings)],
+    distrito_clave: str = "",
+):
+    """Paginado de autoridades por cursor, ordenadas por clave"""
+
+    # Responder 304 si el cliente ya tiene esta versión
+    catalogo = await catalogos.autoridades()
+    no_modificado = not_modified_response(request, response, catalogo.version, settings.AUTORIDADES_CACHE_CONTROL)
+    if no_modificado is not None:
+        return no_modificado
+
+    # Entregar
+    return paginate_by_clave(consultar(catalogo, distrito_clave))
+
+
 @autoridades.get("/{clave}", response_model=OneAutoridadOut)
 async def detalle(
-    database: Annotated[Session, Depends(get_db)],
+    request: Request,
+    response: Response,
+    settings: Annotated[Settings, Depends(get_settings)],
     clave: str,
 ):
     """Detalle de una autoridad a partir de su clave"""
@@ -28,9 +73,12 @@ async def detalle(
         clave = safe_clave(clave)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
-    try:
-        autoridad = database.query(Autoridad).filter_by(clave=clave).one()
-    except (MultipleResultsFound, NoResultFound):
+    catalogo = await catalogos.autoridades()
+    no_modificado = not_modified_response(request, response, catalogo.version, settings.AUTORIDADES_CACHE_CONTROL)
+    if no_modificado is not None:
+        return no_modificado
+    autoridad = catalogo.get(clave)
+    if autoridad is None:
         return OneAutoridadOut(success=False, message="No existe esa autoridad")
     if autoridad.es_activo is False:
         return OneAutoridadOut(success=False, message="No está activa esa autoridad")
@@ -41,28 +89,18 @@ async def detalle(
 
 @autoridades.get("", response_model=CustomPage[AutoridadOut])
 async def paginado(
-    database: Annotated[Session, Depends(get_db)],
+    request: Request,
+    response: Response,
+    settings: Annotated[Settings, Depends(get_settings)],
     distrito_clave: str = "",
 ):
     """Paginado de autoridades"""
 
-    # Consultar autoridades
-    consulta = database.query(Autoridad).join(Distrito)
-
-    # Filtrar por los distritos donde es_distrito es True
-    consulta = consulta.filter(Distrito.es_distrito == True)
-
-    # Filtrar por distrito_clave si se proporciona
-    if distrito_clave:
-        distrito_clave = safe_clave(distrito_clave)
-        if distrito_clave != "":
-            consulta = consulta.filter(Distrito.clave == distrito_clave)
-
-    # Filtrar por los activos
-    consulta = consulta.filter(Autoridad.es_activo == True)
-
-    # Filtrar por estatus "A"
-    consulta = consulta.filter(Autoridad.estatus == "A")
+    # Responder 304 si el cliente ya tiene esta versión
+    catalogo = await catalogos.autoridades()
+    no_modificado = not_modified_response(request, response, catalogo.version, settings.AUTORIDADES_CACHE_CONTROL)
+    if no_modificado is not None:
+        return no_modificado
 
     # Entregar
-    return paginate(consulta.order_by(Autoridad.clave))
+    return paginate_with_count(consultar(catalogo, distrito_clave), settings.AUTORIDADES_COUNT_MODE)
@@ -5,9 +5,10 @@ Cit Clientes, routers
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.exc import MultipleResultsFound, NoResultFound
 
-from ..dependencies.database import Session, get_db
+from ..dependencies.database import AsyncSession, get_async_read_db
 from ..dependencies.safe_string import safe_email
 from ..models.cit_clientes import CitCliente
 from ..schemas.cit_clientes import CitClienteOut, OneCitClienteOut
@@ -17,7 +18,7 @@ cit_clientes = APIRouter(prefix="/api/v5/cit_clientes")
 
 @cit_clientes.get("/{email}", response_model=OneCitClienteOut)
 async def detalle(
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_read_db)],
     email: str,
 ):
     """Detalle de un cit_cliente a partir de su email"""
@@ -26,7 +27,7 @@ async def detalle(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válido el email")
     try:
-        cit_cliente = database.query(CitCliente).filter_by(email=email).one()
+        cit_cliente = (await database.scalars(select(CitCliente).filter_by(email=email))).one()
     except (MultipleResultsFound, NoResultFound):
         return OneCitClienteOut(success=False, message="No existe ese cliente")
     if cit_cliente.estatus != "A":
@@ -4,22 +4,61 @@ Distritos, routers
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy.exc import MultipleResultsFound, NoResultFound
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..config.settings import Settings, get_settings
+from ..dependencies.catalogos_cache import Catalogo, catalogos
+from ..dependencies.fastapi_pagination_custom_page import CustomCursorPage, CustomPage, paginate_by_clave, paginate_with_count
+from ..dependencies.http_cache import not_modified_response
 from ..dependencies.safe_string import safe_clave
-from ..models.distritos import Distrito
 from ..schemas.distritos import DistritoOut, OneDistritoOut
 
 distritos = APIRouter(prefix="/api/v5/distritos")
 
 
+def consultar(catalogo: Catalogo) -> list:
+    """Consultar los distritos activos, ordenados por clave"""
+
+    # Consultar distritos, ya vienen ordenados por clave
+    consulta = catalogo.registros
+
+    # Filtrar por es_distrito True
+    consulta = [distrito for distrito in consulta if distrito.es_distrito]
+
+    # Filtrar por los activos
+    consulta = [distrito for distrito in consulta if distrito.es_activo]
+
+    # Filtrar por estatus "A"
+    consulta = [distrito for distrito in consulta if distrito.estatus == "A"]
+
+    # Entregar
+    return consulta
+
+
+# Va antes del detalle para que "/cursor" no se tome como una clave
+@distritos.get("/cursor", response_model=CustomCursorPage[DistritoOut])
+async def paginado_cursor(
+    request: Request,
+    response: Response,
+    settings: Annotated[Settings, Depends(get_settings)],
+):
+    """Paginado de distritos por cursor, ordenados por clave"""
+
+    # Responder 304 si el cliente ya tiene esta versión
+    catalogo = await catalogos.distritos()
+    no_modificado = not_modified_response(request, response, catalogo.version, settings.DISTRITOS_CACHE_CONTROL)
+    if no_modificado is not None:
+        return no_modificado
+
+    # Entregar
+    return paginate_by_clave(consultar(catalogo))
+
+
 @distritos.get("/{clave}", response_model=OneDistritoOut)
 async def detalle(
-    database: Annotated[Session, Depends(get_db)],
+    request: Request,
+    response: Response,
+    settings: Annotated[Settings, Depends(get_settings)],
     clave: str,
 ):
     """Detalle de un distrito a partir de su clave"""
@@ -27,9 +66,12 @@ async def detalle(
         clave = safe_clave(clave)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
-    try:
-        distrito = database.query(Distrito).filter_by(clave=clave).one()
-    except (MultipleResultsFound, NoResultFound):
+    catalogo = await catalogos.distritos()
+    no_modificado = not_modified_response(request, response, catalogo.version, settings.DISTRITOS_CACHE_CONTROL)
+    if no_modificado is not None:
+        return no_modificado
+    distrito = catalogo.get(clave)
+    if distrito is None:
         return OneDistritoOut(success=False, message="No existe ese distrito")
     if distrito.es_activo is False:
         return OneDistritoOut(success=False, message="No está activo ese distrito")
@@ -40,21 +82,17 @@ async def detalle(
 
 @distritos.get("", response_model=CustomPage[DistritoOut])
 async def paginado(
-    database: Annotated[Session, Depends(get_db)],
+    request: Request,
+    response: Response,
+    settings: Annotated[Settings, Depends(get_settings)],
 ):
     """Paginado de distritos"""
 
-    # Consultar distritos
-    consulta = database.query(Distrito)
-
-    # Filtrar por es_distrito True
-    consulta = consulta.filter_by(es_distrito=True)
-
-    # Filtrar por los activos
-    consulta = consulta.filter_by(es_activo=True)
-
-    # Filtrar por estatus "A"
-    consulta = consulta.filter_by(estatus="A")
+    # Responder 304 si el cliente ya tiene esta versión
+    catalogo = await catalogos.distritos()
+    no_modificado = not_modified_response(request, response, catalogo.version, settings.DISTRITOS_CACHE_CONTROL)
+    if no_modificado is not None:
+        return no_modificado
 
     # Entregar
-    return paginate(consulta.order_by(Distrito.clave))
+    return paginate_with_count(consultar(catalogo), settings.DISTRITOS_COUNT_MODE)
@@ -0,0 +1,29 @@
+"""
+Estadísticas, routers
+"""
+
+from fastapi import APIRouter
+
+from ..dependencies.database import async_engine, async_read_engine
+from ..dependencies.database_pool import get_pool_stats
+from ..dependencies.santander_web_pay_plus import get_wpp_stats
+from ..schemas.estadisticas import ListPoolOut, OneWppOut, PoolOut, WppOut
+
+estadisticas = APIRouter(prefix="/api/v5/estadisticas")
+
+
+@estadisticas.get("/pool", response_model=ListPoolOut)
+async def pool():
+    """Estado y estadísticas de los pools de conexiones a la base de datos"""
+    pools = [
+        PoolOut(nombre="async", **get_pool_stats(async_engine.pool)),
+    ]
+    if async_read_engine is not async_engine:
+        pools.append(PoolOut(nombre="async_read", **get_pool_stats(async_read_engine.pool)))
+    return ListPoolOut(success=True, message="Estadísticas de los pools", data=pools)
+
+
+@estadisticas.get("/wpp", response_model=OneWppOut)
+async def wpp():
+    """Estado del circuit breaker, latencias y errores de las últimas llamadas al banco y ocupación de los hilos de cifrado"""
+    return OneWppOut(success=True, message="Estadísticas del banco", data=WppOut(**get_wpp_stats()))
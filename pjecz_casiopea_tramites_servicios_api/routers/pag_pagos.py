@@ -2,48 +2,177 @@
 Pag Pagos, routers
 """
 
+import logging
+import secrets
+import time
+import uuid
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 from typing import Annotated
+from zoneinfo import ZoneInfo
 
-import nest_asyncio
-from fastapi import APIRouter, Depends
-from sqlalchemy.exc import MultipleResultsFound, NoResultFound
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy import Select, insert, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError, MultipleResultsFound, NoResultFound, SQLAlchemyError
 
 from ..config.settings import Settings, get_settings
-from ..dependencies.database import Session, get_db
-from ..dependencies.safe_string import safe_clave, safe_curp, safe_email, safe_integer, safe_string, safe_telefono
+from ..dependencies.bandeja_resultados import bandeja_resultados
+from ..dependencies.catalogos_cache import catalogos
+from ..dependencies.database import AsyncSession, get_async_db, get_async_read_db, is_recently_written, mark_written
+from ..dependencies.eager_loads import pag_pago_out_select
+from ..dependencies.enlaces_pago import enlaces_pago
+from ..dependencies.idempotencia import IdempotenciaConflictoError, huella, idempotencia
+from ..dependencies.pag_resultados import ResultadoInvalidoError, aplicar_lote, leer_resultado, leer_resultados
+from ..dependencies.safe_string import safe_clave, safe_curp, safe_email, safe_integer, safe_string, safe_telefono, safe_uuid
 from ..dependencies.santander_web_pay_plus import (
-    RESPUESTA_EXITO,
+    WPP_CIFRADO_MAXIMO,
     SantanderWebPayPlusAnyError,
-    convert_xml_to_dict,
     create_pay_link,
-    decrypt_chain,
+    run_in_wpp_executor,
 )
 from ..models.autoridades import Autoridad
 from ..models.cit_clientes import CitCliente
 from ..models.distritos import Distrito
 from ..models.pag_pagos import PagPago
-from ..models.pag_tramites_servicios import PagTramiteServicio
+from ..models.pag_pagos_bandeja import PagPagoBandeja
 from ..schemas.pag_pagos import (
     OnePagCarroOut,
+    OnePagPagoEstadoOut,
     OnePagPagoOut,
     OnePagResultadoOut,
+    OnePagResultadosOut,
     PagCarroIn,
     PagCarroOut,
+    PagPagoEstadoOut,
     PagPagoOut,
     PagResultadoIn,
     PagResultadoOut,
+    PagResultadoSalidaOut,
+    PagResultadosIn,
+    PagResultadosOut,
 )
 
+logger = logging.getLogger(__name__)
+
 pag_pagos = APIRouter(prefix="/api/v5/pag_pagos")
 
 
+def consultar_o_insertar_cit_cliente(curp: str, email: str, **columnas) -> Select:
+    """
+    Consulta que entrega el id del cit_cliente con esa CURP, o con ese email, y si no existe lo inserta
+
+    Si otro carro lo inserta al mismo tiempo con la misma CURP, el ON CONFLICT espera a que
+    termine y entrega su id. Si choca por el email, causa IntegrityError y hay que repetirla.
+    """
+    existente = (
+        select(CitCliente.id)
+        .where(or_(CitCliente.curp == curp, CitCliente.email == email))
+        .order_by((CitCliente.curp == curp).desc())
+        .limit(1)
+        .cte("existente")
+    )
+    valores = {"curp": curp, "email": email, **columnas}
+    insertar = pg_insert(CitCliente).from_select(
+        list(valores),
+        select(*[literal(valor, CitCliente.__table__.c[columna].type) for columna, valor in valores.items()]).where(
+            ~select(existente.c.id).exists()
+        ),
+    )
+    nuevo = (
+        insertar.on_conflict_do_update(index_elements=[CitCliente.curp], set_={"curp": insertar.excluded.curp})
+        .returning(CitCliente.id)
+        .cte("nuevo")
+    )
+    return select(existente.c.id).union_all(select(nuevo.c.id))
+
+
+def actualizar_resultado(pag_pago_id: uuid.UUID, **valores) -> Select:
+    """
+    Consulta que cambia el pago con el resultado del banco y entrega las columnas de PagResultadoOut
+
+    Solo cambia el pago si está SOLICITADO y activo, así que si llegan al mismo tiempo dos
+    avisos del banco para el mismo pago, el segundo espera al primero y ya no lo encuentra.
+    Si no entrega renglón, el pago no existe o ya fue procesado.
+    """
+    actualizado = (
+        update(PagPago)
+        .where(PagPago.id == pag_pago_id)
+        .where(PagPago.estado == "SOLICITADO")
+        .where(PagPago.estatus == "A")
+        .values(**valores)
+        .returning(
+            PagPago.id,
+            PagPago.autoridad_id,
+            PagPago.distrito_id,
+            PagPago.cit_cliente_id,
+            PagPago.email,
+            PagPago.estado,
+            PagPago.folio,
+            PagPago.resultado_tiempo,
+            PagPago.total,
+        )
+        .cte("actualizado")
+    )
+    return (
+        select(
+            actualizado.c.id,
+            Autoridad.clave.label("autoridad_clave"),
+            Autoridad.descripcion.label("autoridad_descripcion"),
+            Autoridad.descripcion_corta.label("autoridad_descripcion_corta"),
+            Distrito.clave.label("distrito_clave"),
+            Distrito.nombre.label("distrito_nombre"),
+            Distrito.nombre_corto.label("distrito_nombre_corto"),
+            CitCliente.apellido_primero,
+            CitCliente.apellido_segundo,
+            CitCliente.nombres,
+            actualizado.c.email,
+            actualizado.c.estado,
+            actualizado.c.folio,
+            actualizado.c.resultado_tiempo,
+            actualizado.c.total,
+        )
+        .join(Autoridad, Autoridad.id == actualizado.c.autoridad_id)
+        .join(Distrito, Distrito.id == actualizado.c.distrito_id)
+        .join(CitCliente, CitCliente.id == actualizado.c.cit_cliente_id)
+    )
+
+
 @pag_pagos.post("/carro", response_model=OnePagCarroOut)
 async def carro(
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    settings: Annotated[Settings, Depends(get_settings)],
     pag_carro_in: PagCarroIn,
+    asincrono: bool | None = None,
+    idempotency_key: Annotated[str | None, Header(alias="Idempotency-Key", max_length=256)] = None,
 ):
-    """Recibir, procesar y entregar datos del carro de pagos"""
+    """Recibir, procesar y entregar datos del carro de pagos, una sola vez por Idempotency-Key"""
+
+    # Sin llave, cada petición crea su carro
+    if idempotency_key is None:
+        return await crear_carro(database, settings, pag_carro_in, asincrono)
+
+    # Con llave, los reintentos reciben la respuesta del primero sin escribir ni llamar al banco
+    try:
+        return await idempotencia.ejecutar(
+            llave=idempotency_key,
+            huella_peticion=huella(pag_carro_in.model_dump_json(), str(asincrono)),
+            funcion=lambda: crear_carro(database, settings, pag_carro_in, asincrono),
+            es_exitosa=lambda respuesta: respuesta.success,
+            modelo=OnePagCarroOut,
+        )
+    except IdempotenciaConflictoError as error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+
+
+async def crear_carro(
+    database: AsyncSession,
+    settings: Settings,
+    pag_carro_in: PagCarroIn,
+    asincrono: bool | None,
+) -> OnePagCarroOut:
+    """Validar los datos del carro, crear el pago y su enlace"""
 
     # Validar nombres
     nombres = safe_string(pag_carro_in.nombres, save_enie=True)
@@ -81,9 +210,8 @@ async def carro(
         pag_tramite_servicio_clave = safe_clave(pag_carro_in.pag_tramite_servicio_clave)
     except ValueError:
         return OnePagCarroOut(success=False, message="La clave del trámite o servicio no es válida")
-    try:
-        pag_tramite_servicio = database.query(PagTramiteServicio).filter_by(clave=pag_tramite_servicio_clave).one()
-    except (MultipleResultsFound, NoResultFound):
+    pag_tramite_servicio = (await catalogos.pag_tramites_servicios()).get(pag_tramite_servicio_clave)
+    if pag_tramite_servicio is None:
         return OnePagCarroOut(success=False, message="No existe ese trámite o servicio")
     if pag_tramite_servicio.es_activo is False:
         return OnePagCarroOut(success=False, message="No está activo ese trámite o servicio")
@@ -96,9 +224,8 @@ async def carro(
             autoridad_clave = safe_clave(pag_carro_in.autoridad_clave)
         except ValueError:
             return OnePagCarroOut(success=False, message="La clave de la autoridad no es válida")
-        try:
-            autoridad = database.query(Autoridad).filter_by(clave=autoridad_clave).one()
-        except (MultipleResultsFound, NoResultFound):
+        autoridad = (await catalogos.autoridades()).get(autoridad_clave)
+        if autoridad is None:
             return OnePagCarroOut(success=False, message="No existe esa autoridad")
         if autoridad.es_activo is False:
             return OnePagCarroOut(success=False, message="No está activa esa autoridad")
@@ -106,7 +233,9 @@ async def carro(
             return OnePagCarroOut(success=False, message="Esta autoridad está eliminada")
     else:
         # Si no se proporciona, usar la autoridad ND (NO DEFINIDO)
-        autoridad = database.query(Autoridad).filter_by(clave="ND").one()
+        autoridad = (await catalogos.autoridades()).get("ND")
+        if autoridad is None:
+            return OnePagCarroOut(success=False, message="No existe esa autoridad")
 
     # Validar distrito_clave
     if pag_carro_in.distrito_clave:
@@ -114,9 +243,8 @@ async def carro(
             distrito_clave = safe_clave(pag_carro_in.distrito_clave)
         except ValueError:
             return OnePagCarroOut(success=False, message="La clave del distrito no es válida")
-        try:
-            distrito = database.query(Distrito).filter_by(clave=distrito_clave).one()
-        except (MultipleResultsFound, NoResultFound):
+        distrito = (await catalogos.distritos()).get(distrito_clave)
+        if distrito is None:
             return OnePagCarroOut(success=False, message="No existe ese distrito")
         if distrito.es_activo is False:
             return OnePagCarroOut(success=False, message="No está activo ese distrito")
@@ -153,76 +281,116 @@ async def carro(
     except ValueError:
         return OnePagCarroOut(success=False, message="El correo electrónico no es válido")
 
-    # Buscar al cit_cliente, primero por CURP y luego por email
-    cit_cliente = None
+    # Consultar o insertar al cit_cliente y recibir su id en una sola consulta
+    renovacion_fecha = datetime.now() + timedelta(days=60)
+    consulta = consultar_o_insertar_cit_cliente(
+        nombres=nombres,
+        apellido_primero=apellido_primero,
+        apellido_segundo=apellido_segundo,
+        curp=curp,
+        telefono=telefono,
+        email=email,
+        contrasena_md5="",
+        contrasena_sha256="",
+        renovacion=renovacion_fecha.date(),
+        limite_citas_pendientes=3,
+    )
     try:
-        cit_cliente = database.query(CitCliente).filter_by(curp=curp).one()
-    except (MultipleResultsFound, NoResultFound):
+        cit_cliente_id = await database.scalar(consulta)
+    except IntegrityError:
+        # Otro carro insertó al mismo tiempo un cliente con el mismo email, ahora sí lo encontrará
+        await database.rollback()
         try:
-            cit_cliente = database.query(CitCliente).filter_by(email=email).one()
-        except (MultipleResultsFound, NoResultFound):
-            cit_cliente = None
+            cit_cliente_id = await database.scalar(consulta)
+        except SQLAlchemyError:
+            await database.rollback()
+            return OnePagCarroOut(success=False, message="No se pudo crear el cliente")
+    except SQLAlchemyError:
+        await database.rollback()
+        return OnePagCarroOut(success=False, message="No se pudo crear el cliente")
 
-    # Si no existe, crear al cit_cliente
-    if cit_cliente is None:
-        renovacion_fecha = datetime.now() + timedelta(days=60)
-        try:
-            cit_cliente = CitCliente(
-                nombres=nombres,
-                apellido_primero=apellido_primero,
-                apellido_segundo=apellido_segundo,
-                curp=curp,
-                telefono=telefono,
-                email=email,
-                contrasena_md5="",
-                contrasena_sha256="",
-                renovacion=renovacion_fecha.date(),
-                limite_citas_pendientes=3,
+    # Si ya tiene un pago pendiente igual que no ha caducado, entregar su enlace sin crear otro
+    try:
+        pendiente = (
+            await database.execute(
+                select(PagPago.id, PagPago.url)
+                .where(PagPago.cit_cliente_id == cit_cliente_id)
+                .where(PagPago.pag_tramite_servicio_id == pag_tramite_servicio.id)
+                .where(PagPago.autoridad_id == autoridad.id)
+                .where(PagPago.distrito_id == distrito.id)
+                .where(PagPago.cantidad == cantidad)
+                .where(PagPago.caducidad > datetime.now().date())
+                .where(PagPago.estado == "SOLICITADO")
+                .where(PagPago.url.is_not(None))
+                .where(PagPago.descripcion == descripcion)
+                .where(PagPago.email == email)
+                .where(PagPago.total == total)
+                .where(PagPago.estatus == "A")
+                .order_by(PagPago.caducidad.desc())
+                .limit(1)
             )
-            database.add(cit_cliente)
-            database.commit()
-            database.refresh(cit_cliente)
-        except Exception:
-            database.rollback()
-            return OnePagCarroOut(success=False, message="No se pudo crear el cliente")
+        ).first()
+    except SQLAlchemyError:
+        await database.rollback()
+        return OnePagCarroOut(success=False, message="No se pudo crear el pago")
+    if pendiente is not None:
+        # Un cliente que tiene pagos ya existía, no hay nada que guardar
+        await database.rollback()
+        return OnePagCarroOut(
+            success=True,
+            message="Carro de compras con un pago pendiente igual, se entrega su enlace",
+            data=PagCarroOut(
+                id=pendiente.id,
+                autoridad_clave=autoridad.clave,
+                autoridad_descripcion=autoridad.descripcion,
+                autoridad_descripcion_corta=autoridad.descripcion_corta,
+                cantidad=cantidad,
+                descripcion=descripcion,
+                distrito_clave=distrito.clave,
+                distrito_nombre=distrito.nombre,
+                distrito_nombre_corto=distrito.nombre_corto,
+                email=email,
+                total=total,
+                url=pendiente.url,
+            ),
+        )
 
     # Definir la fecha de caducidad que sea dentro de 30 días
     caducidad = datetime.now() + timedelta(days=30)
 
-    # Insertar pago
-    pag_pago = PagPago(
-        autoridad=autoridad,
-        distrito=distrito,
-        cit_cliente=cit_cliente,
-        pag_tramite_servicio=pag_tramite_servicio,
-        caducidad=caducidad.date(),
-        cantidad=cantidad,
-        descripcion=descripcion,
-        email=email,
-        estado="SOLICITADO",
-        total=total,
-        ya_se_envio_comprobante=False,
-    )
-    database.add(pag_pago)
-    database.commit()
-    database.refresh(pag_pago)
+    # Si es asíncrono, el pago se inserta con su enlace PENDIENTE para que lo tomen los trabajadores
+    if asincrono is None:
+        asincrono = settings.ENLACES_PAGO_ASINCRONOS
 
-    # Crear URL al banco
-    nest_asyncio.apply()
+    # Insertar pago, recibir su id y terminar la transacción con un solo commit
     try:
-        url = create_pay_link(
-            pago_id=pag_pago.id,
-            email=email,
-            service_detail=pag_tramite_servicio.descripcion,
-            cit_client_id=cit_cliente.id,
-            amount=float(total),
+        pag_pago_id = await database.scalar(
+            insert(PagPago)
+            .values(
+                autoridad_id=autoridad.id,
+                distrito_id=distrito.id,
+                cit_cliente_id=cit_cliente_id,
+                pag_tramite_servicio_id=pag_tramite_servicio.id,
+                caducidad=caducidad.date(),
+                cantidad=cantidad,
+                descripcion=descripcion,
+                email=email,
+                estado="SOLICITADO",
+                enlace_estado="PENDIENTE" if asincrono else None,
+                total=total,
+                ya_se_envio_comprobante=False,
+            )
+            .returning(PagPago.id)
         )
-    except SantanderWebPayPlusAnyError as error:
-        return OnePagCarroOut(success=False, message=f"No se pudo crear el enlace de pago: {error}")
+        await database.commit()
+    except SQLAlchemyError:
+        await database.rollback()
+        return OnePagCarroOut(success=False, message="No se pudo crear el pago")
+    mark_written(PagPago.__tablename__, pag_pago_id)
 
-    # Entregar
+    # Preparar lo que se va a entregar
     pag_carro_out = PagCarroOut(
-        id=pag_pago.id,
+        id=pag_pago_id,
         autoridad_clave=autoridad.clave,
         autoridad_descripcion=autoridad.descripcion,
         autoridad_descripcion_corta=autoridad.descripcion_corta,
@@ -233,94 +401,265 @@ async def carro(
         distrito_nombre_corto=distrito.nombre_corto,
         email=email,
         total=total,
-        url=url,
     )
+
+    # Si es asíncrono, avisar a los trabajadores y entregar sin esperar el URL al banco
+    if asincrono:
+        enlaces_pago.avisar()
+        return OnePagCarroOut(
+            success=True,
+            message="Carro de compras creado, consulte el estado del pago para obtener el enlace",
+            data=pag_carro_out,
+        )
+
+    # Crear URL al banco
+    try:
+        pag_carro_out.url = await create_pay_link(
+            pago_id=pag_pago_id,
+            email=email,
+            service_detail=pag_tramite_servicio.descripcion,
+            cit_client_id=cit_cliente_id,
+            amount=float(total),
+        )
+    except SantanderWebPayPlusAnyError as error:
+        # Cancelar el pago, así no parece un enlace que se está generando
+        try:
+            await database.execute(update(PagPago).where(PagPago.id == pag_pago_id).values(estado="CANCELADO"))
+            await database.commit()
+        except SQLAlchemyError as error_cancelar:
+            await database.rollback()
+            logger.error("No se pudo cancelar el pago %s sin enlace: %s", pag_pago_id, error_cancelar)
+        mark_written(PagPago.__tablename__, pag_pago_id)
+        return OnePagCarroOut(success=False, message=f"No se pudo crear el enlace de pago: {error}")
+
+    # Guardar el URL para entregarlo en el estado, en el detalle y a un carro igual; si falla, el cliente ya tiene su enlace
+    try:
+        await database.execute(update(PagPago).where(PagPago.id == pag_pago_id).values(url=pag_carro_out.url))
+        await database.commit()
+    except SQLAlchemyError as error:
+        await database.rollback()
+        logger.error("No se pudo guardar el enlace del pago %s: %s", pag_pago_id, error)
+
+    # Entregar
     return OnePagCarroOut(success=True, message="Carro de compras creado", data=pag_carro_out)
 
 
 @pag_pagos.post("/resultado", response_model=OnePagResultadoOut)
 async def resultado(
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_db)],
     settings: Annotated[Settings, Depends(get_settings)],
     pag_resultado_in: PagResultadoIn,
 ):
     """Actualizar un pago, ahora puede guadar el contenido XML del banco"""
 
-    # Validar el XML que mando el banco
-    if pag_resultado_in.xml_encriptado.strip() == "":
-        return OnePagResultadoOut(success=False, message="El XML está vacío")
+    # Tiempo en que se recibió el resultado
+    resultado_tiempo = datetime.now(tz=ZoneInfo(settings.TZ)).replace(tzinfo=None)
 
-    # Desencriptar el XML que mando el banco
+    # Con PAG_RESULTADOS_BANDEJA, guardar el aviso tal como llegó y responder de inmediato, se aplica en segundo plano
+    if settings.PAG_RESULTADOS_BANDEJA:
+        if pag_resultado_in.xml_encriptado is None or pag_resultado_in.xml_encriptado.strip() == "":
+            return OnePagResultadoOut(success=False, message="El XML está vacío")
+        if len(pag_resultado_in.xml_encriptado) > WPP_CIFRADO_MAXIMO:
+            return OnePagResultadoOut(success=False, message="El XML es demasiado grande")
+        try:
+            await database.execute(
+                insert(PagPagoBandeja).values(
+                    id=uuid.uuid4(),
+                    estado="PENDIENTE",
+                    recibido=resultado_tiempo,
+                    xml_encriptado=pag_resultado_in.xml_encriptado,
+                )
+            )
+            await database.commit()
+        except SQLAlchemyError:
+            await database.rollback()
+            return OnePagResultadoOut(success=False, message="No se pudo recibir el resultado")
+        bandeja_resultados.avisar()
+        return OnePagResultadoOut(success=True, message="Resultado recibido, se aplicará en segundo plano")
+
+    # Desencriptar y leer el XML que mando el banco en los hilos de cifrado
     try:
-        respuesta_xml = decrypt_chain(pag_resultado_in.xml_encriptado)
-        respuesta = convert_xml_to_dict(respuesta_xml)
-    except SantanderWebPayPlusAnyError as error:
-        return OnePagResultadoOut(success=False, message=f"No se pudo procesar el XML: {error}")
-
-    # Consultar el pago
-    pag_pago_id = int(respuesta["pago_id"])
-    pag_pago = database.query(PagPago).get(pag_pago_id)
+        respuesta = await run_in_wpp_executor(leer_resultado, pag_resultado_in.xml_encriptado)
+    except ResultadoInvalidoError as error:
+        return OnePagResultadoOut(success=False, message=str(error))
+    pag_pago_id = respuesta.pag_pago_id
+
+    # Actualizar el pago solo si sigue SOLICITADO y recibir lo que se entrega, en una sola consulta
+    consulta = actualizar_resultado(
+        pag_pago_id=pag_pago_id,
+        estado=respuesta.estado,
+        folio=respuesta.folio,
+        resultado_tiempo=resultado_tiempo,
+        resultado_xml=respuesta.resultado_xml,
+    )
+    try:
+        pag_pago = (await database.execute(consulta)).first()
+        await database.commit()
+    except SQLAlchemyError:
+        await database.rollback()
+        return OnePagResultadoOut(success=False, message="No se pudo actualizar el pago")
 
-    # Validar el pago
+    # Si no se actualizó, consultar por qué, solo en este caso se hace otra consulta
     if pag_pago is None:
-        return OnePagResultadoOut(success=False, message="No existe ese pago")
-    if pag_pago.estatus != "A":
-        return OnePagResultadoOut(success=False, message="No es activo ese pago, está eliminado")
-    if pag_pago.estado != "SOLICITADO":
+        anterior = (await database.execute(select(PagPago.estatus).where(PagPago.id == pag_pago_id))).first()
+        if anterior is None:
+            return OnePagResultadoOut(success=False, message="No existe ese pago")
+        if anterior.estatus != "A":
+            return OnePagResultadoOut(success=False, message="No es activo ese pago, está eliminado")
         return OnePagResultadoOut(success=False, message="No es un pago solicitado al banco, ya fue procesado")
+    mark_written(PagPago.__tablename__, pag_pago_id)
 
-    # Definir el estado, puede ser PAGADO o FALLIDO
-    estado = "PAGADO" if respuesta["respuesta"] == RESPUESTA_EXITO else "FALLIDO"
-    if estado not in PagPago.ESTADOS:
-        return OnePagResultadoOut(success=False, message="El estado no es válido")
+    # Entregar
+    return OnePagResultadoOut(
+        success=True,
+        message="Resultado del pago actualizado",
+        data=PagResultadoOut.model_validate(pag_pago),
+    )
 
-    # Actualizar el pago
-    pag_pago.estado = estado
-    pag_pago.folio = respuesta["folio"]
-    pag_pago.resultado_tiempo = datetime.now(tz=settings.TZ)
-    pag_pago.resultado_xml = respuesta_xml
-    database.add(pag_pago)
-    database.commit()
-    # database.refresh(pag_pago)
 
-    # Entregar
-    return PagResultadoOut(
-        id=pag_pago.id,
-        autoridad_clave=pag_pago.autoridad.clave,
-        autoridad_descripcion=pag_pago.autoridad.descripcion,
-        autoridad_descripcion_corta=pag_pago.autoridad.descripcion_corta,
-        cantidad=pag_pago.cantidad,
-        nombres=pag_pago.cit_cliente.nombres,
-        apellido_primero=pag_pago.cit_cliente.apellido_primero,
-        apellido_segundo=pag_pago.cit_cliente.apellido_segundo,
-        email=pag_pago.email,
-        estado=pag_pago.estado,
-        folio=pag_pago.folio,
-        resultado_tiempo=pag_pago.resultado_tiempo,
-        total=pag_pago.total,
+@pag_pagos.post("/resultados", response_model=OnePagResultadosOut)
+async def resultados(
+    database: Annotated[AsyncSession, Depends(get_async_db)],
+    settings: Annotated[Settings, Depends(get_settings)],
+    pag_resultados_in: PagResultadosIn,
+    x_api_key: Annotated[str | None, Header(alias="X-Api-Key")] = None,
+):
+    """Aplicar un lote de resultados del banco, para reprocesar los avisos después de una falla"""
+
+    # Solo se puede reprocesar con la X-Api-Key de PAG_RESULTADOS_API_KEY, sin ella no está habilitado
+    if settings.PAG_RESULTADOS_API_KEY == "":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No está habilitado el reproceso de resultados")
+    if x_api_key is None or not secrets.compare_digest(x_api_key.encode(), settings.PAG_RESULTADOS_API_KEY.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No es válida la X-Api-Key")
+
+    # Validar el tamaño del lote
+    total = len(pag_resultados_in.xmls_encriptados)
+    if total == 0:
+        return OnePagResultadosOut(success=False, message="El lote está vacío")
+    if total > settings.PAG_RESULTADOS_LOTE_MAXIMO:
+        return OnePagResultadosOut(
+            success=False, message=f"El lote excede los {settings.PAG_RESULTADOS_LOTE_MAXIMO} resultados"
+        )
+    recibidos = pag_resultados_in.recibidos or [None] * total
+    if len(recibidos) != total:
+        return OnePagResultadosOut(success=False, message="No corresponden los recibidos con los resultados")
+
+    # Descifrar y leer en el pool de procesos, y aplicar con UPDATE por partes en una sola transacción
+    inicio = time.perf_counter()
+    ahora = datetime.now(tz=ZoneInfo(settings.TZ)).replace(tzinfo=None)
+    try:
+        leidos = await leer_resultados(pag_resultados_in.xmls_encriptados)
+    except BrokenProcessPool:
+        logger.error("Se cayó el pool de procesos al leer un lote de %s resultados", total)
+        return OnePagResultadosOut(success=False, message="No se pudieron leer los resultados")
+
+    # Cada resultado conserva el tiempo en que se recibió, en la zona de TZ, o el de ahora si no lo trae
+    tiempos = []
+    for recibido in recibidos:
+        if recibido is None:
+            tiempos.append(ahora)
+        elif recibido.tzinfo is None:
+            tiempos.append(recibido)
+        else:
+            tiempos.append(recibido.astimezone(ZoneInfo(settings.TZ)).replace(tzinfo=None))
+    try:
+        salidas = await aplicar_lote(database, list(zip(leidos, tiempos)))
+        await database.commit()
+    except SQLAlchemyError:
+        await database.rollback()
+        return OnePagResultadosOut(success=False, message="No se pudieron aplicar los resultados")
+    for salida in salidas:
+        if salida.estado == "APLICADO":
+            mark_written(PagPago.__tablename__, salida.pag_pago_id)
+    segundos = time.perf_counter() - inicio
+
+    # Entregar el resumen y la salida de cada resultado, en el mismo orden
+    conteos = Counter(salida.estado for salida in salidas)
+    return OnePagResultadosOut(
+        success=True,
+        message=f"Lote de {total} resultados aplicado",
+        data=PagResultadosOut(
+            total=total,
+            aplicados=conteos["APLICADO"],
+            duplicados=conteos["DUPLICADO"],
+            omitidos=conteos["OMITIDO"],
+            rechazados=conteos["RECHAZADO"],
+            segundos=segundos,
+            por_segundo=total / segundos,
+            salidas=[PagResultadoSalidaOut.model_validate(salida) for salida in salidas],
+        ),
     )
 
 
 @pag_pagos.get("/{pag_pago_id}", response_model=OnePagPagoOut)
 async def detalle_pag_pago(
-    database: Annotated[Session, Depends(get_db)],
+    database: Annotated[AsyncSession, Depends(get_async_read_db)],
+    database_primario: Annotated[AsyncSession, Depends(get_async_db)],
     pag_pago_id: str,
 ):
     """Detalle de un pago a partir de su UUID"""
 
     # Validar el UUID
     try:
-        pag_pago_id = safe_clave(pag_pago_id)
+        pag_pago_id = safe_uuid(pag_pago_id)
     except ValueError:
         return OnePagPagoOut(success=False, message="El ID no es válido")
 
-    # Consultar el pago
+    # Si se acaba de escribir el pago, consultarlo en el primario para leer lo escrito
+    if is_recently_written(PagPago.__tablename__, pag_pago_id):
+        database = database_primario
+
+    # Consultar el pago, si la réplica no lo tiene aún, consultar en el primario
+    consulta = pag_pago_out_select().where(PagPago.id == pag_pago_id)
     try:
-        pag_pago = database.query(PagPago).filter_by(id=pag_pago_id).one()
-    except (MultipleResultsFound, NoResultFound):
+        pag_pago = (await database.execute(consulta)).one()
+    except NoResultFound:
+        try:
+            pag_pago = (await database_primario.execute(consulta)).one()
+        except (MultipleResultsFound, NoResultFound):
+            return OnePagPagoOut(success=False, message="No existe ese pago")
+    except MultipleResultsFound:
         return OnePagPagoOut(success=False, message="No existe ese pago")
     if pag_pago.estatus != "A":
         return OnePagPagoOut(success=False, message="No es activo ese pago, está eliminado")
 
     # Entregar
     return OnePagPagoOut(success=True, message="Detalle de un pago", data=PagPagoOut.model_validate(pag_pago))
+
+
+@pag_pagos.get("/{pag_pago_id}/estado", response_model=OnePagPagoEstadoOut)
+async def estado_pag_pago(
+    database: Annotated[AsyncSession, Depends(get_async_read_db)],
+    database_primario: Annotated[AsyncSession, Depends(get_async_db)],
+    pag_pago_id: str,
+):
+    """Estado y enlace de pago de un pago, para consultarlo mientras se genera el enlace"""
+
+    # Validar el UUID
+    try:
+        pag_pago_id = safe_uuid(pag_pago_id)
+    except ValueError:
+        return OnePagPagoEstadoOut(success=False, message="El ID no es válido")
+
+    # Si se acaba de escribir el pago, consultarlo en el primario para leer lo escrito
+    if is_recently_written(PagPago.__tablename__, pag_pago_id):
+        database = database_primario
+
+    # Consultar solo el estado y el enlace
+    consulta = select(PagPago.id, PagPago.estado, PagPago.url, PagPago.estatus).where(PagPago.id == pag_pago_id)
+    pag_pago = (await database.execute(consulta)).one_or_none()
+    if pag_pago is None and database is not database_primario:
+        pag_pago = (await database_primario.execute(consulta)).one_or_none()
+    if pag_pago is None:
+        return OnePagPagoEstadoOut(success=False, message="No existe ese pago")
+    if pag_pago.estatus != "A":
+        return OnePagPagoEstadoOut(success=False, message="No es activo ese pago, está eliminado")
+
+    # Entregar
+    if pag_pago.estado == "SOLICITADO" and pag_pago.url is None:
+        mensaje = "El enlace de pago se está generando"
+    elif pag_pago.estado == "CANCELADO" and pag_pago.url is None:
+        mensaje = "No se pudo crear el enlace de pago"
+    else:
+        mensaje = "Estado de un pago"
+    return OnePagPagoEstadoOut(success=True, message=mensaje, data=PagPagoEstadoOut.model_validate(pag_pago))
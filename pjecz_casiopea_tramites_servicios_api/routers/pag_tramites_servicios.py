@@ -4,22 +4,58 @@ Pag Trámites y Servicios, routers
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy.exc import MultipleResultsFound, NoResultFound
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from ..dependencies.database import Session, get_db
-from ..dependencies.fastapi_pagination_custom_page import CustomPage
+from ..config.settings import Settings, get_settings
+from ..dependencies.catalogos_cache import Catalogo, catalogos
+from ..dependencies.fastapi_pagination_custom_page import CustomCursorPage, CustomPage, paginate_by_clave, paginate_with_count
+from ..dependencies.http_cache import not_modified_response
 from ..dependencies.safe_string import safe_clave
-from ..models.pag_tramites_servicios import PagTramiteServicio
 from ..schemas.pag_tramites_servicios import OnePagTramiteServicioOut, PagTramiteServicioOut
 
 pag_tramites_servicios = APIRouter(prefix="/api/v5/pag_tramites_servicios")
 
 
+def consultar(catalogo: Catalogo) -> list:
+    """Consultar los Trámites y Servicios activos, ordenados por clave"""
+
+    # Consultar, ya vienen ordenados por clave
+    consulta = catalogo.registros
+
+    # Filtrar por es_activo True
+    consulta = [pag_tramite_servicio for pag_tramite_servicio in consulta if pag_tramite_servicio.es_activo]
+
+    # Filtrar por estatus "A"
+    consulta = [pag_tramite_servicio for pag_tramite_servicio in consulta if pag_tramite_servicio.estatus == "A"]
+
+    # Entregar
+    return consulta
+
+
+# Va antes del detalle para que "/cursor" no se tome como una clave
+@pag_tramites_servicios.get("/cursor", response_model=CustomCursorPage[PagTramiteServicioOut])
+async def paginado_cursor(
+    request: Request,
+    response: Response,
+    settings: Annotated[Settings, Depends(get_settings)],
+):
+    """Paginado de Trámites y Servicios por cursor, ordenados por clave"""
+
+    # Responder 304 si el cliente ya tiene esta versión
+    catalogo = await catalogos.pag_tramites_servicios()
+    no_modificado = not_modified_response(request, response, catalogo.version, settings.PAG_TRAMITES_SERVICIOS_CACHE_CONTROL)
+    if no_modificado is not None:
+        return no_modificado
+
+    # Entregar
+    return paginate_by_clave(consultar(catalogo))
+
+
 @pag_tramites_servicios.get("/{clave}", response_model=OnePagTramiteServicioOut)
 async def detalle(
-    database: Annotated[Session, Depends(get_db)],
+    request: Request,
+    response: Response,
+    settings: Annotated[Settings, Depends(get_settings)],
     clave: str,
 ):
     """Detalle de un Trámite o Servicio a partir de su clave"""
@@ -27,9 +63,12 @@ async def detalle(
         clave = safe_clave(clave)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No es válida la clave")
-    try:
-        pag_tramite_servicio = database.query(PagTramiteServicio).filter_by(clave=clave).one()
-    except (MultipleResultsFound, NoResultFound):
+    catalogo = await catalogos.pag_tramites_servicios()
+    no_modificado = not_modified_response(request, response, catalogo.version, settings.PAG_TRAMITES_SERVICIOS_CACHE_CONTROL)
+    if no_modificado is not None:
+        return no_modificado
+    pag_tramite_servicio = catalogo.get(clave)
+    if pag_tramite_servicio is None:
         return OnePagTramiteServicioOut(success=False, message="No existe ese trámite o servicio")
     if pag_tramite_servicio.es_activo is False:
         return OnePagTramiteServicioOut(success=False, message="No está activo ese trámite o servicio")
@@ -44,18 +83,17 @@ async def detalle(
 
 @pag_tramites_servicios.get("", response_model=CustomPage[PagTramiteServicioOut])
 async def paginado(
-    database: Annotated[Session, Depends(get_db)],
+    request: Request,
+    response: Response,
+    settings: Annotated[Settings, Depends(get_settings)],
 ):
     """Paginado de Trámites y Servicios"""
 
-    # Consultar
-    consulta = database.query(PagTramiteServicio)
-
-    # Filtrar por es_activo True
-    consulta = consulta.filter_by(es_activo=True)
-
-    # Filtrar por estatus "A"
-    consulta = consulta.filter_by(estatus="A")
+    # Responder 304 si el cliente ya tiene esta versión
+    catalogo = await catalogos.pag_tramites_servicios()
+    no_modificado = not_modified_response(request, response, catalogo.version, settings.PAG_TRAMITES_SERVICIOS_CACHE_CONTROL)
+    if no_modificado is not None:
+        return no_modificado
 
     # Entregar
-    return paginate(consulta.order_by(PagTramiteServicio.clave))
+    return paginate_with_count(consultar(catalogo), settings.PAG_TRAMITES_SERVICIOS_COUNT_MODE)
@@ -0,0 +1,70 @@
+"""
+Estadísticas, esquemas de pydantic
+"""
+
+from pydantic import BaseModel
+
+
+class PoolOut(BaseModel):
+    """Esquema para entregar las estadísticas de un pool de conexiones"""
+
+    nombre: str
+    pool_size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    checkout_failures: int
+    wait_avg_ms: float
+    wait_max_ms: float
+    queries: int
+    commits: int
+
+
+class ListPoolOut(BaseModel):
+    """Esquema para entregar las estadísticas de los pools de conexiones"""
+
+    success: bool
+    message: str
+    data: list[PoolOut] = []
+
+
+class EjecutorOut(BaseModel):
+    """Esquema para entregar la ocupación y los tiempos de los hilos de cifrado"""
+
+    hilos: int
+    cola: int
+    en_cola: int
+    en_curso: int
+    esperando_lugar: int
+    ejecutados: int
+    errores: int
+    espera_p50_ms: float
+    espera_p99_ms: float
+    duracion_p50_ms: float
+    duracion_p99_ms: float
+
+
+class WppOut(BaseModel):
+    """Esquema para entregar el estado del circuit breaker y las estadísticas de las llamadas al banco"""
+
+    estado: str
+    llamadas: int
+    errores: int
+    rechazadas: int
+    aperturas: int
+    recientes: int
+    tasa_errores: float
+    latencia_p50_ms: float
+    latencia_p95_ms: float
+    latencia_p99_ms: float
+    timeout_s: float
+    ejecutor: EjecutorOut
+
+
+class OneWppOut(BaseModel):
+    """Esquema para entregar las estadísticas de las llamadas al banco"""
+
+    success: bool
+    message: str
+    data: WppOut | None = None
@@ -3,6 +3,7 @@ Pag Pagos, esquemas de pydantic
 """
 
 import uuid
+from datetime import datetime
 
 from pydantic import BaseModel, ConfigDict
 
@@ -22,9 +23,10 @@ class PagPagoOut(BaseModel):
     cantidad: int
     descripcion: str
     estado: str
-    folio: str
-    resultado_tiempo: str | None = None
+    folio: str | None = None
+    resultado_tiempo: datetime | None = None
     total: float
+    url: str | None = None
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -36,6 +38,23 @@ class OnePagPagoOut(BaseModel):
     data: PagPagoOut | None = None
 
 
+class PagPagoEstadoOut(BaseModel):
+    """Esquema para entregar el estado y el enlace de un pago"""
+
+    id: uuid.UUID
+    estado: str
+    url: str | None = None
+    model_config = ConfigDict(from_attributes=True)
+
+
+class OnePagPagoEstadoOut(BaseModel):
+    """Esquema para entregar el estado de un pago"""
+
+    success: bool
+    message: str
+    data: PagPagoEstadoOut | None = None
+
+
 class PagCarroIn(BaseModel):
     """Esquema para recibir el carro de compras"""
 
@@ -66,7 +85,7 @@ class PagCarroOut(BaseModel):
     cantidad: int
     descripcion: str
     total: float
-    url: str
+    url: str | None = None
 
 
 class OnePagCarroOut(BaseModel):
@@ -99,8 +118,9 @@ class PagResultadoOut(BaseModel):
     email: str
     estado: str
     folio: str
-    resultado_tiempo: str | None = None
+    resultado_tiempo: datetime | None = None
     total: float
+    model_config = ConfigDict(from_attributes=True)
 
 
 class OnePagResultadoOut(BaseModel):
@@ -109,3 +129,41 @@ class OnePagResultadoOut(BaseModel):
     success: bool
     message: str
     data: PagResultadoOut | None = None
+
+
+class PagResultadosIn(BaseModel):
+    """Esquema para recibir un lote de resultados del banco"""
+
+    xmls_encriptados: list[str | None]
+    recibidos: list[datetime | None] | None = None
+
+
+class PagResultadoSalidaOut(BaseModel):
+    """Esquema para entregar lo que pasó con un resultado del lote"""
+
+    estado: str
+    pag_pago_id: uuid.UUID | None = None
+    folio: str | None = None
+    mensaje: str | None = None
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PagResultadosOut(BaseModel):
+    """Esquema para entregar el resumen y las salidas de un lote de resultados"""
+
+    total: int
+    aplicados: int
+    duplicados: int
+    omitidos: int
+    rechazados: int
+    segundos: float
+    por_segundo: float
+    salidas: list[PagResultadoSalidaOut]
+
+
+class OnePagResultadosOut(BaseModel):
+    """Esquema para entregar un lote de resultados"""
+
+    success: bool
+    message: str
+    data: PagResultadosOut | None = None
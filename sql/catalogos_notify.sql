@@ -0,0 +1,24 @@
+-- Avisar por NOTIFY cuando cambian los catálogos que la API mantiene en memoria
+-- El canal debe coincidir con CATALOGOS_NOTIFY_CHANNEL y el mensaje es el nombre de la tabla
+
+CREATE OR REPLACE FUNCTION catalogos_notify() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('catalogos', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS distritos_catalogos_notify ON distritos;
+CREATE TRIGGER distritos_catalogos_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON distritos
+    FOR EACH STATEMENT EXECUTE FUNCTION catalogos_notify();
+
+DROP TRIGGER IF EXISTS autoridades_catalogos_notify ON autoridades;
+CREATE TRIGGER autoridades_catalogos_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON autoridades
+    FOR EACH STATEMENT EXECUTE FUNCTION catalogos_notify();
+
+DROP TRIGGER IF EXISTS pag_tramites_servicios_catalogos_notify ON pag_tramites_servicios;
+CREATE TRIGGER pag_tramites_servicios_catalogos_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON pag_tramites_servicios
+    FOR EACH STATEMENT EXECUTE FUNCTION catalogos_notify();
@@ -0,0 +1,22 @@
+-- Bandeja de los avisos del banco a /pag_pagos/resultado cuando PAG_RESULTADOS_BANDEJA es true
+-- Se guardan tal como llegan para responder de inmediato, la bandeja de resultados los aplica en lotes
+-- El estado de cada aviso queda en PENDIENTE, TOMADO, APLICADO, DUPLICADO, OMITIDO, RECHAZADO o ERROR
+-- Un aviso que no se pudo aplicar regresa a PENDIENTE hasta agotar PAG_RESULTADOS_BANDEJA_INTENTOS, luego queda en ERROR
+
+CREATE TABLE IF NOT EXISTS pag_pagos_bandeja (
+    id UUID PRIMARY KEY,
+    estado VARCHAR(9) NOT NULL,
+    folio VARCHAR(256),
+    mensaje VARCHAR(256),
+    pag_pago_id UUID,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    procesado TIMESTAMP WITHOUT TIME ZONE,
+    recibido TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    tomado TIMESTAMP WITHOUT TIME ZONE,
+    xml_encriptado TEXT NOT NULL,
+    creado TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    modificado TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    estatus CHAR(1) NOT NULL DEFAULT 'A'
+);
+
+CREATE INDEX IF NOT EXISTS pag_pagos_bandeja_pendientes_idx ON pag_pagos_bandeja (recibido) WHERE estado IN ('PENDIENTE', 'TOMADO');
@@ -0,0 +1,10 @@
+-- Enlaces de pago del carro asíncrono, los toman los trabajadores de enlaces de pago de cualquier instancia
+-- enlace_estado queda en PENDIENTE, TOMADO, CREADO o FALLIDO; es NULL en los pagos del carro síncrono
+-- enlace_tomado es cuándo se tomó, un TOMADO de hace más de 5 minutos se vuelve a tomar
+
+ALTER TABLE pag_pagos ADD COLUMN IF NOT EXISTS enlace_estado VARCHAR(9);
+ALTER TABLE pag_pagos ADD COLUMN IF NOT EXISTS enlace_tomado TIMESTAMP WITHOUT TIME ZONE;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS pag_pagos_enlaces_idx
+    ON pag_pagos (creado)
+    WHERE enlace_estado IN ('PENDIENTE', 'TOMADO');
@@ -0,0 +1,15 @@
+-- Llaves de Idempotency-Key de /pag_pagos/carro, compartidas por todas las instancias
+-- Mientras se ejecuta la primera petición, respuesta es NULL y caduca es el límite para terminarla
+-- Al terminar con éxito se guarda la respuesta y caduca pasa a IDEMPOTENCY_KEY_TTL segundos
+
+CREATE TABLE IF NOT EXISTS pag_pagos_idempotencia (
+    llave VARCHAR(256) PRIMARY KEY,
+    huella VARCHAR(64) NOT NULL,
+    respuesta JSONB,
+    caduca TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    creado TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    modificado TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+    estatus CHAR(1) NOT NULL DEFAULT 'A'
+);
+
+CREATE INDEX IF NOT EXISTS pag_pagos_idempotencia_caduca_idx ON pag_pagos_idempotencia (caduca);
@@ -0,0 +1,6 @@
+-- Encontrar un pago SOLICITADO igual que todavía tiene su enlace vigente, para entregarlo en lugar de crear otro
+-- Es parcial, solo tiene los pagos pendientes con url, y CONCURRENTLY para no bloquear los carros al crearlo
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS pag_pagos_pendientes_idx
+    ON pag_pagos (cit_cliente_id, pag_tramite_servicio_id, autoridad_id, distrito_id, cantidad, caducidad)
+    WHERE estado = 'SOLICITADO' AND url IS NOT NULL;
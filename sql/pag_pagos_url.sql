@@ -0,0 +1,4 @@
+-- Guardar el enlace de pago del banco, lo escriben los trabajadores de enlaces de pago
+-- Mientras el pago está SOLICITADO y no tiene url, el enlace se está generando
+
+ALTER TABLE pag_pagos ADD COLUMN IF NOT EXISTS url VARCHAR(512);
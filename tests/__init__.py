@@ -13,6 +13,8 @@ config = {
     "autoridades_claves": os.getenv("AUTORIDADES_CLAVES", "[]"),
     "cit_cliente_email": os.getenv("CIT_CLIENTE_EMAIL", ""),
     "distritos_claves": os.getenv("DISTRITOS_CLAVES", "[]"),
+    "pag_pago_id": os.getenv("PAG_PAGO_ID", ""),
+    "pag_resultados_bandeja": os.getenv("PAG_RESULTADOS_BANDEJA", "false").lower() == "true",
     "pag_tramites_servicios_claves": os.getenv("PAG_TRAMITES_SERVICIOS_CLAVES", "[]"),
     "timeout": int(os.getenv("TIMEOUT", "10")),
     "usuario_email": os.getenv("USUARIO_EMAIL", "anonymous@server.com"),
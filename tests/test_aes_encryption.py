@@ -0,0 +1,75 @@
+"""
+Unit tests for AESEncryption, no necesitan el API
+"""
+
+import base64
+import os
+import unittest
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from pjecz_casiopea_tramites_servicios_api.dependencies.AESEncryption import AES128Context, AES128Encryption
+
+LLAVE = "1460C8BD91DB352E78604983F82CDA3A"
+
+
+def cifrar_sin_relleno(bloques: bytes) -> bytes:
+    """Cifrar bloques completos tal como vienen, para probar rellenos que no son válidos"""
+    iv = os.urandom(16)
+    encryptor = Cipher(algorithms.AES(bytes.fromhex(LLAVE)), modes.CBC(iv)).encryptor()
+    return base64.b64encode(iv + encryptor.update(bloques) + encryptor.finalize())
+
+
+class TestAESEncryption(unittest.TestCase):
+    """Tests for AES128Context"""
+
+    def setUp(self):
+        """Contexto con la llave de pruebas"""
+        self.contexto = AES128Context(LLAVE)
+
+    def test_ida_y_vuelta(self):
+        """Test decrypt gives back what encrypt got, for every padding length and non ASCII text"""
+        for largo in range(1, 50):
+            texto = os.urandom(largo)
+            self.assertEqual(self.contexto.decrypt(self.contexto.encrypt(texto)), texto)
+        texto = "<email>señora.núñez@example.com</email>".encode("utf-8")
+        self.assertEqual(self.contexto.decrypt(self.contexto.encrypt(texto).decode()), texto)
+
+    def test_compatible_con_aes128encryption(self):
+        """Test AES128Context and AES128Encryption read what the other one writes"""
+        clase = AES128Encryption()
+        for largo in [1, 15, 16, 17, 900]:
+            texto = f"<P>{'x' * largo}</P>"
+            self.assertEqual(self.contexto.decrypt(clase.encrypt(texto, LLAVE)), texto.encode())
+            self.assertEqual(clase.decrypt(LLAVE, self.contexto.encrypt(texto.encode())), texto)
+
+    def test_relleno_no_valido(self):
+        """Test decrypt rejects a padding whose bytes are not all the same or out of range"""
+        for ultimo_bloque in [
+            b"A" * 14 + b"\x01\x02",
+            b"A" * 12 + b"\x03\x04\x04\x04",
+            b"A" * 15 + b"\x00",
+            b"A" * 15 + b"\x11",
+        ]:
+            with self.assertRaises(ValueError):
+                self.contexto.decrypt(cifrar_sin_relleno(ultimo_bloque))
+        self.assertEqual(self.contexto.decrypt(cifrar_sin_relleno(b"A" * 12 + b"\x04" * 4)), b"A" * 12)
+
+    def test_largo_no_valido(self):
+        """Test decrypt rejects a cryptogram without the IV and full blocks"""
+        with self.assertRaises(ValueError):
+            self.contexto.decrypt(base64.b64encode(os.urandom(16)))
+        with self.assertRaises(ValueError):
+            self.contexto.decrypt(base64.b64encode(os.urandom(40)))
+
+    def test_llave_y_texto_no_validos(self):
+        """Test the key must be 32 hexadecimal characters and the plaintext must not be empty"""
+        for llave in ["", LLAVE[:30], "Z" * 32]:
+            with self.assertRaises(ValueError):
+                AES128Context(llave)
+        with self.assertRaises(ValueError):
+            self.contexto.encrypt(b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
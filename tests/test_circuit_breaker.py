@@ -0,0 +1,157 @@
+"""
+Unit tests for circuit_breaker, no necesitan el API
+"""
+
+import unittest
+from unittest import mock
+
+from pjecz_casiopea_tramites_servicios_api.dependencies.circuit_breaker import (
+    ABIERTO,
+    CERRADO,
+    SEMIABIERTO,
+    CircuitBreaker,
+    percentil,
+)
+
+
+def nuevo_breaker() -> CircuitBreaker:
+    """Circuit breaker con los valores por defecto del cliente del banco"""
+    return CircuitBreaker(fallos=5, espera=30, ventana=200, timeout_maximo=12, timeout_minimo=2, timeout_factor=3)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Tests for CircuitBreaker"""
+
+    def setUp(self):
+        """Controlar el reloj del circuit breaker"""
+        self.ahora = 1000.0
+        reloj = mock.patch(
+            "pjecz_casiopea_tramites_servicios_api.dependencies.circuit_breaker.time.monotonic",
+            side_effect=lambda: self.ahora,
+        )
+        reloj.start()
+        self.addCleanup(reloj.stop)
+
+    def test_percentil(self):
+        """Test percentil, nearest rank of a sorted list"""
+        self.assertEqual(percentil([], 99), 0.0)
+        self.assertEqual(percentil([1.0], 50), 1.0)
+        self.assertEqual(percentil([float(numero) for numero in range(1, 101)], 99), 99.0)
+        self.assertEqual(percentil([float(numero) for numero in range(1, 101)], 100), 100.0)
+
+    def test_abre_tras_fallos_seguidos(self):
+        """Test the circuit opens after fallos consecutive failures and rejects calls while open"""
+        breaker = nuevo_breaker()
+        for _ in range(4):
+            self.assertTrue(breaker.permitir())
+            breaker.registrar_fallo(0.1)
+        self.assertEqual(breaker.estado, CERRADO)
+        breaker.registrar_exito(0.1)
+        for _ in range(5):
+            self.assertTrue(breaker.permitir())
+            breaker.registrar_fallo(0.1)
+        self.assertEqual(breaker.estado, ABIERTO)
+        self.assertEqual(breaker.aperturas, 1)
+        self.assertFalse(breaker.permitir())
+        self.assertEqual(breaker.rechazadas, 1)
+
+    def test_prueba_semiabierto(self):
+        """Test only one probe passes after espera, a success closes and a failure opens again"""
+        breaker = nuevo_breaker()
+        for _ in range(5):
+            breaker.registrar_fallo(0.1)
+        self.ahora += 30
+        self.assertTrue(breaker.permitir())
+        self.assertEqual(breaker.estado, SEMIABIERTO)
+        self.assertFalse(breaker.permitir())
+
+        # La prueba falla y se vuelve a abrir
+        breaker.registrar_fallo(0.1)
+        self.assertEqual(breaker.estado, ABIERTO)
+        self.assertEqual(breaker.aperturas, 2)
+        self.assertFalse(breaker.permitir())
+
+        # La siguiente prueba responde y se cierra
+        self.ahora += 30
+        self.assertTrue(breaker.permitir())
+        breaker.registrar_exito(0.1)
+        self.assertEqual(breaker.estado, CERRADO)
+        self.assertTrue(breaker.permitir())
+
+    def test_prueba_cancelada(self):
+        """Test another probe is allowed when the previous one never reported, after timeout_maximo"""
+        breaker = nuevo_breaker()
+        for _ in range(5):
+            breaker.registrar_fallo(0.1)
+        self.ahora += 30
+        self.assertTrue(breaker.permitir())
+        self.ahora += 11
+        self.assertFalse(breaker.permitir())
+        self.ahora += 1
+        self.assertTrue(breaker.permitir())
+
+    def test_timeout_adaptativo(self):
+        """Test the timeout is p99 times the factor, between the minimum and the maximum"""
+        breaker = nuevo_breaker()
+        self.assertEqual(breaker.timeout(), 12)
+        for _ in range(19):
+            breaker.registrar_exito(0.1)
+        self.assertEqual(breaker.timeout(), 12)
+        breaker.registrar_exito(0.1)
+        self.assertEqual(breaker.timeout(), 2)
+        for _ in range(100):
+            breaker.registrar_exito(1.0)
+        self.assertEqual(breaker.timeout(), 3.0)
+        for _ in range(100):
+            breaker.registrar_exito(5.0)
+        self.assertEqual(breaker.timeout(), 12)
+
+    def test_timeout_prueba_maximo(self):
+        """Test the half-open probe waits timeout_maximo, not the adaptive timeout"""
+        breaker = nuevo_breaker()
+        for _ in range(200):
+            breaker.registrar_exito(0.1)
+        self.assertEqual(breaker.timeout(), 2)
+        for _ in range(5):
+            breaker.registrar_fallo(2, agotada=True)
+        self.ahora += 30
+        self.assertTrue(breaker.permitir())
+        self.assertEqual(breaker.timeout(), 12)
+
+    def test_banco_mas_lento(self):
+        """Test a bank that becomes steadily slower, but under timeout_maximo, is followed within a few calls"""
+        breaker = nuevo_breaker()
+        for _ in range(200):
+            breaker.registrar_exito(0.1)
+        self.assertEqual(breaker.timeout(), 2)
+
+        # El banco ahora tarda 3 s en cada llamada
+        agotadas = 0
+        for _ in range(50):
+            self.assertTrue(breaker.permitir())
+            timeout = breaker.timeout()
+            if timeout < 3.0:
+                agotadas += 1
+                breaker.registrar_fallo(timeout, agotada=True)
+            else:
+                breaker.registrar_exito(3.0)
+        self.assertLessEqual(agotadas, 3)
+        self.assertEqual(breaker.estado, CERRADO)
+        self.assertGreaterEqual(breaker.timeout(), 3.0)
+
+    def test_estadisticas(self):
+        """Test the statistics count calls, errors and the recent error rate"""
+        breaker = nuevo_breaker()
+        breaker.registrar_exito(0.1)
+        breaker.registrar_fallo(0.2)
+        breaker.registrar_fallo(2, agotada=True)
+        estadisticas = breaker.estadisticas()
+        self.assertEqual(estadisticas["llamadas"], 3)
+        self.assertEqual(estadisticas["errores"], 2)
+        self.assertEqual(estadisticas["recientes"], 3)
+        self.assertAlmostEqual(estadisticas["tasa_errores"], 2 / 3)
+        self.assertEqual(estadisticas["latencia_p99_ms"], 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
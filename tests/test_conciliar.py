@@ -0,0 +1,146 @@
+"""
+Unit tests for cli conciliar, no necesitan el API pero sí la base de datos
+
+Crean una tabla temporal pag_pagos, que tapa a la de verdad en la sesión, y
+deshacen la transacción al terminar, así que no cambian los pagos.
+"""
+
+import asyncio
+import io
+import unittest
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import asyncpg
+
+from cli.conciliar import comparar
+from pjecz_casiopea_tramites_servicios_api.config.settings import get_settings
+from pjecz_casiopea_tramites_servicios_api.dependencies.santander_web_pay_plus import RESPUESTA_EXITO
+
+# Pagos PAGADO, ENTREGADO y los demás, en un periodo de un día
+DIA = date(2026, 10, 17)
+EN_EL_DIA = datetime(2026, 10, 17, 12, 0, 0)
+
+CREAR_PAG_PAGOS = """
+CREATE TEMPORARY TABLE pag_pagos (
+    id uuid PRIMARY KEY,
+    estado text,
+    estatus text,
+    folio text,
+    total numeric,
+    resultado_tiempo timestamp
+) ON COMMIT DROP
+"""
+
+
+async def conciliar_prueba(pag_pagos: list[tuple], renglones: list[str]) -> dict[str, list[str]]:
+    """Comparar los renglones del banco con los pagos de prueba, entrega los tipos de diferencias de cada pago"""
+    settings = get_settings()
+    conexion = await asyncpg.connect(
+        user=settings.DB_USER,
+        password=settings.DB_PASS,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME,
+    )
+    transaccion = conexion.transaction()
+    await transaccion.start()
+    try:
+        await conexion.execute(CREAR_PAG_PAGOS)
+        await conexion.executemany("INSERT INTO pag_pagos VALUES ($1, $2, $3, $4, $5, $6)", pag_pagos)
+        archivo = io.BytesIO(("reference,foliocpagos,amount,response\n" + "\n".join(renglones) + "\n").encode())
+        filas = []
+        await comparar(conexion, archivo, DIA, DIA, SimpleNamespace(writerow=filas.append))
+    finally:
+        await transaccion.rollback()
+        await conexion.close()
+
+    # Juntar los tipos por el pag_pago_id, o por la referencia si no es válida
+    tipos = defaultdict(list)
+    for fila in filas:
+        tipos[fila[2]].append(fila[1])
+    return tipos
+
+
+class TestConciliar(unittest.TestCase):
+    """Tests for the SQL of cli conciliar"""
+
+    def setUp(self):
+        """Necesita la base de datos"""
+        if get_settings().DB_USER == "":
+            self.skipTest("Faltan DB_USER y DB_PASS para conectarse a la base de datos")
+
+    def test_precedencia(self):
+        """Test each bank row gets only its first difference: INVALIDO, REPETIDO, ESTADO, IMPORTE, FOLIO"""
+        correcto, fallido, folio, importe, importe_y_folio, estado, repetido, invalido, eliminado = [
+            uuid.uuid4() for _ in range(9)
+        ]
+        pag_pagos = [
+            (correcto, "PAGADO", "A", "F1", 100, EN_EL_DIA),
+            (fallido, "FALLIDO", "A", None, 100, EN_EL_DIA),
+            (folio, "PAGADO", "A", "F3", 100, EN_EL_DIA),
+            (importe, "ENTREGADO", "A", "F4", 100, EN_EL_DIA),
+            (importe_y_folio, "PAGADO", "A", "F5", 100, EN_EL_DIA),
+            (estado, "SOLICITADO", "A", None, 100, None),
+            (repetido, "SOLICITADO", "A", None, 100, None),
+            (invalido, "PAGADO", "A", "F8", 100, EN_EL_DIA),
+            (eliminado, "PAGADO", "B", "F9", 100, EN_EL_DIA),
+        ]
+        sin_pago = uuid.uuid4()
+        tipos = asyncio.run(
+            conciliar_prueba(
+                pag_pagos,
+                [
+                    f"{correcto},F1,100.00,{RESPUESTA_EXITO}",
+                    f"{fallido},,100,denied",
+                    f"{folio},F30,100,{RESPUESTA_EXITO}",
+                    f"{importe},F4,90,{RESPUESTA_EXITO}",
+                    f"{importe_y_folio},F50,90,{RESPUESTA_EXITO}",
+                    f"{estado},F6,90,{RESPUESTA_EXITO}",
+                    f"{repetido},F7,100,{RESPUESTA_EXITO}",
+                    f"{repetido},F7,100,{RESPUESTA_EXITO}",
+                    f"{invalido},F8,NO ES IMPORTE,{RESPUESTA_EXITO}",
+                    f"{invalido},F8,100,",
+                    f"NO ES UUID,F0,100,{RESPUESTA_EXITO}",
+                    f"{eliminado},F9,100,{RESPUESTA_EXITO}",
+                    f"{sin_pago},F10,100,{RESPUESTA_EXITO}",
+                ],
+            )
+        )
+        self.assertNotIn(str(correcto), tipos)
+        self.assertNotIn(str(fallido), tipos)
+        self.assertEqual(tipos[str(folio)], ["FOLIO"])
+        self.assertEqual(tipos[str(importe)], ["IMPORTE"])
+        self.assertEqual(tipos[str(importe_y_folio)], ["IMPORTE"])
+        self.assertEqual(tipos[str(estado)], ["ESTADO"])
+        self.assertEqual(tipos[str(repetido)], ["REPETIDO", "REPETIDO"])
+        self.assertEqual(tipos[str(invalido)], ["INVALIDO", "INVALIDO"])
+        self.assertEqual(tipos["NO ES UUID"], ["INVALIDO"])
+        self.assertEqual(tipos[str(eliminado)], ["FALTA_EN_SISTEMA"])
+        self.assertEqual(tipos[str(sin_pago)], ["FALTA_EN_SISTEMA"])
+
+    def test_falta_en_liquidacion(self):
+        """Test only the PAGADO or ENTREGADO payments with their result inside the period are missing from the bank"""
+        en_el_banco, inicio, final, antes, despues, entregado, solicitado, eliminado = [uuid.uuid4() for _ in range(8)]
+        pag_pagos = [
+            (en_el_banco, "PAGADO", "A", "F1", 100, EN_EL_DIA),
+            (inicio, "PAGADO", "A", "F2", 100, datetime(2026, 10, 17, 0, 0, 0)),
+            (final, "PAGADO", "A", "F3", 100, datetime(2026, 10, 17, 23, 59, 59)),
+            (antes, "PAGADO", "A", "F4", 100, datetime(2026, 10, 16, 23, 59, 59)),
+            (despues, "PAGADO", "A", "F5", 100, datetime(2026, 10, 18, 0, 0, 0)),
+            (entregado, "ENTREGADO", "A", "F6", 100, EN_EL_DIA),
+            (solicitado, "SOLICITADO", "A", None, 100, EN_EL_DIA),
+            (eliminado, "PAGADO", "B", "F8", 100, EN_EL_DIA),
+        ]
+        tipos = asyncio.run(conciliar_prueba(pag_pagos, [f"{en_el_banco},F1,100,{RESPUESTA_EXITO}"]))
+        self.assertEqual(
+            {pag_pago_id for pag_pago_id, tipos_pago in tipos.items() if tipos_pago == ["FALTA_EN_LIQUIDACION"]},
+            {str(inicio), str(final), str(entregado)},
+        )
+        self.assertEqual(sum(len(tipos_pago) for tipos_pago in tipos.values()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Unit tests for the number of queries per request
+"""
+
+import unittest
+import uuid
+
+import requests
+
+from tests import config
+
+
+def contar_consultas() -> int:
+    """Sumar las consultas que han hecho todos los pools"""
+    response = requests.get(
+        url=f"{config['api_base_url']}/estadisticas/pool",
+        headers={"X-Api-Key": config["api_key"]},
+        timeout=config["timeout"],
+    )
+    response.raise_for_status()
+    return sum(pool["queries"] for pool in response.json()["data"])
+
+
+class TestConsultas(unittest.TestCase):
+    """Tests for the number of queries per request"""
+
+    def consultas_de(self, url: str, params: dict | None = None, success: bool = True) -> int:
+        """Consultas que hizo el API para responder a un GET"""
+        antes = contar_consultas()
+        response = requests.get(
+            url=url,
+            headers={"X-Api-Key": config["api_key"]},
+            params=params,
+            timeout=config["timeout"],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["success"], success)
+        return contar_consultas() - antes
+
+    def test_get_autoridades(self):
+        """Test GET method for autoridades, a page of 100 is served from the catalog cache without queries"""
+        consultas = self.consultas_de(f"{config['api_base_url']}/autoridades", {"limit": 100})
+        self.assertEqual(consultas, 0)
+
+    def test_get_autoridades_detalles(self):
+        """Test GET method for autoridades detalle, served from the catalog cache without queries"""
+        autoridades_claves = eval(config["autoridades_claves"])
+        for autoridad_clave in autoridades_claves:
+            consultas = self.consultas_de(f"{config['api_base_url']}/autoridades/{autoridad_clave}")
+            self.assertEqual(consultas, 0)
+
+    def test_get_pag_pago_detalle(self):
+        """Test GET method for pag_pagos detalle, served with one query"""
+        if config["pag_pago_id"] == "":
+            self.skipTest("Falta PAG_PAGO_ID")
+        consultas = self.consultas_de(f"{config['api_base_url']}/pag_pagos/{config['pag_pago_id']}")
+        self.assertEqual(consultas, 1)
+
+    def test_get_pag_pago_estado(self):
+        """Test GET method for pag_pagos estado, served with one query"""
+        if config["pag_pago_id"] == "":
+            self.skipTest("Falta PAG_PAGO_ID")
+        consultas = self.consultas_de(f"{config['api_base_url']}/pag_pagos/{config['pag_pago_id']}/estado")
+        self.assertEqual(consultas, 1)
+
+    def test_get_pag_pago_no_existe(self):
+        """Test GET method for a pag_pago that does not exist, one query in the read session and one in the primary"""
+        consultas = self.consultas_de(f"{config['api_base_url']}/pag_pagos/{uuid.uuid4()}", success=False)
+        self.assertEqual(consultas, 2)
+        consultas = self.consultas_de(f"{config['api_base_url']}/pag_pagos/{uuid.uuid4()}/estado", success=False)
+        self.assertEqual(consultas, 2)
+
+    def test_get_cit_cliente(self):
+        """Test GET method for cit_clientes detalle, served with one query"""
+        if config["cit_cliente_email"] == "":
+            self.skipTest("Falta CIT_CLIENTE_EMAIL")
+        consultas = self.consultas_de(f"{config['api_base_url']}/cit_clientes/{config['cit_cliente_email']}")
+        self.assertEqual(consultas, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -64,6 +64,27 @@ class TestDistritos(unittest.TestCase):
             self.assertTrue("nombre" in item)
             self.assertTrue("nombre_corto" in item)
 
+    def test_get_distritos_count_modes(self):
+        """Test GET method for distritos with each count mode"""
+
+        for count in ["exact", "cached", "estimated", "none"]:
+            # Consultar
+            response = requests.get(
+                url=f"{config['api_base_url']}/distritos",
+                headers={"X-Api-Key": config["api_key"]},
+                params={"count": count},
+                timeout=config["timeout"],
+            )
+            self.assertEqual(response.status_code, 200)
+
+            # Validar contenido, sin total cuando el modo es none
+            contenido = response.json()
+            self.assertTrue(contenido["success"])
+            if count == "none":
+                self.assertIsNone(contenido["total"])
+            else:
+                self.assertGreaterEqual(contenido["total"], len(contenido["data"]))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+"""
+Unit tests for ejecutor, no necesitan el API
+"""
+
+import asyncio
+import threading
+import unittest
+
+from pjecz_casiopea_tramites_servicios_api.dependencies.ejecutor import EjecutorAcotado
+
+
+class TestEjecutorAcotado(unittest.TestCase):
+    """Tests for EjecutorAcotado"""
+
+    def setUp(self):
+        """Ejecutor con dos hilos y tres lugares, y un evento que detiene los trabajos"""
+        self.ejecutor = EjecutorAcotado(nombre="prueba", hilos=2, cola=3, ventana=100)
+        self.addCleanup(self.ejecutor.cerrar)
+        self.seguir = threading.Event()
+        self.addCleanup(self.seguir.set)
+        self.dentro = 0
+        self.maximo = 0
+        self.candado = threading.Lock()
+
+    def trabajo(self, numero: int) -> int:
+        """Contar los trabajos dentro del pool hasta que se permita seguir"""
+        with self.candado:
+            self.dentro += 1
+            self.maximo = max(self.maximo, self.dentro)
+        self.seguir.wait(timeout=5)
+        with self.candado:
+            self.dentro -= 1
+        return numero
+
+    def test_cola_acotada(self):
+        """Test at most cola jobs are in the pool, the others wait for a place and all get their result"""
+
+        async def correr():
+            tareas = [asyncio.create_task(self.ejecutor.ejecutar(self.trabajo, numero)) for numero in range(10)]
+            await asyncio.sleep(0.2)
+            self.assertEqual(self.ejecutor.en_curso, 2)
+            self.assertEqual(self.ejecutor.en_cola, 1)
+            self.assertEqual(self.ejecutor.esperando_lugar, 7)
+            self.seguir.set()
+            return await asyncio.gather(*tareas)
+
+        self.assertEqual(asyncio.run(correr()), list(range(10)))
+        self.assertEqual(self.maximo, 2)
+        estadisticas = self.ejecutor.estadisticas()
+        self.assertEqual((estadisticas["ejecutados"], estadisticas["en_cola"], estadisticas["en_curso"]), (10, 0, 0))
+
+    def test_cancelar_no_libera_lugar(self):
+        """Test cancelling the callers does not free the places of jobs still in the pool"""
+
+        async def correr():
+            tareas = [asyncio.create_task(self.ejecutor.ejecutar(self.trabajo, numero)) for numero in range(3)]
+            await asyncio.sleep(0.2)
+            for tarea in tareas:
+                tarea.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+
+            # Los dos que corren siguen ocupando su lugar, el que esperaba un hilo se canceló y lo devolvió
+            otras = [asyncio.create_task(self.ejecutor.ejecutar(self.trabajo, numero)) for numero in range(3, 5)]
+            await asyncio.sleep(0.2)
+            self.assertEqual(self.ejecutor.en_curso, 2)
+            self.assertEqual(self.ejecutor.en_cola, 1)
+            self.assertEqual(self.ejecutor.esperando_lugar, 1)
+            self.seguir.set()
+            return await asyncio.gather(*otras)
+
+        self.assertEqual(asyncio.run(correr()), [3, 4])
+        self.assertEqual(self.maximo, 2)
+        estadisticas = self.ejecutor.estadisticas()
+        self.assertEqual((estadisticas["ejecutados"], estadisticas["en_cola"], estadisticas["en_curso"]), (4, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
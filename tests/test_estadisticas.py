@@ -0,0 +1,42 @@
+"""
+Unit tests for estadisticas
+"""
+
+import unittest
+
+import requests
+
+from tests import config
+
+
+class TestEstadisticas(unittest.TestCase):
+    """Tests for estadisticas"""
+
+    def test_get_estadisticas_wpp(self):
+        """Test GET method for the bank circuit breaker, latency and executor statistics"""
+
+        # Consultar
+        response = requests.get(
+            url=f"{config['api_base_url']}/estadisticas/wpp",
+            headers={"X-Api-Key": config["api_key"]},
+            timeout=config["timeout"],
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # Validar contenido
+        contenido = response.json()
+        self.assertTrue(contenido["success"])
+        datos = contenido["data"]
+        self.assertIn(datos["estado"], ["CERRADO", "ABIERTO", "SEMIABIERTO"])
+        self.assertLessEqual(datos["errores"], datos["llamadas"])
+        self.assertLessEqual(datos["latencia_p50_ms"], datos["latencia_p99_ms"])
+        self.assertGreater(datos["timeout_s"], 0)
+        ejecutor = datos["ejecutor"]
+        self.assertGreater(ejecutor["hilos"], 0)
+        self.assertLessEqual(ejecutor["en_cola"] + ejecutor["en_curso"], ejecutor["cola"])
+        self.assertLessEqual(ejecutor["errores"], ejecutor["ejecutados"])
+        self.assertLessEqual(ejecutor["duracion_p50_ms"], ejecutor["duracion_p99_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
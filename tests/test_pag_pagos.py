@@ -2,19 +2,431 @@
 Unit tests for pag pagos
 """
 
+import random
+import string
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
+from pjecz_casiopea_tramites_servicios_api.dependencies.santander_web_pay_plus import WPP_KEY, encrypt_chain
 from tests import config
 
 
+def nuevo_carro(autoridad_clave: str, pag_tramite_servicio_clave: str) -> dict:
+    """Datos de un carro con una CURP y un email nuevos"""
+    letras = "".join(random.choices(string.ascii_uppercase, k=4))
+    return {
+        "apellido_primero": "PRUEBA",
+        "apellido_segundo": "CONCURRENCIA",
+        "nombres": "CARRO",
+        "curp": f"{letras}{random.randint(0, 999999):06d}HCLXXX09",
+        "email": f"{letras.lower()}{random.randint(0, 999999)}@example.com",
+        "telefono": "8440000000",
+        "autoridad_clave": autoridad_clave,
+        "distrito_clave": "",
+        "pag_tramite_servicio_clave": pag_tramite_servicio_clave,
+        "cantidad": 1,
+        "descripcion": "",
+    }
+
+
 class TestPagPagos(unittest.TestCase):
     """Tests for pag_pagos"""
 
+    def crear_pago_pagado(self, autoridad_clave: str, pag_tramite_servicio_clave: str) -> tuple[str, str, str]:
+        """Crear un pago y cifrar el aviso del banco de que se pagó, entrega el id, el folio y el XML cifrado"""
+
+        # Crear un pago, asíncrono para no depender del banco
+        carro = nuevo_carro(autoridad_clave, pag_tramite_servicio_clave)
+        response = requests.post(
+            url=f"{config['api_base_url']}/pag_pagos/carro",
+            headers={"X-Api-Key": config["api_key"]},
+            params={"asincrono": "true"},
+            json=carro,
+            timeout=config["timeout"],
+        )
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        self.assertTrue(contenido["success"])
+        pag_pago_id = contenido["data"]["id"]
+
+        # Cifrar la respuesta del banco como si se hubiera pagado
+        folio = str(random.randint(100000, 999999))
+        xml_encriptado = encrypt_chain(
+            f"<CENTEROFPAYMENTS><reference>{pag_pago_id}</reference><response>approved</response>"
+            f"<foliocpagos>{folio}</foliocpagos><auth>123456</auth><email>{carro['email']}</email></CENTEROFPAYMENTS>"
+        ).decode()
+        return pag_pago_id, folio, xml_encriptado
+
     def test_get_pag_pagos(self):
         """Test GET method for pag_pagos"""
 
+    def test_post_carros_concurrentes(self):
+        """Test POST method for carro, parallel carts for the same CURP create only one cit_cliente"""
+
+        # Obtener las claves de la autoridad y del trámite desde la configuración
+        autoridades_claves = eval(config["autoridades_claves"])
+        pag_tramites_servicios_claves = eval(config["pag_tramites_servicios_claves"])
+        if len(autoridades_claves) == 0 or len(pag_tramites_servicios_claves) == 0:
+            self.skipTest("Faltan AUTORIDADES_CLAVES y PAG_TRAMITES_SERVICIOS_CLAVES")
+
+        # Una CURP y un email nuevos para que los carros compitan por crear al cliente
+        carro = nuevo_carro(autoridades_claves[0], pag_tramites_servicios_claves[0])
+        curp = carro["curp"]
+        email = carro["email"]
+
+        # Enviar los carros en paralelo
+        def enviar(_):
+            return requests.post(
+                url=f"{config['api_base_url']}/pag_pagos/carro",
+                headers={"X-Api-Key": config["api_key"]},
+                json=carro,
+                timeout=config["timeout"],
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(enviar, range(16)))
+
+        # Validar que ninguno falló por el cliente ni por el pago, el enlace depende del banco
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            contenido = response.json()
+            self.assertNotEqual(contenido["message"], "No se pudo crear el cliente")
+            self.assertNotEqual(contenido["message"], "No se pudo crear el pago")
+
+        # Validar que existe un solo cliente con ese email
+        response = requests.get(
+            url=f"{config['api_base_url']}/cit_clientes/{email}",
+            headers={"X-Api-Key": config["api_key"]},
+            timeout=config["timeout"],
+        )
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        self.assertTrue(contenido["success"])
+        self.assertEqual(contenido["data"]["curp"], curp)
+
+    def test_post_carro_idempotency_key(self):
+        """Test POST method for carro, parallel retries with the same Idempotency-Key create only one payment"""
+
+        # Obtener las claves de la autoridad y del trámite desde la configuración
+        autoridades_claves = eval(config["autoridades_claves"])
+        pag_tramites_servicios_claves = eval(config["pag_tramites_servicios_claves"])
+        if len(autoridades_claves) == 0 or len(pag_tramites_servicios_claves) == 0:
+            self.skipTest("Faltan AUTORIDADES_CLAVES y PAG_TRAMITES_SERVICIOS_CLAVES")
+        carro = nuevo_carro(autoridades_claves[0], pag_tramites_servicios_claves[0])
+        llave = "".join(random.choices(string.ascii_letters + string.digits, k=32))
+
+        # Enviar los reintentos en paralelo, asíncronos para no depender del banco
+        def enviar(datos):
+            return requests.post(
+                url=f"{config['api_base_url']}/pag_pagos/carro",
+                headers={"X-Api-Key": config["api_key"], "Idempotency-Key": llave},
+                params={"asincrono": "true"},
+                json=datos,
+                timeout=config["timeout"],
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(enviar, [carro] * 8))
+
+        # Validar que todos recibieron el mismo pago
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+        contenidos = [response.json() for response in responses]
+        self.assertTrue(contenidos[0]["success"])
+        self.assertEqual({contenido["data"]["id"] for contenido in contenidos}, {contenidos[0]["data"]["id"]})
+
+        # Validar que la misma llave con otro carro es un conflicto
+        response = enviar({**carro, "cantidad": 2})
+        self.assertEqual(response.status_code, 409)
+
+    def test_post_carro_asincrono(self):
+        """Test POST method for carro asincrono, a worker takes the payment and stores its link or cancels it"""
+
+        # Obtener las claves de la autoridad y del trámite desde la configuración
+        autoridades_claves = eval(config["autoridades_claves"])
+        pag_tramites_servicios_claves = eval(config["pag_tramites_servicios_claves"])
+        if len(autoridades_claves) == 0 or len(pag_tramites_servicios_claves) == 0:
+            self.skipTest("Faltan AUTORIDADES_CLAVES y PAG_TRAMITES_SERVICIOS_CLAVES")
+
+        # Crear el pago sin esperar el enlace
+        response = requests.post(
+            url=f"{config['api_base_url']}/pag_pagos/carro",
+            headers={"X-Api-Key": config["api_key"]},
+            params={"asincrono": "true"},
+            json=nuevo_carro(autoridades_claves[0], pag_tramites_servicios_claves[0]),
+            timeout=config["timeout"],
+        )
+        self.assertEqual(response.status_code, 200)
+        contenido = response.json()
+        self.assertTrue(contenido["success"])
+        self.assertIsNone(contenido["data"]["url"])
+        pag_pago_id = contenido["data"]["id"]
+
+        # Esperar a que un trabajador guarde el enlace, o cancele el pago si el banco no responde
+        for _ in range(40):
+            response = requests.get(
+                url=f"{config['api_base_url']}/pag_pagos/{pag_pago_id}/estado",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+            )
+            contenido = response.json()
+            if contenido["data"]["url"] is not None or contenido["data"]["estado"] != "SOLICITADO":
+                break
+            time.sleep(0.5)
+        if contenido["data"]["url"] is None:
+            self.assertEqual(contenido["data"]["estado"], "CANCELADO")
+        else:
+            self.assertEqual(contenido["data"]["estado"], "SOLICITADO")
+
+    def test_post_carro_pendiente_igual(self):
+        """Test POST method for carro, the same cart again returns the pending payment and its link"""
+
+        # Obtener las claves de la autoridad y del trámite desde la configuración
+        autoridades_claves = eval(config["autoridades_claves"])
+        pag_tramites_servicios_claves = eval(config["pag_tramites_servicios_claves"])
+        if len(autoridades_claves) == 0 or len(pag_tramites_servicios_claves) == 0:
+            self.skipTest("Faltan AUTORIDADES_CLAVES y PAG_TRAMITES_SERVICIOS_CLAVES")
+        carro = nuevo_carro(autoridades_claves[0], pag_tramites_servicios_claves[0])
+
+        # Enviar el carro dos veces, sin Idempotency-Key, como cuando el usuario vuelve a pagar
+        def enviar(datos):
+            return requests.post(
+                url=f"{config['api_base_url']}/pag_pagos/carro",
+                headers={"X-Api-Key": config["api_key"]},
+                params={"asincrono": "false"},
+                json=datos,
+                timeout=config["timeout"],
+            )
+
+        primero = enviar(carro).json()
+        if not primero["success"]:
+            self.skipTest("El banco no entregó el enlace del primer carro")
+        segundo = enviar(carro).json()
+
+        # Validar que se entregó el mismo pago con el mismo enlace
+        self.assertTrue(segundo["success"])
+        self.assertEqual(segundo["data"]["id"], primero["data"]["id"])
+        self.assertEqual(segundo["data"]["url"], primero["data"]["url"])
+
+        # Validar que con otra cantidad es otro pago
+        tercero = enviar({**carro, "cantidad": 2}).json()
+        if tercero["success"]:
+            self.assertNotEqual(tercero["data"]["id"], primero["data"]["id"])
+
+    def test_post_resultados_concurrentes(self):
+        """Test POST method for resultado, parallel callbacks for the same payment change it only once"""
+
+        # Obtener las claves de la autoridad y del trámite desde la configuración
+        autoridades_claves = eval(config["autoridades_claves"])
+        pag_tramites_servicios_claves = eval(config["pag_tramites_servicios_claves"])
+        if len(autoridades_claves) == 0 or len(pag_tramites_servicios_claves) == 0:
+            self.skipTest("Faltan AUTORIDADES_CLAVES y PAG_TRAMITES_SERVICIOS_CLAVES")
+        if WPP_KEY is None:
+            self.skipTest("Falta WPP_KEY para cifrar la respuesta del banco")
+        if config["pag_resultados_bandeja"]:
+            self.skipTest("El API guarda los resultados en la bandeja")
+
+        # Crear un pago y cifrar la respuesta del banco como si se hubiera pagado
+        _, folio, xml_encriptado = self.crear_pago_pagado(autoridades_claves[0], pag_tramites_servicios_claves[0])
+
+        # Enviar el mismo resultado en paralelo, como cuando el banco repite el aviso
+        def enviar(_):
+            return requests.post(
+                url=f"{config['api_base_url']}/pag_pagos/resultado",
+                headers={"X-Api-Key": config["api_key"]},
+                json={"xml_encriptado": xml_encriptado},
+                timeout=config["timeout"],
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(enviar, range(8)))
+
+        # Validar que solo uno cambió el pago y los demás lo encontraron ya procesado
+        contenidos = [response.json() for response in responses]
+        exitosos = [contenido for contenido in contenidos if contenido["success"]]
+        self.assertEqual(len(exitosos), 1)
+        self.assertEqual(exitosos[0]["data"]["estado"], "PAGADO")
+        self.assertEqual(exitosos[0]["data"]["folio"], folio)
+        for contenido in contenidos:
+            if not contenido["success"]:
+                self.assertEqual(contenido["message"], "No es un pago solicitado al banco, ya fue procesado")
+
+    def test_post_resultado_demasiado_grande(self):
+        """Test POST method for resultado, an oversized XML is rejected before it is stored or decrypted"""
+        response = requests.post(
+            url=f"{config['api_base_url']}/pag_pagos/resultado",
+            headers={"X-Api-Key": config["api_key"]},
+            json={"xml_encriptado": "A" * 200000},
+            timeout=config["timeout"],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["success"])
+
+    def test_post_resultados_bandeja(self):
+        """Test POST method for resultado with the inbox, callbacks are acknowledged and applied once in the background"""
+
+        # Obtener las claves de la autoridad y del trámite desde la configuración
+        autoridades_claves = eval(config["autoridades_claves"])
+        pag_tramites_servicios_claves = eval(config["pag_tramites_servicios_claves"])
+        if len(autoridades_claves) == 0 or len(pag_tramites_servicios_claves) == 0:
+            self.skipTest("Faltan AUTORIDADES_CLAVES y PAG_TRAMITES_SERVICIOS_CLAVES")
+        if WPP_KEY is None:
+            self.skipTest("Falta WPP_KEY para cifrar la respuesta del banco")
+        if not config["pag_resultados_bandeja"]:
+            self.skipTest("El API no guarda los resultados en la bandeja, falta PAG_RESULTADOS_BANDEJA")
+
+        # Crear un pago y cifrar la respuesta del banco como si se hubiera pagado
+        pag_pago_id, folio, xml_encriptado = self.crear_pago_pagado(autoridades_claves[0], pag_tramites_servicios_claves[0])
+
+        # Enviar el mismo resultado a la bandeja en paralelo, todos se reciben
+        def enviar(_):
+            return requests.post(
+                url=f"{config['api_base_url']}/pag_pagos/resultado",
+                headers={"X-Api-Key": config["api_key"]},
+                json={"xml_encriptado": xml_encriptado},
+                timeout=config["timeout"],
+            )
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(executor.map(enviar, range(4)))
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()["success"])
+
+        # Esperar a que la bandeja aplique el resultado
+        for _ in range(20):
+            response = requests.get(
+                url=f"{config['api_base_url']}/pag_pagos/{pag_pago_id}",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+            )
+            contenido = response.json()
+            if contenido["success"] and contenido["data"]["estado"] != "SOLICITADO":
+                break
+            time.sleep(0.5)
+        self.assertEqual(contenido["data"]["estado"], "PAGADO")
+        self.assertEqual(contenido["data"]["folio"], folio)
+
+    def test_post_resultados_bandeja_aviso_fallido(self):
+        """Test POST method for resultado with the inbox, a callback that cannot be applied does not block the others"""
+
+        # Obtener las claves de la autoridad y del trámite desde la configuración
+        autoridades_claves = eval(config["autoridades_claves"])
+        pag_tramites_servicios_claves = eval(config["pag_tramites_servicios_claves"])
+        if len(autoridades_claves) == 0 or len(pag_tramites_servicios_claves) == 0:
+            self.skipTest("Faltan AUTORIDADES_CLAVES y PAG_TRAMITES_SERVICIOS_CLAVES")
+        if WPP_KEY is None:
+            self.skipTest("Falta WPP_KEY para cifrar la respuesta del banco")
+        if not config["pag_resultados_bandeja"]:
+            self.skipTest("El API no guarda los resultados en la bandeja, falta PAG_RESULTADOS_BANDEJA")
+
+        # Un aviso con un folio más largo que la columna hace fallar su UPDATE, se envía antes que uno bueno
+        fallido_pag_pago_id, _, _ = self.crear_pago_pagado(autoridades_claves[0], pag_tramites_servicios_claves[0])
+        fallido_xml_encriptado = encrypt_chain(
+            f"<CENTEROFPAYMENTS><reference>{fallido_pag_pago_id}</reference><response>approved</response>"
+            f"<foliocpagos>{'9' * 300}</foliocpagos><auth>123456</auth><email>prueba@example.com</email></CENTEROFPAYMENTS>"
+        ).decode()
+        pag_pago_id, folio, xml_encriptado = self.crear_pago_pagado(autoridades_claves[0], pag_tramites_servicios_claves[0])
+        for xml in [fallido_xml_encriptado, xml_encriptado]:
+            response = requests.post(
+                url=f"{config['api_base_url']}/pag_pagos/resultado",
+                headers={"X-Api-Key": config["api_key"]},
+                json={"xml_encriptado": xml},
+                timeout=config["timeout"],
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()["success"])
+
+        # Esperar a que la bandeja aplique el bueno
+        for _ in range(20):
+            response = requests.get(
+                url=f"{config['api_base_url']}/pag_pagos/{pag_pago_id}",
+                headers={"X-Api-Key": config["api_key"]},
+                timeout=config["timeout"],
+            )
+            contenido = response.json()
+            if contenido["success"] and contenido["data"]["estado"] != "SOLICITADO":
+                break
+            time.sleep(0.5)
+        self.assertEqual(contenido["data"]["estado"], "PAGADO")
+        self.assertEqual(contenido["data"]["folio"], folio)
+
+        # El fallido sigue SOLICITADO
+        response = requests.get(
+            url=f"{config['api_base_url']}/pag_pagos/{fallido_pag_pago_id}/estado",
+            headers={"X-Api-Key": config["api_key"]},
+            timeout=config["timeout"],
+        )
+        self.assertEqual(response.json()["data"]["estado"], "SOLICITADO")
+
+    def test_post_resultados_lote(self):
+        """Test POST method for resultados, a batch reports what happened with each callback"""
+
+        # Obtener las claves de la autoridad y del trámite desde la configuración
+        autoridades_claves = eval(config["autoridades_claves"])
+        pag_tramites_servicios_claves = eval(config["pag_tramites_servicios_claves"])
+        if len(autoridades_claves) == 0 or len(pag_tramites_servicios_claves) == 0:
+            self.skipTest("Faltan AUTORIDADES_CLAVES y PAG_TRAMITES_SERVICIOS_CLAVES")
+        if WPP_KEY is None:
+            self.skipTest("Falta WPP_KEY para cifrar la respuesta del banco")
+        if config["api_key"] == "":
+            self.skipTest("Falta API_KEY para reprocesar resultados")
+
+        # Crear dos pagos y cifrar sus avisos
+        pag_pago_id, folio, xml_encriptado = self.crear_pago_pagado(autoridades_claves[0], pag_tramites_servicios_claves[0])
+        otro_pag_pago_id, _, otro_xml_encriptado = self.crear_pago_pagado(
+            autoridades_claves[0], pag_tramites_servicios_claves[0]
+        )
+
+        # Enviar un lote con un aviso repetido, uno que no se puede leer y uno vacío
+        def enviar(xmls_encriptados, recibidos=None):
+            response = requests.post(
+                url=f"{config['api_base_url']}/pag_pagos/resultados",
+                headers={"X-Api-Key": config["api_key"]},
+                json={"xmls_encriptados": xmls_encriptados, "recibidos": recibidos},
+                timeout=config["timeout"],
+            )
+            self.assertEqual(response.status_code, 200)
+            contenido = response.json()
+            self.assertTrue(contenido["success"])
+            return contenido["data"]
+
+        datos = enviar(
+            [xml_encriptado, xml_encriptado, "NO ES UN XML CIFRADO", "", otro_xml_encriptado],
+            ["2026-01-02T03:04:05", None, None, None, None],
+        )
+        estados = [salida["estado"] for salida in datos["salidas"]]
+        self.assertEqual(estados, ["APLICADO", "DUPLICADO", "RECHAZADO", "RECHAZADO", "APLICADO"])
+        self.assertEqual(datos["salidas"][0]["pag_pago_id"], pag_pago_id)
+        self.assertEqual(datos["salidas"][0]["folio"], folio)
+        self.assertEqual(datos["salidas"][4]["pag_pago_id"], otro_pag_pago_id)
+        self.assertEqual((datos["total"], datos["aplicados"], datos["duplicados"], datos["rechazados"]), (5, 2, 1, 2))
+
+        # Validar que el pago conserva el tiempo en que se recibió su aviso
+        response = requests.get(
+            url=f"{config['api_base_url']}/pag_pagos/{pag_pago_id}",
+            headers={"X-Api-Key": config["api_key"]},
+            timeout=config["timeout"],
+        )
+        self.assertEqual(response.json()["data"]["resultado_tiempo"], "2026-01-02T03:04:05")
+
+        # Validar que al repetir el lote ya no se aplica nada
+        datos = enviar([xml_encriptado])
+        self.assertEqual(datos["salidas"][0]["estado"], "DUPLICADO")
+
+    def test_post_resultados_sin_api_key(self):
+        """Test POST method for resultados, a batch without the X-Api-Key is rejected"""
+        response = requests.post(
+            url=f"{config['api_base_url']}/pag_pagos/resultados",
+            headers={"X-Api-Key": "NO ES LA X-API-KEY"},
+            json={"xmls_encriptados": ["NO ES UN XML CIFRADO"]},
+            timeout=config["timeout"],
+        )
+        self.assertIn(response.status_code, [401, 403])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,166 @@
+"""
+Unit tests for safe_string, no necesitan el API
+
+Comparan las funciones con las versiones anteriores, que llamaban a unidecode
+en cada cadena o en cada carácter, guardadas aquí como referencia.
+"""
+
+import re
+import unittest
+
+from hypothesis import given
+from hypothesis import strategies as st
+from unidecode import unidecode
+
+from pjecz_casiopea_tramites_servicios_api.dependencies import safe_string as modulo_safe_string
+from pjecz_casiopea_tramites_servicios_api.dependencies.safe_string import (
+    CURP_REGEXP,
+    RFC_REGEXP,
+    safe_clave,
+    safe_curp,
+    safe_rfc,
+    safe_string,
+)
+
+
+def referencia_safe_clave(input_str, max_len=16, only_digits=False, separator="-") -> str:
+    """safe_clave como era antes"""
+    if not isinstance(input_str, str):
+        return ""
+    stripped = input_str.strip()
+    if stripped == "":
+        return ""
+    if only_digits:
+        clean_string = re.sub(r"[^0-9]+", separator, stripped)
+    else:
+        clean_string = re.sub(r"[^a-zA-Z0-9]+", separator, unidecode(stripped))
+    without_spaces = re.sub(r"\s+", "", clean_string)
+    final = without_spaces.upper()
+    if len(final) > max_len:
+        return final[:max_len]
+    return final
+
+
+def referencia_safe_curp_rfc(input_str, regexp, is_optional=False, search_fragment=False) -> str:
+    """safe_curp y safe_rfc como eran antes, entrega el mensaje si causaba ValueError"""
+    if not isinstance(input_str, str):
+        return ""
+    stripped = input_str.strip()
+    if is_optional and stripped == "":
+        return ""
+    clean_string = re.sub(r"[^a-zA-Z0-9]+", " ", unidecode(stripped))
+    without_spaces = re.sub(r"\s+", "", clean_string)
+    final = without_spaces.upper()
+    if search_fragment is False and re.match(regexp, final) is None:
+        return "ValueError"
+    return final
+
+
+def referencia_safe_string(input_str, max_len=250, do_unidecode=True, save_enie=False, to_uppercase=True) -> str:
+    """safe_string como era antes"""
+    if not isinstance(input_str, str):
+        return ""
+    if do_unidecode:
+        new_string = re.sub(r"[^a-zA-Z0-9.()/-]+", " ", input_str)
+        if save_enie:
+            new_string = ""
+            for char in input_str:
+                if char == "ñ":
+                    new_string += "ñ"
+                elif char == "Ñ":
+                    new_string += "Ñ"
+                else:
+                    new_string += unidecode(char)
+        else:
+            new_string = re.sub(r"[^a-zA-Z0-9.()/-]+", " ", unidecode(input_str))
+    else:
+        if save_enie is False:
+            new_string = re.sub(r"[^a-záéíóúüA-ZÁÉÍÓÚÜ0-9.()/-]+", " ", input_str)
+        else:
+            new_string = re.sub(r"[^a-záéíóúüñA-ZÁÉÍÓÚÜÑ0-9.()/-]+", " ", input_str)
+    removed_multiple_spaces = re.sub(r"\s+", " ", new_string)
+    final = removed_multiple_spaces.strip()
+    if to_uppercase:
+        final = final.upper()
+    if max_len == 0:
+        return final
+    return (final[:max_len] + "...") if len(final) > max_len else final
+
+
+# Textos en español con acentos, ñ, signos y espacios, más cualquier carácter
+textos = st.one_of(
+    st.text(alphabet="aeiouñnAEIOUÑNáéíóúüÁÉÍÓÚÜ.,;()/-_ \t\n0123456789çßøœ€“”", max_size=64),
+    st.text(st.characters(blacklist_categories=["Cs"]), max_size=64),
+    st.text(max_size=600),
+)
+
+
+def valor_o_error(funcion, *args, **kwargs) -> str:
+    """Entregar el resultado o ValueError si lo causó"""
+    try:
+        return funcion(*args, **kwargs)
+    except ValueError:
+        return "ValueError"
+
+
+class TestSafeString(unittest.TestCase):
+    """Tests for safe_string"""
+
+    @given(
+        input_str=textos,
+        max_len=st.sampled_from([0, 8, 64, 250]),
+        do_unidecode=st.booleans(),
+        save_enie=st.booleans(),
+        to_uppercase=st.booleans(),
+    )
+    def test_safe_string_igual_a_referencia(self, input_str, max_len, do_unidecode, save_enie, to_uppercase):
+        """Test safe_string gives the same as before, twice to go through the cache"""
+        esperado = referencia_safe_string(input_str, max_len, do_unidecode, save_enie, to_uppercase)
+        self.assertEqual(safe_string(input_str, max_len, do_unidecode, save_enie, to_uppercase), esperado)
+        self.assertEqual(safe_string(input_str, max_len, do_unidecode, save_enie, to_uppercase), esperado)
+
+    @given(
+        input_str=textos,
+        max_len=st.sampled_from([4, 16]),
+        only_digits=st.booleans(),
+        separator=st.sampled_from(["-", "_", " ", ""]),
+    )
+    def test_safe_clave_igual_a_referencia(self, input_str, max_len, only_digits, separator):
+        """Test safe_clave gives the same as before"""
+        self.assertEqual(
+            safe_clave(input_str, max_len, only_digits, separator),
+            referencia_safe_clave(input_str, max_len, only_digits, separator),
+        )
+
+    @given(input_str=textos, is_optional=st.booleans(), search_fragment=st.booleans())
+    def test_safe_curp_rfc_igual_a_referencia(self, input_str, is_optional, search_fragment):
+        """Test safe_curp and safe_rfc give the same as before, including when they raise ValueError"""
+        self.assertEqual(
+            valor_o_error(safe_curp, input_str, is_optional, search_fragment),
+            referencia_safe_curp_rfc(input_str, CURP_REGEXP, is_optional, search_fragment),
+        )
+        self.assertEqual(
+            valor_o_error(safe_rfc, input_str, is_optional, search_fragment),
+            referencia_safe_curp_rfc(input_str, RFC_REGEXP, is_optional, search_fragment),
+        )
+
+    def test_safe_string_conserva_enie(self):
+        """Test safe_string keeps ñ and removes the accents"""
+        self.assertEqual(safe_string("  Peña   Nieto,  José  ", save_enie=True), "PEÑA NIETO, JOSE")
+        self.assertEqual(safe_string("Peña José", save_enie=False), "PENA JOSE")
+        self.assertEqual(safe_curp(" gaxj-800101-hcoñrs09 "), "GAXJ800101HCONRS09")
+        self.assertEqual(safe_string(None), "")
+
+    def test_tabla_no_crece(self):
+        """Test characters outside the tables are translated without growing them"""
+        tamano = len(modulo_safe_string._UNIDECODE)
+        texto = "".join(chr(codigo) for codigo in range(0x250, 0x3000))
+        self.assertEqual(modulo_safe_string.quitar_acentos(texto), unidecode(texto))
+        self.assertEqual(len(modulo_safe_string._UNIDECODE), tamano)
+        self.assertLessEqual(
+            modulo_safe_string._unidecode_caracter.cache_info().currsize, modulo_safe_string.UNIDECODE_CACHE_TAMANO
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Unit tests for santander_web_pay_plus, no necesitan el API
+
+Comparan create_chain_xml con la versión anterior, que armaba el árbol de
+ElementTree en cada carro, guardada aquí como referencia.
+"""
+
+import unittest
+import xml.etree.ElementTree as ET
+from unittest import mock
+
+from hypothesis import given
+from hypothesis import strategies as st
+
+from pjecz_casiopea_tramites_servicios_api.dependencies import santander_web_pay_plus
+from pjecz_casiopea_tramites_servicios_api.dependencies.santander_web_pay_plus import (
+    SantanderWebPayPlusXMLReadError,
+    create_chain_xml,
+    parse_bank_response,
+    read_xml_fields,
+)
+
+textos = st.text(max_size=64)
+
+
+def referencia_create_chain_xml(pago_id, amount, email, description, cit_client_id) -> str:
+    """create_chain_xml como era antes, con ElementTree"""
+    root = ET.Element("P")
+    business = ET.SubElement(root, "business")
+    ET.SubElement(business, "id_company").text = santander_web_pay_plus.WPP_COMPANY_ID
+    ET.SubElement(business, "id_branch").text = santander_web_pay_plus.WPP_BRANCH_ID
+    ET.SubElement(business, "user").text = santander_web_pay_plus.WPP_USER
+    ET.SubElement(business, "pwd").text = santander_web_pay_plus.WPP_PASS
+    ET.SubElement(root, "version").text = "IntegraWPP"
+    url = ET.SubElement(root, "url")
+    ET.SubElement(url, "reference").text = str(pago_id)
+    ET.SubElement(url, "amount").text = str(amount)
+    ET.SubElement(url, "moneda").text = "MXN"
+    ET.SubElement(url, "canal").text = "W"
+    ET.SubElement(url, "omitir_notif_default").text = "0"
+    ET.SubElement(url, "st_correo").text = "1"
+    ET.SubElement(url, "mail_cliente").text = email
+    data = ET.SubElement(url, "datos_adicionales")
+    data1 = ET.SubElement(data, "data", {"id": "1", "display": "true"})
+    ET.SubElement(data1, "label").text = "Servicio"
+    ET.SubElement(data1, "value").text = description
+    data2 = ET.SubElement(data, "data", {"id": "2", "display": "false"})
+    ET.SubElement(data2, "label").text = "Cliente ID"
+    ET.SubElement(data2, "value").text = str(cit_client_id)
+    return ET.tostring(root, encoding="unicode")
+
+
+class TestSantanderWebPayPlus(unittest.TestCase):
+    """Tests for santander_web_pay_plus"""
+
+    @given(
+        configuracion=st.fixed_dictionaries(
+            {"WPP_COMPANY_ID": textos, "WPP_BRANCH_ID": textos, "WPP_USER": textos, "WPP_PASS": textos}
+        ),
+        pago_id=st.one_of(st.uuids(), textos),
+        amount=st.one_of(st.floats(), st.decimals(places=2), st.integers()),
+        email=st.one_of(st.none(), textos),
+        description=st.one_of(st.none(), textos),
+        cit_client_id=st.one_of(st.uuids(), st.integers()),
+    )
+    def test_create_chain_xml_igual_a_element_tree(self, configuracion, pago_id, amount, email, description, cit_client_id):
+        """Test the template XML is the same string that ElementTree builds"""
+        with mock.patch.multiple(santander_web_pay_plus, _chain_xml_template=None, **configuracion):
+            self.assertEqual(
+                create_chain_xml(pago_id, amount, email, description, cit_client_id),
+                referencia_create_chain_xml(pago_id, amount, email, description, cit_client_id),
+            )
+
+    def test_parse_bank_response(self):
+        """Test the bank response is read into a BankResponse"""
+        respuesta = parse_bank_response(
+            "<CENTEROFPAYMENTS><reference>8640c8d5-b6da-493f-8a0a-3ab3eeec38f1</reference><response>approved</response>"
+            "<foliocpagos>123</foliocpagos><auth>456</auth><email>juan@example.com</email></CENTEROFPAYMENTS>"
+        )
+        self.assertEqual(respuesta.pago_id, "8640c8d5-b6da-493f-8a0a-3ab3eeec38f1")
+        self.assertEqual(respuesta.respuesta, "approved")
+        self.assertEqual(respuesta.folio, "123")
+        self.assertEqual((respuesta.auth, respuesta.email), ("456", "juan@example.com"))
+        self.assertFalse(hasattr(respuesta, "__dict__"))
+
+    def test_parse_bank_response_invalidas(self):
+        """Test a bad bank response raises SantanderWebPayPlusXMLReadError, not AttributeError"""
+        sin_folio = "<CENTEROFPAYMENTS><reference>1</reference><response>approved</response><auth>4</auth><email>e</email></CENTEROFPAYMENTS>"
+        entidades = (
+            '<?xml version="1.0"?><!DOCTYPE lolz [<!ENTITY lol "lol"><!ENTITY lol2 "&lol;&lol;&lol;&lol;&lol;&lol;">]>'
+            "<CENTEROFPAYMENTS><reference>&lol2;</reference></CENTEROFPAYMENTS>"
+        )
+        grande = f"<CENTEROFPAYMENTS><reference>{'1' * 100000}</reference></CENTEROFPAYMENTS>"
+        for xml_str in [sin_folio, entidades, grande, "<CENTEROFPAYMENTS><reference>", "no es XML"]:
+            with self.assertRaises(SantanderWebPayPlusXMLReadError):
+                parse_bank_response(xml_str)
+
+    @given(valores=st.lists(st.one_of(st.none(), st.text(st.characters(codec="utf-8"), max_size=32)), min_size=3, max_size=3))
+    def test_read_xml_fields_igual_a_element_tree(self, valores):
+        """Test the single pass reader gives the same texts as root.find, or fails when ElementTree fails"""
+        etiquetas = ("reference", "response", "foliocpagos")
+        root = ET.Element("CENTEROFPAYMENTS")
+        for etiqueta, valor in zip(etiquetas, valores):
+            if valor is not None:
+                ET.SubElement(root, etiqueta).text = valor
+        xml_str = ET.tostring(root, encoding="unicode")
+        try:
+            leido = ET.fromstring(xml_str)
+        except ET.ParseError:
+            with self.assertRaises(SantanderWebPayPlusXMLReadError):
+                read_xml_fields(xml_str, etiquetas)
+            return
+        esperados = {
+            etiqueta: None if leido.find(etiqueta) is None else leido.find(etiqueta).text or "" for etiqueta in etiquetas
+        }
+        self.assertEqual(read_xml_fields(xml_str, etiquetas), esperados)
+
+
+if __name__ == "__main__":
+    unittest.main()